@@ -0,0 +1,103 @@
+"""
+Benchmark: recall@k and query latency of the ANN backends vs the exact scan.
+
+Usage (from Backend/):
+    python benchmarks/bench_ann.py                       # synthetic clustered 384-dim corpus
+    python benchmarks/bench_ann.py --n 200000 --nprobe 4,8,16,32
+    python benchmarks/bench_ann.py --vectors corpus.npy  # real embeddings (n, dim) float32
+
+Synthetic data is drawn around random cluster centres so it behaves more like
+real sentence embeddings than uniform noise. The hnsw rows are skipped when
+faiss-cpu is not installed.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vectorstore import VectorStore  # noqa: E402
+
+
+def make_corpus(n, dim, n_clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    X = centres[labels] + 1.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def build(X, index, params):
+    vs = VectorStore(dim=X.shape[1], normalize=True, index=index, index_params=params)
+    start = time.perf_counter()
+    vs.add([str(i) for i in range(X.shape[0])], X)
+    # first search triggers lazy training for ivf; count it as build time
+    vs.search(X[0], top_k=1)
+    return vs, time.perf_counter() - start
+
+
+def run_queries(vs, Q, top_k):
+    results = []
+    start = time.perf_counter()
+    for q in Q:
+        results.append([int(p) for p, _ in vs.search(q, top_k=top_k)])
+    return results, (time.perf_counter() - start) / len(Q) * 1000
+
+
+def recall(truth, found):
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+    return hits / sum(len(t) for t in truth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help=".npy file with an (n, dim) matrix; synthetic data if omitted")
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nprobe", default="4,8,16,32")
+    parser.add_argument("--ef-search", default="32,64,128")
+    args = parser.parse_args()
+
+    if args.vectors:
+        X = np.load(args.vectors).astype(np.float32)
+        X /= np.linalg.norm(X, axis=1, keepdims=True) + 1e-12
+    else:
+        X = make_corpus(args.n, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    # queries: perturbed corpus points, so each has genuine close neighbours
+    Q = X[rng.choice(X.shape[0], size=args.queries, replace=False)]
+    Q = Q + 0.02 * rng.standard_normal(Q.shape).astype(np.float32)
+    print(f"corpus {X.shape}, {len(Q)} queries, top_k={args.top_k}")
+
+    flat, build_s = build(X, "flat", None)
+    truth, flat_ms = run_queries(flat, Q, args.top_k)
+    print(f"{'flat':<22} build {build_s:7.2f}s  recall@{args.top_k} 1.000  {flat_ms:7.3f} ms/query")
+
+    ivf, build_s = build(X, "ivf", None)
+    for nprobe in (int(v) for v in args.nprobe.split(",")):
+        ivf.index.nprobe = nprobe
+        found, ms = run_queries(ivf, Q, args.top_k)
+        print(f"{'ivf nprobe=' + str(nprobe):<22} build {build_s:7.2f}s  recall@{args.top_k} {recall(truth, found):.3f}  "
+              f"{ms:7.3f} ms/query  ({flat_ms / ms:4.1f}x)")
+
+    try:
+        hnsw, build_s = build(X, "hnsw", None)
+    except ImportError as e:
+        print(f"hnsw skipped: {e}")
+        return
+    for ef in (int(v) for v in args.ef_search.split(",")):
+        hnsw.index.index.hnsw.efSearch = ef
+        found, ms = run_queries(hnsw, Q, args.top_k)
+        print(f"{'hnsw efSearch=' + str(ef):<22} build {build_s:7.2f}s  recall@{args.top_k} {recall(truth, found):.3f}  "
+              f"{ms:7.3f} ms/query  ({flat_ms / ms:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: word-count chunking vs the token-aware chunker (chunking.py).
+
+Usage (from Backend/):
+    python benchmarks/bench_chunking.py                      # synthetic 8 MB text
+    python benchmarks/bench_chunking.py --mb 32 --max-tokens 200,1000
+    python benchmarks/bench_chunking.py --file book.txt
+
+Prints MB/s and chunk statistics for the old `text.split()` grouping and for
+chunk_text_tokens() / streamed iter_token_chunks() at each token budget.
+"Over budget" counts chunks above max_tokens (only possible for a single
+word longer than the budget).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chunking  # noqa: E402
+
+WORDS = ("the of and to in is that for it as with was on be by this are from or an "
+         "algorithm memory process thread kernel scheduler interrupt allocation page table "
+         "virtualization concurrency synchronization semaphore deadlock filesystem").split()
+
+
+def synthetic_text(n_bytes: int, seed: int = 0) -> str:
+    """PDF-like text: sentences of varied length, hard line breaks and occasional paragraph breaks."""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < n_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 40)))
+        sentence = sentence.capitalize() + rng.choice([".", ".", ".", "?", "!", ":"])
+        sep = rng.choice([" ", " ", " ", "\n", "\n\n"])
+        parts.append(sentence + sep)
+        size += len(sentence) + len(sep)
+    return "".join(parts)
+
+
+def legacy_chunks(text: str, chunk_size: int):
+    words = text.split()
+    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def report(label: str, chunks, seconds: float, mb: float, max_tokens: int = 0):
+    line = f"{label:<30} {seconds:7.2f}s  {mb / seconds:7.1f} MB/s  {len(chunks):7d} chunks"
+    if max_tokens:
+        sizes = [c.n_tokens for c in chunks]
+        over = sum(n > max_tokens for n in sizes)
+        line += f"  mean {sum(sizes) / max(1, len(sizes)):6.1f} tok  max {max(sizes, default=0)}  over budget {over}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="text file to chunk (default: synthetic text)")
+    parser.add_argument("--mb", type=float, default=8.0, help="size of the synthetic text")
+    parser.add_argument("--max-tokens", default="200,1000,2000")
+    parser.add_argument("--overlap", type=int, default=chunking.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--page-chars", type=int, default=3000, help="piece size for the streamed run")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+    else:
+        text = synthetic_text(int(args.mb * 1e6))
+    mb = len(text.encode("utf-8")) / 1e6
+    chunking.count_tokens("warm up")  # load the encoding outside the timed region
+    print(f"{mb:.1f} MB, encoding: {type(chunking._get_encoding()).__name__}")
+
+    chunks, s = timed(legacy_chunks, text, 500)
+    print(f"{'legacy 500 words':<30} {s:7.2f}s  {mb / s:7.1f} MB/s  {len(chunks):7d} chunks"
+          f"  max {max(chunking._token_counts(chunks), default=0)} tok")
+
+    pages = [text[i:i + args.page_chars] for i in range(0, len(text), args.page_chars)]
+    for max_tokens in (int(m) for m in args.max_tokens.split(",")):
+        chunks, s = timed(chunking.chunk_text_tokens, text, max_tokens, args.overlap)
+        report(f"tokens {max_tokens} (+{args.overlap} overlap)", chunks, s, mb, max_tokens)
+        streamed, s = timed(lambda: list(chunking.iter_token_chunks(pages, max_tokens, args.overlap, sep="")))
+        report(f"  streamed, {args.page_chars}-char pieces", streamed, s, mb, max_tokens)
+
+
+if __name__ == "__main__":
+    main()
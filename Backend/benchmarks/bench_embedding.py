@@ -0,0 +1,71 @@
+"""
+Benchmark: per-chunk vs batched embedding on the PDF ingestion path.
+
+Usage (from Backend/):
+    python benchmarks/bench_embedding.py path/to/large.pdf
+    python benchmarks/bench_embedding.py path/to/large.pdf --batch-sizes 16,32,64,128 --chunk-size 200
+
+Prints chunks/sec for the old one-forward-pass-per-chunk loop and for
+embed_chunks() at each batch size. Every timed run starts from an empty,
+memory-only embedding cache, so no run is served by an earlier one.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf import extract_pdf_text, chunk_text  # noqa: E402
+from chunking import EMBED_CHUNK_TOKENS  # noqa: E402
+import embeddings  # noqa: E402
+from embeddings import EmbeddingCache, get_embedding, embed_chunks, _ensure_model  # noqa: E402
+
+
+def _reset_cache():
+    # embeddings.py looks the module-level cache up on every call; EMBED_CACHE_PATH is not touched
+    embeddings.embedding_cache = EmbeddingCache(path="")
+
+
+def bench_per_chunk(chunks):
+    _reset_cache()
+    start = time.perf_counter()
+    for chunk in chunks:
+        get_embedding(chunk)
+    return time.perf_counter() - start
+
+
+def bench_batched(chunks, batch_size):
+    _reset_cache()
+    start = time.perf_counter()
+    embed_chunks(chunks, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF file to ingest")
+    parser.add_argument("--chunk-size", type=int, default=EMBED_CHUNK_TOKENS, help="tokens per chunk (main.py uses EMBED_CHUNK_TOKENS)")
+    parser.add_argument("--batch-sizes", default="16,32,64,128")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        text = extract_pdf_text(f)
+    chunks = chunk_text(text, chunk_size=args.chunk_size)
+    print(f"{len(chunks)} chunks from {args.pdf}")
+
+    # load the model (and warm it up) outside the timed region
+    _ensure_model()
+    get_embedding("warm up")
+
+    elapsed = bench_per_chunk(chunks)
+    print(f"per-chunk        : {len(chunks) / elapsed:8.1f} chunks/sec ({elapsed:.2f}s)")
+
+    for bs in (int(b) for b in args.batch_sizes.split(",")):
+        elapsed = bench_batched(chunks, bs)
+        print(f"batched (bs={bs:<4}): {len(chunks) / elapsed:8.1f} chunks/sec ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: the old `_extract_json` candidate search vs partial_json.recover_json().
+
+Usage (from Backend/):
+    python benchmarks/bench_json_recovery.py
+    python benchmarks/bench_json_recovery.py --kb 2,8,32,128 --repeat 5
+
+The old helper (copied below, formerly duplicated in client.py and
+content.py) collected every balanced bracket span, sorted them by length and
+ran json.loads on each until one parsed: quadratic in the input. Inputs are
+adversarial model outputs of the given sizes:
+
+  deep-unclosed  - thousands of nested "[" never closed (cut off mid-stream)
+  deep-invalid   - nested "[" ... "]" around an invalid token: every span is a failing candidate
+  many-spans     - many small balanced objects inside one large invalid span
+  truncated      - a roadmap array cut off inside its last element
+  valid-fenced   - a well-formed array in a ```json fence (common case)
+
+Prints the time per call for both and whether they recovered the same value.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from partial_json import recover_json  # noqa: E402
+
+
+def legacy_extract_json(text: str) -> Optional[str]:
+    text = (text or "").strip()
+    try:
+        json.loads(text)
+        return text
+    except Exception:
+        pass
+
+    candidates: List[str] = []
+    stack: List[tuple] = []
+    pairs = {"{": "}", "[": "]"}
+    for i, ch in enumerate(text):
+        if ch in pairs:
+            stack.append((ch, i))
+        elif ch in pairs.values() and stack:
+            open_ch, start_idx = stack.pop()
+            if pairs.get(open_ch) == ch:
+                candidates.append(text[start_idx:i + 1])
+
+    candidates.sort(key=len, reverse=True)
+    for c in candidates:
+        try:
+            json.loads(c)
+            return c
+        except Exception:
+            continue
+    return None
+
+
+def legacy(text: str):
+    candidate = legacy_extract_json(text)
+    return json.loads(candidate) if candidate is not None else None
+
+
+def topic(i: int) -> dict:
+    return {"type": "TOPIC", "name": f"Topic {i}",
+            "subtopics": [{"type": "SUBTOPIC", "name": f"Subtopic {i}.{j}", "description": "Read chapter notes."}
+                          for j in range(3)]}
+
+
+def deep_unclosed(n_bytes: int) -> str:
+    return "Sure, here is the roadmap:\n" + "[" * n_bytes
+
+
+def deep_invalid(n_bytes: int) -> str:
+    depth = n_bytes // 4
+    return "[1, " * depth + "oops" + "]" * depth
+
+
+def many_spans(n_bytes: int) -> str:
+    parts, size = [], 0
+    while size < n_bytes:
+        part = '{"k": %d}, oops ' % len(parts)
+        parts.append(part)
+        size += len(part)
+    return "Result: [" + "".join(parts) + "]"
+
+
+def truncated(n_bytes: int) -> str:
+    items, size = [], 0
+    while size < n_bytes:
+        items.append(json.dumps(topic(len(items))))
+        size += len(items[-1]) + 2
+    text = "[" + ", ".join(items) + "]"
+    return text[:n_bytes]
+
+
+def valid_fenced(n_bytes: int) -> str:
+    items, size = [], 0
+    while size < n_bytes:
+        items.append(topic(len(items)))
+        size += len(json.dumps(items[-1]))
+    return "```json\n" + json.dumps(items) + "\n```"
+
+
+INPUTS = {"deep-unclosed": deep_unclosed, "deep-invalid": deep_invalid, "many-spans": many_spans,
+          "truncated": truncated, "valid-fenced": valid_fenced}
+
+
+def per_call(fn, text: str, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(text)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def describe(value) -> str:
+    if value is None:
+        return "None"
+    if isinstance(value, list):
+        return f"list[{len(value)}]"
+    if isinstance(value, dict):
+        return f"dict[{len(value)}]"
+    return type(value).__name__
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb", default="2,8,32", help="input sizes in KB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'input':<14} {'size':>6}  {'legacy':>10}  {'recover':>10}  {'speedup':>8}  legacy -> recover")
+    for kb in (float(k) for k in args.kb.split(",")):
+        for name, make in INPUTS.items():
+            text = make(int(kb * 1024))
+            old, t_old = per_call(legacy, text, args.repeat)
+            new, t_new = per_call(recover_json, text, args.repeat)
+            print(f"{name:<14} {kb:5.0f}K  {t_old * 1e3:8.2f}ms  {t_new * 1e3:8.2f}ms  {t_old / max(t_new, 1e-9):7.1f}x"
+                  f"  {describe(old)} -> {describe(new)}")
+
+
+if __name__ == "__main__":
+    main()
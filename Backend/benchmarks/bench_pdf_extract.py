@@ -0,0 +1,81 @@
+"""
+Benchmark: serial vs process-pool PDF text extraction.
+
+Usage (from Backend/):
+    python benchmarks/bench_pdf_extract.py textbook.pdf
+    python benchmarks/bench_pdf_extract.py textbook.pdf --repeat 3 --workers 2,4,8
+
+--repeat N concatenates the PDF N times (via PyPDF2.PdfWriter) to simulate
+300+ page textbooks from a smaller sample. The "legacy" row is the old
+`text += page_text` loop on one core.
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyPDF2 import PdfReader, PdfWriter  # noqa: E402
+
+import pdf_extract  # noqa: E402
+
+
+def legacy_extract(data: bytes) -> str:
+    reader = PdfReader(io.BytesIO(data))
+    text = ""
+    for page in reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            text += page_text + "\n"
+    return text.strip()
+
+
+def repeat_pdf(data: bytes, times: int) -> bytes:
+    if times <= 1:
+        return data
+    writer = PdfWriter()
+    for _ in range(times):
+        for page in PdfReader(io.BytesIO(data)).pages:
+            writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", default="2,4,8")
+    args = parser.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        data = repeat_pdf(f.read(), args.repeat)
+    n_pages = len(PdfReader(io.BytesIO(data)).pages)
+    print(f"{n_pages} pages, {len(data) / 1e6:.1f} MB")
+
+    text, legacy_s = timed(legacy_extract, data)
+    print(f"{'legacy serial':<18} {legacy_s:7.2f}s  {n_pages / legacy_s:7.1f} pages/s")
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        # fresh pool per setting; warm it up so process start-up is not billed to extraction
+        pdf_extract._pool = None
+        pdf_extract.PDF_EXTRACT_WORKERS = workers
+        pdf_extract.extract_pages(data, max_workers=workers)
+        pages, s = timed(pdf_extract.extract_pages, data, workers)
+        joined = "\n".join(p for p in pages if p).strip()
+        same = "same text" if joined == text else "TEXT DIFFERS"
+        print(f"{'pool x' + str(workers):<18} {s:7.2f}s  {n_pages / s:7.1f} pages/s  ({legacy_s / s:4.1f}x, {same})")
+
+
+if __name__ == "__main__":
+    main()
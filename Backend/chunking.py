@@ -0,0 +1,245 @@
+"""
+Token-aware text chunking.
+
+Chunks are packed from whole sentences up to a token budget (tiktoken), with a
+configurable token overlap between neighbours, and carry character offsets
+into the source text. A sentence longer than the budget is split at word
+boundaries, and a single word longer than the budget into character runs. This replaces word-count chunking, which ignored both the 256-token
+window of the embedding model and the context limits of the LLM.
+
+Public API:
+    count_tokens(text: str) -> int
+    chunk_text_tokens(text, max_tokens=EMBED_CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS) -> List[Chunk]
+    iter_token_chunks(pieces, max_tokens=..., overlap_tokens=..., sep="\\n") -> Iterator[Chunk]   # streaming
+    TokenChunker(max_tokens, overlap_tokens).feed(text) / .flush()                               # incremental
+
+Chunk is (text, start, end, n_tokens) with text == source[start:end]. For
+iter_token_chunks the source is sep.join of the non-empty pieces.
+
+If the tiktoken encoding cannot be loaded (no network on first use, missing
+package) token counts fall back to a regex approximation of BPE tokens.
+"""
+
+import os
+import re
+import logging
+import threading
+from typing import Iterable, Iterator, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", "cl100k_base")
+# all-MiniLM-L6-v2 truncates at 256 word pieces: leave headroom for tokenizer differences
+EMBED_CHUNK_TOKENS = int(os.getenv("EMBED_CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+# sentence ends (. ! ? plus closing quotes/brackets, then whitespace) and paragraph breaks
+_SPLIT_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*\n")
+_WORD_RE = re.compile(r"\S+")
+_APPROX_TOKEN_RE = re.compile(r"\w{1,6}|[^\w\s]")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+class Chunk(NamedTuple):
+    text: str
+    start: int  # character offset of text in the source
+    end: int
+    n_tokens: int
+
+
+class _ApproxEncoding:
+    """Regex stand-in for a BPE encoding: ~1 token per short word / 6-char word piece / punctuation mark."""
+
+    def encode_ordinary_batch(self, texts: List[str]) -> List[List[str]]:
+        return [_APPROX_TOKEN_RE.findall(t) for t in texts]
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(CHUNK_ENCODING)
+                except Exception as e:
+                    logger.warning(f"tiktoken encoding {CHUNK_ENCODING} unavailable, approximating token counts: {e}")
+                    _encoding = _ApproxEncoding()
+    return _encoding
+
+
+def _token_counts(texts: List[str]) -> List[int]:
+    if not texts:
+        return []
+    return [len(t) for t in _get_encoding().encode_ordinary_batch(texts)]
+
+
+def count_tokens(text: str) -> int:
+    return _token_counts([text])[0]
+
+
+class _Span(NamedTuple):
+    start: int
+    end: int
+    n_tokens: int
+
+
+class TokenChunker:
+    """
+    Incremental sentence packer. feed() text as it arrives and collect the chunks it
+    completes; flush() at the end emits the remainder. Only the unfinished sentence and
+    the current chunk are buffered.
+    """
+
+    def __init__(self, max_tokens: int = EMBED_CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+        self._buf = ""
+        self._base = 0          # source offset of _buf[0]
+        self._scan = 0          # source offset where the unfinished sentence starts
+        self._cur: List[_Span] = []
+        self._cur_tokens = 0
+        self._fresh = 0         # sentences in _cur not yet part of an emitted chunk
+        # an unfinished "sentence" longer than this is cut at a word boundary (bounds the buffer)
+        self._max_pending_chars = max_tokens * 16
+
+    def feed(self, text: str) -> List[Chunk]:
+        if not text:
+            return []
+        self._buf += text
+        local_scan = self._scan - self._base
+        spans = []
+        for m in _SPLIT_RE.finditer(self._buf, local_scan):
+            spans.append((local_scan, m.start()))
+            local_scan = m.end()
+        if len(self._buf) - local_scan > self._max_pending_chars:
+            cut = max(self._buf.rfind(" ", local_scan), self._buf.rfind("\n", local_scan))
+            if cut > local_scan:
+                spans.append((local_scan, cut))
+                local_scan = cut + 1
+        self._scan = self._base + local_scan
+        return self._pack(spans)
+
+    def flush(self) -> List[Chunk]:
+        local_scan = self._scan - self._base
+        out = self._pack([(local_scan, len(self._buf))])
+        self._scan = self._base + len(self._buf)
+        if self._fresh:
+            out.append(self._emit())
+        self._cur, self._cur_tokens, self._fresh = [], 0, 0
+        return out
+
+    def _sentences(self, spans) -> List[_Span]:
+        """Strip spans, count their tokens in one batch and split sentences over the budget into word runs."""
+        stripped = []
+        for s, e in spans:
+            piece = self._buf[s:e]
+            lead = len(piece) - len(piece.lstrip())
+            trail = len(piece.rstrip())
+            if trail > lead:
+                stripped.append((s + lead, s + trail))
+        counts = _token_counts([self._buf[s:e] for s, e in stripped])
+        out: List[_Span] = []
+        for (s, e), n in zip(stripped, counts):
+            if n <= self.max_tokens:
+                out.append(_Span(self._base + s, self._base + e, n))
+            else:
+                out.extend(self._split_long(s, e))
+        return out
+
+    def _split_long(self, s: int, e: int) -> List[_Span]:
+        spans = [(m.start(), m.end()) for m in _WORD_RE.finditer(self._buf, s, e)]
+        words = []
+        for (ws, we), n in zip(spans, _token_counts([" " + self._buf[ws:we] for ws, we in spans])):
+            if n <= self.max_tokens:
+                words.append((ws, we, n))
+            else:
+                words.extend(self._split_word(ws, we, n))
+        out: List[_Span] = []
+        run_start, run_end, run_tokens = None, None, 0
+        for ws, we, n in words:
+            if run_start is not None and run_tokens + n > self.max_tokens:
+                out.append(_Span(self._base + run_start, self._base + run_end, run_tokens))
+                run_start, run_tokens = None, 0
+            if run_start is None:
+                run_start = ws
+            run_end = we
+            run_tokens += n
+        if run_start is not None:
+            out.append(_Span(self._base + run_start, self._base + run_end, run_tokens))
+        return out
+
+    def _split_word(self, s: int, e: int, n: int):
+        """Cut a word over the budget into character runs of at most max_tokens tokens (one character at worst)."""
+        out = []
+        while s < e:
+            step = e - s
+            while step > 1 and n > self.max_tokens:
+                # shrink in proportion to the overshoot, always by at least one character
+                step = max(1, min(step - 1, step * self.max_tokens // n))
+                n = count_tokens(" " + self._buf[s:s + step])
+            out.append((s, s + step, n))
+            s += step
+            if s < e:
+                n = count_tokens(" " + self._buf[s:e])
+        return out
+
+    def _pack(self, spans) -> List[Chunk]:
+        out: List[Chunk] = []
+        for sent in self._sentences(spans):
+            if self._fresh and self._cur_tokens + sent.n_tokens > self.max_tokens:
+                out.append(self._emit())
+                self._carry_overlap(sent.n_tokens)
+            self._cur.append(sent)
+            self._cur_tokens += sent.n_tokens
+            self._fresh += 1
+        self._trim()
+        return out
+
+    def _emit(self) -> Chunk:
+        start, end = self._cur[0].start, self._cur[-1].end
+        return Chunk(self._buf[start - self._base:end - self._base], start, end, self._cur_tokens)
+
+    def _carry_overlap(self, next_tokens: int) -> None:
+        """Keep trailing sentences (up to overlap_tokens) of the emitted chunk as the start of the next one."""
+        keep: List[_Span] = []
+        tokens = 0
+        for sent in reversed(self._cur[1:]):
+            if tokens + sent.n_tokens > self.overlap_tokens or tokens + sent.n_tokens + next_tokens > self.max_tokens:
+                break
+            keep.append(sent)
+            tokens += sent.n_tokens
+        keep.reverse()
+        self._cur, self._cur_tokens, self._fresh = keep, tokens, 0
+
+    def _trim(self) -> None:
+        # drop buffered text nothing refers to any more
+        keep_from = self._cur[0].start if self._cur else self._scan
+        cut = keep_from - self._base
+        if cut > 4096:
+            self._buf = self._buf[cut:]
+            self._base = keep_from
+
+
+def chunk_text_tokens(text: str, max_tokens: int = EMBED_CHUNK_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Chunk]:
+    """Split text into sentence-aligned chunks of at most max_tokens tokens (offsets index `text`)."""
+    chunker = TokenChunker(max_tokens, overlap_tokens)
+    return chunker.feed(text) + chunker.flush()
+
+
+def iter_token_chunks(pieces: Iterable[str], max_tokens: int = EMBED_CHUNK_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS, sep: str = "\n") -> Iterator[Chunk]:
+    """Chunk a stream of text pieces (e.g. PDF pages) as they arrive; offsets index sep.join(non-empty pieces)."""
+    chunker = TokenChunker(max_tokens, overlap_tokens)
+    first = True
+    for piece in pieces:
+        if not piece:
+            continue
+        yield from chunker.feed(piece if first else sep + piece)
+        first = False
+    yield from chunker.flush()
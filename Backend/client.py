@@ -221,14 +221,18 @@
 # src/api/client.py
 import os
 import json
-import re
-import requests
-from typing import Any, Dict, List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
 
+from llm_cache import response_cache
+from llm_gateway import LLMGatewayError, chat_completion, chat_completion_async, chat_completion_stream_async
+from partial_json import ArrayElementStream, recover_json
+from semantic_cache import roadmap_semantic_cache
+from singleflight import SingleFlight, flight_key
+
 load_dotenv()
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 if not OPENROUTER_API_KEY:
@@ -236,43 +240,6 @@ if not OPENROUTER_API_KEY:
 
 # ---- Helpers for extraction + validation ----
 
-def _extract_json(text: str) -> Optional[str]:
-    """Try to find and return the largest JSON array/object substring that parses."""
-    text = text.strip()
-    # quick direct parse
-    try:
-        json.loads(text)
-        return text
-    except Exception:
-        pass
-
-    # find candidate brackets/braces spans and test them (prefer long)
-    candidates = []
-    stack = []
-    pairs = {"{": "}", "[": "]"}
-    opens = set(pairs.keys())
-    closes = set(pairs.values())
-
-    for i, ch in enumerate(text):
-        if ch in opens:
-            stack.append((ch, i))
-        elif ch in closes and stack:
-            open_ch, start_idx = stack.pop()
-            # ensure matching pair
-            if pairs[open_ch] == ch:
-                candidate = text[start_idx:i+1]
-                candidates.append(candidate)
-
-    candidates.sort(key=len, reverse=True)
-    for c in candidates:
-        try:
-            json.loads(c)
-            return c
-        except Exception:
-            continue
-
-    return None
-
 def _validate_and_repair_topic(obj: Dict[str, Any]) -> Dict[str, Any]:
     """
     Ensure returned topic object has exactly:
@@ -394,33 +361,12 @@ def _validate_parsed(parsed: Any, raw_text: str) -> List[Dict[str, Any]]:
 
 # ---- Main function that talks to OpenRouter ----
 
-def generate_api_response(context: str, query: str, model: str = "openai/gpt-4o-mini") -> List[Dict[str, Any]]:
-    """
-    Call OpenRouter and return a validated List[TopicObjects] exactly matching the structure:
-    [
-      {
-        "type": "TOPIC",
-        "name": "...",
-        "subtopics": [
-          {"type":"SUBTOPIC","name":"...",content":"..."},
-          ...
-        ]
-      },
-      ...
-    ]
-    """
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    # Strict instruction to force the format you provided
-    system_prompt = (
-        "You are an assistant that MUST output only valid JSON (no markdown, no backticks, no explanations outside JSON). "
-        "The top-level value MUST be a JSON ARRAY. Each array element MUST be an OBJECT with exactly these keys:\n"
-        '  "type": "TOPIC",\n'
-        '  "name": "Short topic name",\n'
-        '  "subtopics": [ { "type": "SUBTOPIC", "name": "Short subtopic name", "content": "2–4 sentences of clear, beginner-friendly explanation that includes (1) what it is, (2) one concrete example, and (3) why it matters." } ]\n'
+ROADMAP_SYSTEM_PROMPT = (
+    "You are an assistant that MUST output only valid JSON (no markdown, no backticks, no explanations outside JSON). "
+    "The top-level value MUST be a JSON ARRAY. Each array element MUST be an OBJECT with exactly these keys:\n"
+    '  "type": "TOPIC",\n'
+    '  "name": "Short topic name",\n'
+    '  "subtopics": [ { "type": "SUBTOPIC", "name": "Short subtopic name", "content": "2–4 sentences of clear, beginner-friendly explanation that includes (1) what it is, (2) one concrete example, and (3) why it matters." } ]\n'
     "\nSTRICT RULES:\n"
     "1) Output JSON only. No prose, no preface, no trailing commentary.\n"
     "2) Top-level MUST be an array.\n"
@@ -434,61 +380,182 @@ def generate_api_response(context: str, query: str, model: str = "openai/gpt-4o-
     "10) Stay within the requested subject and audience level.\n"
 )
 
+ROADMAP_TEMPERATURE = 0.2
+ROADMAP_MAX_TOKENS = 2400
 
+
+def _roadmap_messages(context: str, query: str) -> List[dict]:
     user_prompt = f"Subject: {query}\n\nContext (optional):\n{context}\n\nReturn an ARRAY of topic objects only."
+    return [
+        {"role": "system", "content": ROADMAP_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "temperature": 0.2,
-        "max_tokens": 2400
-    }
 
-    try:
-        resp = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        # Always return a list so callers don't break
-        return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": f"Request failed: {str(e)}", "content": ""}]}]
+def _error_topics(message: str) -> List[Dict[str, Any]]:
+    # Always return a list so callers don't break
+    return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": message, "content": ""}]}]
 
-    # get assistant text
-    try:
-        data = resp.json()
-    except Exception:
-        return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": f"Invalid JSON response from API: {resp.text[:500]}", "content": ""}]}]
 
-    assistant_text = ""
-    try:
-        assistant_text = data["choices"][0]["message"]["content"] or ""
-    except Exception:
-        try:
-            assistant_text = data["choices"][0]["text"] or ""
-        except Exception:
-            assistant_text = ""
+def _is_error_topics(topics: List[Dict[str, Any]]) -> bool:
+    """True for the RESOURCE placeholders returned when the model output was unusable."""
+    return not topics or all(t.get("name") == "RESOURCE" for t in topics)
+
+
+def _roadmap_cache_key(messages: List[dict], model: str) -> str:
+    return response_cache.key_for_messages(model, messages, ROADMAP_TEMPERATURE, ROADMAP_MAX_TOKENS)
+
+
+def _lookup_roadmap(key: str, context: str, query: str, model: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Exact-match cache first, then (subject-only requests) the semantic cache of
+    earlier subjects; a semantic hit is copied into the exact cache for next time.
+    """
+    cached = response_cache.get(key)
+    if cached is None and not context.strip():
+        cached = roadmap_semantic_cache.lookup(query, namespace=model)
+        if cached is not None:
+            response_cache.put(key, cached)
+    return cached
+
+
+def _remember_roadmap(key: str, context: str, query: str, model: str, topics: List[Dict[str, Any]]) -> None:
+    if _is_error_topics(topics):
+        return
+    response_cache.put(key, topics)
+    if not context.strip():
+        roadmap_semantic_cache.add(query, topics, namespace=model)
 
-    assistant_text = assistant_text.strip()
 
+def _parse_roadmap(assistant_text: str) -> List[Dict[str, Any]]:
+    """Parse + validate the assistant text into the topic list structure."""
     # direct parse
     try:
         parsed = json.loads(assistant_text)
         validated = _validate_parsed(parsed, assistant_text)
         return validated
     except json.JSONDecodeError:
-        # try to extract JSON substring
-        candidate = _extract_json(assistant_text)
-        if candidate:
-            try:
-                parsed = json.loads(candidate)
-                validated = _validate_parsed(parsed, assistant_text)
-                return validated
-            except json.JSONDecodeError:
-                return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": f"Malformed JSON: {assistant_text[:500]}", "content": ""}]}]
+        # recover the outermost array/object (code fences, prose around it, truncated tail)
+        parsed = recover_json(assistant_text)
+        if parsed is not None:
+            return _validate_parsed(parsed, assistant_text)
         # fallback: return raw as RESOURCE
         snippet = assistant_text if len(assistant_text) <= 1000 else assistant_text[:997] + "..."
-        return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": snippet, "content": ""}]}]
+        return _error_topics(snippet)
 
 
+_roadmap_flight = SingleFlight("roadmap")
 
+
+def generate_api_response(context: str, query: str, model: str = "openai/gpt-4o-mini") -> List[Dict[str, Any]]:
+    """
+    Call OpenRouter and return a validated List[TopicObjects] exactly matching the structure:
+    [
+      {
+        "type": "TOPIC",
+        "name": "...",
+        "subtopics": [
+          {"type":"SUBTOPIC","name":"...",content":"..."},
+          ...
+        ]
+      },
+      ...
+    ]
+    Validated results are served from / stored in the LLM response cache and, for
+    subject-only requests, the semantic cache of earlier subjects. Identical concurrent
+    calls share one upstream request.
+    """
+    key = flight_key(model, context, query)
+    return _roadmap_flight.do(key, _generate_api_response, context, query, model)
+
+
+def _generate_api_response(context: str, query: str, model: str) -> List[Dict[str, Any]]:
+    messages = _roadmap_messages(context, query)
+    key = _roadmap_cache_key(messages, model)
+    cached = _lookup_roadmap(key, context, query, model)
+    if cached is not None:
+        return cached
+    try:
+        assistant_text = chat_completion(
+            messages,
+            model=model,
+            temperature=ROADMAP_TEMPERATURE,
+            max_tokens=ROADMAP_MAX_TOKENS,
+        )
+    except LLMGatewayError as e:
+        return _error_topics(str(e))
+
+    topics = _parse_roadmap(assistant_text)
+    _remember_roadmap(key, context, query, model, topics)
+    return topics
+
+
+async def generate_api_response_async(context: str, query: str, model: str = "openai/gpt-4o-mini") -> List[Dict[str, Any]]:
+    """Async variant of generate_api_response for FastAPI routes (does not block a worker thread)."""
+    key = flight_key(model, context, query)
+    return await _roadmap_flight.do_async(key, _generate_api_response_async, context, query, model)
+
+
+async def _generate_api_response_async(context: str, query: str, model: str) -> List[Dict[str, Any]]:
+    messages = _roadmap_messages(context, query)
+    key = _roadmap_cache_key(messages, model)
+    cached = await asyncio.to_thread(_lookup_roadmap, key, context, query, model)
+    if cached is not None:
+        return cached
+    try:
+        assistant_text = await chat_completion_async(
+            messages,
+            model=model,
+            temperature=ROADMAP_TEMPERATURE,
+            max_tokens=ROADMAP_MAX_TOKENS,
+        )
+    except LLMGatewayError as e:
+        return _error_topics(str(e))
+
+    topics = _parse_roadmap(assistant_text)
+    # the cache writes may embed the query (CPU) and touch sqlite: keep them off the event loop
+    await asyncio.to_thread(_remember_roadmap, key, context, query, model, topics)
+    return topics
+
+
+async def generate_api_response_stream(context: str, query: str, model: str = "openai/gpt-4o-mini") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of generate_api_response: yields each validated topic as soon as its
+    object closes in the model's output, instead of after the whole array.
+    If no array element could be streamed (e.g. the model answered with a single object),
+    the full text goes through the regular parser at the end.
+    A cached roadmap is replayed at once; a completed stream is stored in the cache.
+    """
+    messages = _roadmap_messages(context, query)
+    key = _roadmap_cache_key(messages, model)
+    cached = await asyncio.to_thread(_lookup_roadmap, key, context, query, model)
+    if cached is not None:
+        for topic in cached:
+            yield topic
+        return
+
+    stream = ArrayElementStream()
+    parts: List[str] = []
+    emitted: List[Dict[str, Any]] = []
+    try:
+        async for delta in chat_completion_stream_async(
+            messages,
+            model=model,
+            temperature=ROADMAP_TEMPERATURE,
+            max_tokens=ROADMAP_MAX_TOKENS,
+        ):
+            parts.append(delta)
+            for element in stream.feed(delta):
+                for topic in _validate_parsed([element], ""):
+                    emitted.append(topic)
+                    yield topic
+    except LLMGatewayError as e:
+        for topic in _error_topics(str(e)):
+            yield topic
+        return
+
+    if not emitted:
+        for topic in _parse_roadmap("".join(parts).strip()):
+            emitted.append(topic)
+            yield topic
+    await asyncio.to_thread(_remember_roadmap, key, context, query, model, emitted)
@@ -5,6 +5,11 @@ using OpenRouter chat completions. Drop this file into your project and import
 
 Public API:
     generate_subtopic_items(subtopic: str, context: str = "", model: str = "openai/gpt-3.5-turbo", min_items: int = 6) -> List[Dict[str,str]]
+    generate_subtopic_items_async(...)  # same arguments, awaitable (uses the pooled llm_gateway)
+
+Parsed results are kept in the exact-match LLM response cache (llm_cache.py),
+so repeated subtopics skip the model call, and identical concurrent calls share
+one request (singleflight.py).
 
 Each returned item has the shape:
     {"type": "QA" | "STUDY", "content": "..."}
@@ -16,14 +21,16 @@ fails.
 
 import os
 import json
-import re
-import requests
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from llm_cache import response_cache
+from llm_gateway import LLMGatewayError, chat_completion, chat_completion_async
+from partial_json import recover_json
+from singleflight import SingleFlight, flight_key
+
 load_dotenv()
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 if not OPENROUTER_API_KEY:
@@ -32,43 +39,6 @@ if not OPENROUTER_API_KEY:
 
 # ------------------ Utility helpers ------------------
 
-def _extract_json(text: str) -> Optional[str]:
-    """Return the largest JSON object/array substring that successfully parses.
-    If nothing parses, return None.
-    """
-    text = (text or "").strip()
-    # Quick try: the whole text
-    try:
-        json.loads(text)
-        return text
-    except Exception:
-        pass
-
-    candidates: List[str] = []
-    stack: List[tuple[str, int]] = []
-    pairs = {"{": "}", "[": "]"}
-    opens = set(pairs.keys())
-    closes = set(pairs.values())
-
-    for i, ch in enumerate(text):
-        if ch in opens:
-            stack.append((ch, i))
-        elif ch in closes and stack:
-            open_ch, start_idx = stack.pop()
-            if pairs.get(open_ch) == ch:
-                candidates.append(text[start_idx:i + 1])
-
-    candidates.sort(key=len, reverse=True)
-    for c in candidates:
-        try:
-            json.loads(c)
-            return c
-        except Exception:
-            continue
-
-    return None
-
-
 def _validate_subtopic_items(parsed: Any, raw_text: str) -> List[Dict[str, str]]:
     """Normalize parsed model output into a list of {type, content} dicts.
 
@@ -131,112 +101,69 @@ def _validate_subtopic_items(parsed: Any, raw_text: str) -> List[Dict[str, str]]
 
 # ------------------ Public API ------------------
 
-# inside src/api/subtopic_items.py (replace previous generate_subtopic_items)
-def generate_subtopic_items(
-    subtopic: str,
-    context: str = "",
-    model: str = "openai/gpt-3.5-turbo",
-    min_items: int = 6,
-    temperature: float = 0.9,
-    max_tokens: int = 2400,
-    raise_on_error: bool = False,
-) -> List[Dict[str, str]]:
-    """
-    Generate QA / STUDY items (safe: no import-time exceptions).
-    If raise_on_error=True, it will re-raise caught exceptions (useful for local debugging).
-    """
-    # validate API key at call-time, not import-time
-    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-    if not OPENROUTER_API_KEY:
-        msg = "OPENROUTER_API_KEY not set in environment"
-        if raise_on_error:
-            raise RuntimeError(msg)
-        return [{"type": "STUDY", "content": msg}]
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-    }
-    system_prompt = (
-        "You are an assistant that MUST output only valid JSON (no markdown, no explanations). "
-        "Output a JSON ARRAY. Each array element must be an OBJECT with exactly these keys:\n"
-        '  \"type\": \"SUBTOPIC\",\n'
-        '  \"name\": \"Short subtopic name\",\n'
-        '  \"content\": \"detailed learning content for this subtopic\"\n\n'
-        "Rules:\n"
-        "1) make the content sound like a teacher make it extremely detailed do one paragraph per point, use real world examples and explain in detail\n"
-
-        "2) Each object must have type exactly 'SUBTOPIC'.\n"
-        "3) Do NOT include any additional top-level keys.\n"
-        "4) The 'content' field must contain at least 1-3 detailed points, detailed explanation, or key concepts.\n"
-        "5) Keep names concise. Do not include explanations outside the JSON.\n"
-        "6)Give code snippets and real world examples whenever its a computer science topic "
-        "7) Give Atleast 5 content jsons for each subtopic.\n"
-        "8) Give Atleast 2 question jsons for each subtopic\n"
-        "9)Top-level value MUST be an ARRAY even if it contains one element. \n"
-        
-    )
+SUBTOPIC_SYSTEM_PROMPT = (
+    "You are an assistant that MUST output only valid JSON (no markdown, no explanations). "
+    "Output a JSON ARRAY. Each array element must be an OBJECT with exactly these keys:\n"
+    '  \"type\": \"SUBTOPIC\",\n'
+    '  \"name\": \"Short subtopic name\",\n'
+    '  \"content\": \"detailed learning content for this subtopic\"\n\n'
+    "Rules:\n"
+    "1) make the content sound like a teacher make it extremely detailed do one paragraph per point, use real world examples and explain in detail\n"
+
+    "2) Each object must have type exactly 'SUBTOPIC'.\n"
+    "3) Do NOT include any additional top-level keys.\n"
+    "4) The 'content' field must contain at least 1-3 detailed points, detailed explanation, or key concepts.\n"
+    "5) Keep names concise. Do not include explanations outside the JSON.\n"
+    "6)Give code snippets and real world examples whenever its a computer science topic "
+    "7) Give Atleast 5 content jsons for each subtopic.\n"
+    "8) Give Atleast 2 question jsons for each subtopic\n"
+    "9)Top-level value MUST be an ARRAY even if it contains one element. \n"
 
+)
+
+
+def _subtopic_messages(subtopic: str, context: str) -> List[dict]:
     user_prompt = (
         f"Subtopic: {subtopic}\n"
         f"Context (optional): {context}\n\n"
         "Return an ARRAY of subtopic objects only, each with a 'name' and meaningful 'content'. "
-        
-    )
 
-    # (system_prompt and user_prompt same as earlier file)
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "temperature": temperature,
-        "max_tokens": max_tokens
-    }
+    )
+    return [
+        {"role": "system", "content": SUBTOPIC_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
 
-    try:
-        resp = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
-        # network/API error: return an item that makes debugging visible
-        err_msg = f"API request failed: {e}"
-        if raise_on_error:
-            raise
-        return [{"type": "STUDY", "content": err_msg}]
-    except Exception as e:
-        if raise_on_error:
-            raise
-        return [{"type": "STUDY", "content": f"Unexpected error: {e}"}]
 
-    # extract assistant text
-    assistant_text = ""
-    try:
-        assistant_text = data["choices"][0]["message"]["content"] or ""
-    except Exception:
-        assistant_text = data.get("choices", [{}])[0].get("text", "") or ""
+def _missing_key_items(raise_on_error: bool) -> Optional[List[Dict[str, str]]]:
+    # validate API key at call-time, not import-time
+    if os.getenv("OPENROUTER_API_KEY"):
+        return None
+    msg = "OPENROUTER_API_KEY not set in environment"
+    if raise_on_error:
+        raise RuntimeError(msg)
+    return [{"type": "STUDY", "content": msg}]
 
-    assistant_text = (assistant_text or "").strip()
 
-    # parse and validate (reuse _extract_json and _validate_subtopic_items)
+def _parse_subtopic_items(assistant_text: str, subtopic: str, raise_on_error: bool) -> Tuple[List[Dict[str, str]], bool]:
+    """
+    Parse, validate and normalize the assistant text into QA / STUDY items.
+    Returns (items, ok); ok is False when the items are a fallback for unusable output.
+    """
+    # parse and validate (recover_json handles fences, surrounding prose and truncation)
     try:
         parsed = json.loads(assistant_text)
         items = _validate_subtopic_items(parsed, assistant_text)
     except json.JSONDecodeError:
-        candidate = _extract_json(assistant_text)
-        if candidate:
-            try:
-                parsed = json.loads(candidate)
-                items = _validate_subtopic_items(parsed, assistant_text)
-            except json.JSONDecodeError:
-                items = [{"type": "STUDY", "content": assistant_text or "Malformed JSON returned by model"}]
+        parsed = recover_json(assistant_text)
+        if parsed is not None:
+            items = _validate_subtopic_items(parsed, assistant_text)
         else:
             items = [{"type": "STUDY", "content": assistant_text or "No JSON returned by model"}]
     except Exception as e:
         if raise_on_error:
             raise
-        return [{"type": "STUDY", "content": f"Parsing/validation error: {e}"}]
+        return [{"type": "STUDY", "content": f"Parsing/validation error: {e}"}], False
 
     # normalize types & content
     normalized = []
@@ -248,10 +175,115 @@ def generate_subtopic_items(
             normalized.append({"type": t_norm, "content": content})
 
     if not normalized:
-        normalized = [{"type": "STUDY", "content": f"No generated content for subtopic: {subtopic}"}]
+        return [{"type": "STUDY", "content": f"No generated content for subtopic: {subtopic}"}], False
+
+    return normalized, parsed is not None
+
 
-    return normalized
+def _cached_items(messages: List[dict], model: str, temperature: float, max_tokens: int):
+    """Cache key for this request and the cached items, if any."""
+    key = response_cache.key_for_messages(model, messages, temperature, max_tokens)
+    return key, response_cache.get(key)
 
-    
-    # return generate_subtopic_items(context, query)
 
+_content_flight = SingleFlight("content")
+
+
+def generate_subtopic_items(
+    subtopic: str,
+    context: str = "",
+    model: str = "openai/gpt-3.5-turbo",
+    min_items: int = 6,
+    temperature: float = 0.9,
+    max_tokens: int = 2400,
+    raise_on_error: bool = False,
+) -> List[Dict[str, str]]:
+    """
+    Generate QA / STUDY items (safe: no import-time exceptions).
+    If raise_on_error=True, it will re-raise caught exceptions (useful for local debugging).
+    Identical concurrent calls share one upstream request.
+    """
+    missing = _missing_key_items(raise_on_error)
+    if missing:
+        return missing
+
+    key = flight_key(model, context, subtopic, temperature, max_tokens, raise_on_error)
+    return _content_flight.do(key, _generate_subtopic_items, subtopic, context, model, temperature, max_tokens, raise_on_error)
+
+
+def _generate_subtopic_items(subtopic: str, context: str, model: str, temperature: float, max_tokens: int,
+                             raise_on_error: bool) -> List[Dict[str, str]]:
+    messages = _subtopic_messages(subtopic, context)
+    key, cached = _cached_items(messages, model, temperature, max_tokens)
+    if cached is not None:
+        return cached
+
+    try:
+        assistant_text = chat_completion(
+            messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+    except LLMGatewayError as e:
+        # network/API error: return an item that makes debugging visible
+        if raise_on_error:
+            raise
+        return [{"type": "STUDY", "content": f"API request failed: {e}"}]
+    except Exception as e:
+        if raise_on_error:
+            raise
+        return [{"type": "STUDY", "content": f"Unexpected error: {e}"}]
+
+    items, ok = _parse_subtopic_items(assistant_text, subtopic, raise_on_error)
+    if ok:
+        response_cache.put(key, items)
+    return items
+
+
+async def generate_subtopic_items_async(
+    subtopic: str,
+    context: str = "",
+    model: str = "openai/gpt-3.5-turbo",
+    min_items: int = 6,
+    temperature: float = 0.9,
+    max_tokens: int = 2400,
+    raise_on_error: bool = False,
+) -> List[Dict[str, str]]:
+    """Async variant of generate_subtopic_items for FastAPI routes."""
+    missing = _missing_key_items(raise_on_error)
+    if missing:
+        return missing
+
+    key = flight_key(model, context, subtopic, temperature, max_tokens, raise_on_error)
+    return await _content_flight.do_async(key, _generate_subtopic_items_async, subtopic, context, model, temperature,
+                                          max_tokens, raise_on_error)
+
+
+async def _generate_subtopic_items_async(subtopic: str, context: str, model: str, temperature: float, max_tokens: int,
+                                         raise_on_error: bool) -> List[Dict[str, str]]:
+    messages = _subtopic_messages(subtopic, context)
+    key, cached = _cached_items(messages, model, temperature, max_tokens)
+    if cached is not None:
+        return cached
+
+    try:
+        assistant_text = await chat_completion_async(
+            messages,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+    except LLMGatewayError as e:
+        if raise_on_error:
+            raise
+        return [{"type": "STUDY", "content": f"API request failed: {e}"}]
+    except Exception as e:
+        if raise_on_error:
+            raise
+        return [{"type": "STUDY", "content": f"Unexpected error: {e}"}]
+
+    items, ok = _parse_subtopic_items(assistant_text, subtopic, raise_on_error)
+    if ok:
+        response_cache.put(key, items)
+    return items
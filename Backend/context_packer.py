@@ -0,0 +1,133 @@
+"""
+Token-budgeted context packing for LLM prompts.
+
+Routes used to join retrieval hits and then cut the string at a fixed
+character count, which could split blocks mid-sentence and had no relation
+to the model's tokens. pack_context() fills an exact token budget instead:
+
+  1. mandatory blocks (recent messages, the latest query) always go in; if they
+     alone exceed the budget the oldest ones are cut to their last sentences
+  2. ranked hits are added in relevance order while they fit; a hit that does
+     not fit is cut at a sentence boundary if enough budget is left, otherwise skipped
+  3. output is hits (most relevant first) followed by the mandatory blocks
+
+Public API:
+    context_budget(model, reserve_tokens=0, budget=CONTEXT_TOKEN_BUDGET) -> int
+    pack_context(ranked, mandatory=(), budget_tokens=CONTEXT_TOKEN_BUDGET, sep="\\n\\n") -> PackedContext
+
+Budgets are deliberately small: prompt tokens dominate latency and cost, and a
+handful of well-chosen blocks answers as well as a full context window.
+"""
+
+import os
+from typing import List, NamedTuple, Sequence
+
+from chunking import chunk_text_tokens, count_tokens
+
+# Context tokens per prompt (retrieved + mandatory blocks, excluding system prompt and question)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Don't bother squeezing a partial block into less than this many tokens
+MIN_PARTIAL_TOKENS = int(os.getenv("CONTEXT_MIN_PARTIAL_TOKENS", "64"))
+
+# Context windows of the models we call; unknown models get the smallest one
+MODEL_CONTEXT_WINDOWS = {
+    "openai/gpt-4o-mini": 128000,
+    "openai/gpt-4o": 128000,
+    "openai/gpt-3.5-turbo": 16385,
+}
+_DEFAULT_WINDOW = min(MODEL_CONTEXT_WINDOWS.values())
+# system prompt, question and message framing
+_PROMPT_OVERHEAD_TOKENS = 512
+
+
+class PackedContext(NamedTuple):
+    text: str
+    n_tokens: int
+    hits_used: int      # ranked blocks included (whole or cut)
+    hits_dropped: int   # ranked blocks left out for lack of budget
+
+
+def context_budget(model: str, reserve_tokens: int = 0, budget: int = CONTEXT_TOKEN_BUDGET) -> int:
+    """Context tokens for `model`: the configured budget, capped by what its window leaves after the completion."""
+    window = MODEL_CONTEXT_WINDOWS.get(model, _DEFAULT_WINDOW)
+    return max(0, min(budget, window - reserve_tokens - _PROMPT_OVERHEAD_TOKENS))
+
+
+def _cut(text: str, max_tokens: int, keep_tail: bool = False) -> str:
+    """Longest sentence-aligned prefix (or suffix) of text within max_tokens ("" if none fits)."""
+    if max_tokens <= 0:
+        return ""
+    chunks = chunk_text_tokens(text, max_tokens=max_tokens, overlap_tokens=0)
+    total = 0
+    if keep_tail:
+        start = None
+        for c in reversed(chunks):
+            if total + c.n_tokens > max_tokens:
+                break
+            total += c.n_tokens
+            start = c.start
+        return text[start:].strip() if start is not None else ""
+    end = None
+    for c in chunks:
+        if total + c.n_tokens > max_tokens:
+            break
+        total += c.n_tokens
+        end = c.end
+    return text[:end].strip() if end is not None else ""
+
+
+def pack_context(ranked: Sequence[str], mandatory: Sequence[str] = (), budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+                 sep: str = "\n\n") -> PackedContext:
+    """
+    Fill budget_tokens with mandatory blocks plus as many ranked blocks as fit.
+    ranked is most-relevant-first; mandatory is oldest-first (the last block, usually
+    the query, is the last one to be cut). Duplicate blocks are dropped.
+    """
+    sep_tokens = count_tokens(sep)
+    mandatory = [m for m in mandatory if m and m.strip()]
+    m_counts = [count_tokens(m) for m in mandatory]
+
+    # 1) mandatory blocks: cut the oldest ones first until they fit
+    used = sum(m_counts) + sep_tokens * max(0, len(mandatory) - 1)
+    for i in range(len(mandatory)):
+        if used <= budget_tokens:
+            break
+        over = used - budget_tokens
+        cut = _cut(mandatory[i], m_counts[i] - over, keep_tail=True)
+        new_count = count_tokens(cut) if cut else 0
+        used -= m_counts[i] - new_count + (0 if cut else sep_tokens)
+        mandatory[i], m_counts[i] = cut, new_count
+    mandatory = [m for m in mandatory if m]
+
+    # 2) ranked hits in relevance order
+    seen = set(mandatory)
+    chosen: List[str] = []
+    dropped = 0
+    for i, block in enumerate(ranked):
+        room = budget_tokens - used - sep_tokens
+        if room < MIN_PARTIAL_TOKENS:
+            dropped += len(ranked) - i
+            break
+        if not block or not block.strip() or block in seen:
+            continue
+        seen.add(block)
+        n = count_tokens(block)
+        if n <= room:
+            chosen.append(block)
+            used += n + sep_tokens
+        elif (part := _cut(block, room)):
+            chosen.append(part)
+            used += count_tokens(part) + sep_tokens
+        else:
+            dropped += 1
+
+    # 3) separators can merge into neighbouring tokens: verify on the final text, drop hits if over
+    blocks = chosen + mandatory
+    text = sep.join(blocks)
+    n_tokens = count_tokens(text)
+    while n_tokens > budget_tokens and chosen:
+        chosen.pop()
+        dropped += 1
+        text = sep.join(chosen + mandatory)
+        n_tokens = count_tokens(text)
+    return PackedContext(text, n_tokens, len(chosen), dropped)
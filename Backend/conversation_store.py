@@ -0,0 +1,93 @@
+"""
+Per-conversation vector stores for /general.
+
+Each /general request sends the whole chat (messages, roadmap, events). The
+store for a chat holds exactly the chunks of that request's items: chunks
+are keyed by content hash, only chunks not indexed yet are embedded, and
+rows whose item is gone (an older roadmap version, an edited message) are
+dropped. A search therefore only ever sees live rows.
+
+Stores are copy-on-write: an update builds a new VectorStore from the live
+rows of the cached one plus the fresh embeddings and swaps it into the
+cache, so searches running on the previous store are never disturbed and
+concurrent turns of one chat each get the store for their own items.
+
+Chats are keyed by their explicit conversation_id. Without one the key is a
+hash of the full item set, so two chats that merely start alike never share
+a store (each distinct history builds its own; the embedding cache keeps
+that cheap).
+
+Public API:
+    conversation_key(conversation_id, items) -> str
+    ConversationStores(cache, embed=None, chunk=None)
+    .update(key, items) -> VectorStore | None     # None if nothing could be embedded
+"""
+
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from chunking import CHUNK_OVERLAP_TOKENS, EMBED_CHUNK_TOKENS, chunk_text_tokens
+from vectorstore import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def _sha1(s: str) -> str:
+    return hashlib.sha1(s.encode("utf-8")).hexdigest()
+
+
+def conversation_key(conversation_id: Optional[str], items: List[str]) -> str:
+    """Explicit chat id, else a hash of every item of this request."""
+    if conversation_id:
+        return _sha1(f"conversation-id:{conversation_id}")
+    return _sha1("conversation-items:" + "\0".join(items))
+
+
+def _default_embed(texts: List[str]) -> List[Optional[List[float]]]:
+    # imported lazily: sentence-transformers is only loaded once a store is built
+    from embeddings import embed_chunks
+    return embed_chunks(texts)
+
+
+def _default_chunk(text: str) -> List[str]:
+    return [c.text for c in chunk_text_tokens(text, max_tokens=EMBED_CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)]
+
+
+class ConversationStores:
+    def __init__(self, cache: Any, embed: Optional[Callable[[List[str]], List[Optional[List[float]]]]] = None,
+                 chunk: Optional[Callable[[str], List[str]]] = None):
+        """cache is a BoundedCache (get/put); embed returns one vector or None per text."""
+        self.cache = cache
+        self._embed = embed or _default_embed
+        self._chunk = chunk or _default_chunk
+
+    def update(self, key: str, items: List[str]) -> Optional[VectorStore]:
+        """Store for `key` holding exactly the chunks of `items`, embedding only chunks not seen before."""
+        chunks: Dict[str, str] = {}
+        for item in items:
+            for chunk in self._chunk(item):
+                chunks.setdefault(_sha1(chunk), chunk)
+
+        store = self.cache.get(key)
+        if store is not None and len(store.ids) == len(chunks) and set(store.ids) == set(chunks):
+            return store
+
+        rows = {h: i for i, h in enumerate(store.ids)} if store is not None else {}
+        reused = [h for h in chunks if h in rows]
+        new_ids = [h for h in chunks if h not in rows]
+        vectors = self._embed([chunks[h] for h in new_ids]) if new_ids else []
+        fresh = [(h, emb) for h, emb in zip(new_ids, vectors) if emb is not None]
+
+        dim = store.dim if store is not None else (len(fresh[0][1]) if fresh else 0)
+        if not dim or not (reused or fresh):
+            return None
+        updated = VectorStore(dim=dim, normalize=True)
+        if reused:
+            updated.add([chunks[h] for h in reused], store.vectors[[rows[h] for h in reused]], ids=reused)
+        if fresh:
+            updated.add([chunks[h] for h, _ in fresh], [emb for _, emb in fresh], ids=[h for h, _ in fresh])
+        self.cache.put(key, updated)
+        logger.info(f"Conversation store: embedded {len(fresh)} new chunks, kept {len(reused)}, "
+                    f"dropped {len(rows) - len(reused)} stale")
+        return updated
@@ -13,38 +13,182 @@
 # embeddings_local.py
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import logging
 import math
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
 
 # Choose compact & fast model: 'all-MiniLM-L6-v2' (small, works great)
 # If you have GPU & more RAM, you can pick larger models.
 MODEL_NAME = "all-MiniLM-L6-v2"
 _model = None
 
+# Batch size for ingestion; 64 keeps MiniLM on CPU near peak throughput without big memory spikes
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Embedding cache: in-memory LRU (entries) + optional sqlite file shared by workers (unset = memory only)
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "20000"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of normalized embeddings, keyed by sha1(model name, text).
+    Memory tier is an LRU of float32 arrays; the optional disk tier is a sqlite file
+    (WAL mode) so several worker processes can share it.
+    """
+
+    def __init__(self, max_entries: int = EMBED_CACHE_MAX_ENTRIES, path: str = EMBED_CACHE_PATH):
+        self.max_entries = max_entries
+        self._mem: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Embedding disk cache disabled ({path}): {e}")
+                self._db = None
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for k in keys:
+                vec = self._mem.get(k)
+                if vec is not None:
+                    self._mem.move_to_end(k)
+                    found[k] = vec
+            self.hits += len(found)
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            if missing and self._db is not None:
+                try:
+                    for i in range(0, len(missing), 500):
+                        part = missing[i:i + 500]
+                        rows = self._db.execute(
+                            f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                        ).fetchall()
+                        for k, blob in rows:
+                            vec = np.frombuffer(blob, dtype=np.float32)
+                            found[k] = vec
+                            self._remember(k, vec)
+                            self.disk_hits += 1
+                except sqlite3.Error as e:
+                    logger.warning(f"Embedding disk cache read failed: {e}")
+            self.misses += len([k for k in missing if k not in found])
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        with self._lock:
+            for k, vec in items.items():
+                self._remember(k, vec)
+            if self._db is not None and items:
+                try:
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO embeddings (key, vec) VALUES (?, ?)",
+                        [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()],
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Embedding disk cache write failed: {e}")
+
+    def _remember(self, key: str, vec: np.ndarray):
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._mem),
+                "max_entries": self.max_entries,
+                "disk": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.hits + self.disk_hits) / lookups) if lookups else 0.0,
+            }
+
+
+embedding_cache = EmbeddingCache()
+
+
 def _ensure_model():
     global _model
     if _model is None:
         _model = SentenceTransformer(MODEL_NAME)
     return _model
 
+def _encode_cached(texts: List[str], batch_size: int) -> List[np.ndarray]:
+    """Look texts up in the cache and run the model only on the misses (each distinct text once)."""
+    keys = [EmbeddingCache.key(MODEL_NAME, t) for t in texts]
+    found = embedding_cache.get_many(keys)
+    missing = {k: t for k, t in zip(keys, texts) if k not in found}
+    if missing:
+        model = _ensure_model()
+        embeddings = model.encode(list(missing.values()), batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(missing), -1)
+        # normalize rows to unit vectors (helps cosine similarity)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
+        embeddings = embeddings / norms
+        fresh = dict(zip(missing.keys(), embeddings))
+        embedding_cache.put_many(fresh)
+        found.update(fresh)
+    return [found[k] for k in keys]
+
 def get_embedding(text: str) -> List[float]:
     """
     Return a list[float] embedding for the input text using sentence-transformers.
+    Served from the embedding cache when the same text was embedded before.
     """
-    model = _ensure_model()
-    emb = model.encode(text, show_progress_bar=False, convert_to_numpy=True)
-    # normalize to unit vector (helps cosine similarity)
-    norm = np.linalg.norm(emb) + 1e-12
-    emb = emb / norm
-    return emb.tolist()
+    return _encode_cached([text], batch_size=1)[0].tolist()
 
 def get_embeddings(texts: List[str], batch_size: int = 32) -> List[List[float]]:
     """
     Batch encode texts. Returns list of normalized vectors.
+    Only texts missing from the embedding cache are sent to the model.
+    """
+    if not texts:
+        return []
+    return [emb.tolist() for emb in _encode_cached(texts, batch_size)]
+
+def embed_chunks(texts: List[str], batch_size: int = EMBED_BATCH_SIZE) -> List[Optional[List[float]]]:
     """
-    model = _ensure_model()
-    embeddings = model.encode(texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
-    # normalize rows
-    norms = np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-12
-    embeddings = embeddings / norms
-    return embeddings.tolist()
+    Batch-embed texts for ingestion. Returns a list aligned with `texts`,
+    holding None for any text that failed to embed.
+    A failing batch is retried one text at a time, so a bad chunk only loses itself.
+    """
+    out: List[Optional[List[float]]] = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        try:
+            out.extend(get_embeddings(batch, batch_size=batch_size))
+            continue
+        except Exception as e:
+            logger.warning(f"Batch embedding failed, retrying per chunk: {e}")
+
+        for text in batch:
+            try:
+                out.append(get_embedding(text))
+            except Exception as e:
+                logger.warning(f"Failed to embed chunk: {e}")
+                out.append(None)
+    return out
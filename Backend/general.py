@@ -1,59 +1,98 @@
 import os
-import requests
+from typing import AsyncIterator, List
 from dotenv import load_dotenv
 
+from llm_gateway import LLMGatewayError, chat_completion, chat_completion_async, chat_completion_stream_async
+from singleflight import SingleFlight, flight_key
+
 load_dotenv()
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 if not OPENROUTER_API_KEY:
     raise ValueError("OpenRouter API key not found. Please check your .env file.")
 
+GENERAL_SYSTEM_PROMPT = (
+    "You are an expert teacher. Use the full conversation history below, "
+    "but give **highest priority to the most recent user query** when answering. "
+    "If there are conflicts, resolve them in favor of the latest user input. "
+    "Answer clearly and in detail, writing at least 3 paragraphs. "
+    "Do NOT output JSON or code unless explicitly asked."
+)
+
+GENERAL_MODEL = "openai/gpt-4o-mini"
+GENERAL_TEMPERATURE = 0.9
+GENERAL_MAX_TOKENS = 1200
+
+_general_flight = SingleFlight("general")
+
 
-def generate_general_response(context: str, query: str, model: str = "openai/gpt-4o-mini") -> str:
+def _general_messages(context: str, query: str) -> List[dict]:
+    user_prompt = f"Question: {query}\n\nContext:\n{context if context else 'None'}"
+    return [
+        {"role": "system", "content": GENERAL_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def generate_general_response(context: str, query: str, model: str = GENERAL_MODEL) -> str:
     """
     Calls OpenRouter API and returns a general response to the user's query,
-    optionally using the provided context.
+    optionally using the provided context. Identical concurrent calls share one request.
     """
+    key = flight_key(model, context, query)
+    return _general_flight.do(key, _generate_general_response, context, query, model)
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    system_prompt = (
-        "You are an expert teacher. Use the full conversation history below, "
-        "but give **highest priority to the most recent user query** when answering. "
-        "If there are conflicts, resolve them in favor of the latest user input. "
-        "Answer clearly and in detail, writing at least 3 paragraphs. "
-        "Do NOT output JSON or code unless explicitly asked."
-    )
-    user_prompt = f"Question: {query}\n\nContext:\n{context if context else 'None'}"
 
-    payload = {
-        "model": model,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ],
-        "temperature": 0.9,
-        "max_tokens": 1200
-    }
+def _generate_general_response(context: str, query: str, model: str) -> str:
+    try:
+        assistant_text = chat_completion(
+            _general_messages(context, query),
+            model=model,
+            temperature=GENERAL_TEMPERATURE,
+            max_tokens=GENERAL_MAX_TOKENS,
+        )
+    except LLMGatewayError as e:
+        return str(e)
+
+    return assistant_text or "No response received from the model."
+
+
+async def generate_general_response_async(context: str, query: str, model: str = GENERAL_MODEL) -> str:
+    """Async variant of generate_general_response for FastAPI routes."""
+    key = flight_key(model, context, query)
+    return await _general_flight.do_async(key, _generate_general_response_async, context, query, model)
 
+
+async def _generate_general_response_async(context: str, query: str, model: str) -> str:
     try:
-        resp = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-    except requests.exceptions.RequestException as e:
-        return f"Request failed: {str(e)}"
-    except Exception:
-        return f"Invalid response from API: {resp.text[:500]}"
-
-    # Extract assistant message
+        assistant_text = await chat_completion_async(
+            _general_messages(context, query),
+            model=model,
+            temperature=GENERAL_TEMPERATURE,
+            max_tokens=GENERAL_MAX_TOKENS,
+        )
+    except LLMGatewayError as e:
+        return str(e)
+
+    return assistant_text or "No response received from the model."
+
+
+async def generate_general_response_stream(context: str, query: str, model: str = GENERAL_MODEL) -> AsyncIterator[str]:
+    """Streaming variant: yields the answer in pieces as the model produces them (same prompt and fallbacks)."""
+    received = False
     try:
-        assistant_text = data["choices"][0]["message"]["content"]
-    except Exception:
-        assistant_text = "No response received from the model."
+        async for delta in chat_completion_stream_async(
+            _general_messages(context, query),
+            model=model,
+            temperature=GENERAL_TEMPERATURE,
+            max_tokens=GENERAL_MAX_TOKENS,
+        ):
+            received = True
+            yield delta
+    except LLMGatewayError as e:
+        yield str(e)
+        return
 
-    return assistant_text.strip()
+    if not received:
+        yield "No response received from the model."
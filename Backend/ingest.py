@@ -0,0 +1,129 @@
+"""
+Streaming extract -> chunk -> embed ingestion of a PDF.
+
+Each stage is a generator feeding the next, so the first pages are chunked
+and embedded while the rest of the document is still being extracted:
+
+    pages  (pdf_extract.iter_pages: small leading page ranges first, extracted in the process pool)
+      -> chunks     (chunking.TokenChunker: emitted as soon as a token-budgeted chunk is complete)
+        -> batches  (micro-batches of EMBED_BATCH_SIZE chunks, embedded and appended to the store)
+
+Besides the store itself, only the partial chunk and one micro-batch are
+buffered. The page texts are kept as well: they are the document the caller
+caches and persists. After every micro-batch build_store() can publish a
+snapshot of the store (VectorStore.snapshot, no copy), so requests for the
+same document can search what is indexed so far instead of waiting.
+
+Public API:
+    iter_chunks(pages, max_tokens=EMBED_CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS)
+        -> Iterator[Tuple[str, int, int]]                                   # (chunk, first_page, last_page)
+    build_store(pages, max_tokens=..., overlap_tokens=..., batch_size=None, embed=None, publish=None, **store_kwargs)
+        -> VectorStore | None                                               # publish(snapshot) after each batch
+    ingest_pdf_bytes(data, ..., publish=None) -> (pages, VectorStore | None)
+
+Chunks equal pdf.chunk_text(text, EMBED_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS) where
+text is the "\n"-joined non-empty pages.
+"""
+
+import bisect
+import logging
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from chunking import CHUNK_OVERLAP_TOKENS, EMBED_CHUNK_TOKENS, iter_token_chunks
+from pdf_extract import iter_pages
+from vectorstore import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def iter_chunks(pages: Iterable[str], max_tokens: int = EMBED_CHUNK_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> Iterator[Tuple[str, int, int]]:
+    """Yield (chunk, first_page, last_page) as soon as each chunk is complete (pages are 0-based)."""
+    page_starts: List[int] = []   # offset of each non-empty page in the joined text
+    page_numbers: List[int] = []
+    offset = 0
+
+    def track(it: Iterable[str]) -> Iterator[str]:
+        nonlocal offset
+        for page_no, page in enumerate(it):
+            if page:
+                page_starts.append(offset)
+                page_numbers.append(page_no)
+                offset += len(page) + 1  # + the "\n" separator
+            yield page
+
+    for chunk in iter_token_chunks(track(pages), max_tokens, overlap_tokens):
+        first = page_numbers[bisect.bisect_right(page_starts, chunk.start) - 1]
+        last = page_numbers[bisect.bisect_right(page_starts, chunk.end - 1) - 1]
+        yield chunk.text, first, last
+
+
+def _default_embed(texts: List[str], batch_size: int) -> List[Optional[List[float]]]:
+    # imported lazily: sentence-transformers is only loaded once a document is indexed
+    from embeddings import embed_chunks
+    return embed_chunks(texts, batch_size=batch_size)
+
+
+def _default_batch_size() -> int:
+    from embeddings import EMBED_BATCH_SIZE
+    return EMBED_BATCH_SIZE
+
+
+def build_store(pages: Iterable[str], max_tokens: int = EMBED_CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                batch_size: Optional[int] = None,
+                embed: Optional[Callable[[List[str], int], List[Optional[List[float]]]]] = None,
+                publish: Optional[Callable[[VectorStore], None]] = None,
+                **store_kwargs) -> Optional[VectorStore]:
+    """
+    Embed the chunks of `pages` in micro-batches of batch_size (default EMBED_BATCH_SIZE) into one
+    VectorStore. store_kwargs go to the VectorStore constructor; chunks that fail to embed are dropped.
+    Chunk ids are "<n>:p<first>-<last>" with 1-based page numbers. Returns None if nothing could be embedded.
+    publish, if given, receives a searchable snapshot of the store after every micro-batch.
+    """
+    embed = embed or _default_embed
+    batch_size = batch_size or _default_batch_size()
+    store: Optional[VectorStore] = None
+    batch: List[Tuple[str, int, int]] = []
+    n_chunks = 0
+
+    def flush() -> None:
+        nonlocal store
+        vectors = embed([c for c, _, _ in batch], batch_size)
+        kept = [(item, emb) for item, emb in zip(batch, vectors) if emb is not None]
+        if not kept:
+            return
+        if store is None:
+            store = VectorStore(dim=len(kept[0][1]), **store_kwargs)
+        ids = [f"{n_chunks + i}:p{first + 1}-{last + 1}" for i, ((_, first, last), _) in enumerate(kept)]
+        store.add([c for (c, _, _), _ in kept], [emb for _, emb in kept], ids=ids)
+        if publish is not None:
+            publish(store.snapshot())
+
+    for item in iter_chunks(pages, max_tokens, overlap_tokens):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush()
+            n_chunks, batch = n_chunks + len(batch), []
+    if batch:
+        flush()
+    return store
+
+
+def ingest_pdf_bytes(data: bytes, max_tokens: int = EMBED_CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                     batch_size: Optional[int] = None, publish: Optional[Callable[[VectorStore], None]] = None,
+                     **store_kwargs) -> Tuple[List[str], Optional[VectorStore]]:
+    """
+    Extract, chunk and index a PDF in one streaming pass (publish: see build_store).
+    Returns the page texts (so the caller can cache the parse) and the built store.
+    """
+    pages: List[str] = []
+
+    def keep(it: Iterable[str]) -> Iterator[str]:
+        for page in it:
+            pages.append(page)
+            yield page
+
+    store = build_store(keep(iter_pages(data)), max_tokens, overlap_tokens, batch_size,
+                        publish=publish, **store_kwargs)
+    logger.info(f"Indexed {len(pages)} pages into {len(store) if store is not None else 0} chunks")
+    return pages, store
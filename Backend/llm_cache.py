@@ -0,0 +1,216 @@
+"""
+Exact-match cache of validated LLM outputs.
+
+Roadmap subjects repeat a lot across users ("Python", "DSA", "Operating
+Systems"), and /ask and /content used to call OpenRouter for every one of
+them. Entries are keyed by sha256(model, system prompt, user prompt,
+temperature, max_tokens) and hold the *validated* result (topic list / item
+list), so a hit skips both the network call and the parse/repair step.
+
+  - memory tier: LRU bounded by entries and bytes, with a TTL
+  - disk tier (optional, LLM_CACHE_PATH): a sqlite file in WAL mode shared by
+    worker processes; expired rows are pruned every few hundred writes
+
+Values are stored as JSON text, so every hit returns a fresh copy the caller
+can mutate freely. Only cache outputs that parsed; error placeholders are left
+out so a transient failure is retried on the next request.
+
+Public API:
+    ResponseCache(max_entries=..., max_bytes=..., ttl_seconds=..., path=...)
+    ResponseCache.key(model, system_prompt, user_prompt, temperature, max_tokens) -> str
+    ResponseCache.key_for_messages(model, messages, temperature, max_tokens) -> str
+    .get(key) -> Any | None
+    .put(key, value)
+    .clear()
+    .stats() -> dict
+    response_cache   # shared instance configured from the LLM_CACHE_* env vars
+"""
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 0 disables the memory tier; an empty path disables the disk tier
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# roadmaps don't go stale quickly; <= 0 keeps entries until evicted
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+_PRUNE_EVERY = 256
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        path: str = LLM_CACHE_PATH,
+        disk_max_entries: int = LLM_CACHE_DISK_MAX_ENTRIES,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        # key -> (json text, expires_at); order = recency (oldest first)
+        self._mem: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False, timeout=10)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires_at)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM response disk cache disabled ({path}): {e}")
+                self._db = None
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+        raw = json.dumps([model, system_prompt, user_prompt, float(temperature), int(max_tokens)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def key_for_messages(model: str, messages: List[dict], temperature: float, max_tokens: int) -> str:
+        system = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        user = "\n".join(f"{m.get('role')}: {m.get('content', '')}" for m in messages if m.get("role") != "system")
+        return ResponseCache.key(model, system, user, temperature, max_tokens)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self._db is not None
+
+    def _expires_at(self, now: float) -> float:
+        return now + self.ttl_seconds if self.ttl_seconds > 0 else float("inf")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key (a fresh copy), or None on miss / expiry."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._mem.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(entry[0])
+                self._drop(key)
+            text = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at >= ?", (key, now)
+                    ).fetchone()
+                    if row is not None:
+                        text = row[0]
+                        self._remember(key, text, row[1])
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM response disk cache read failed: {e}")
+            if text is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        return json.loads(text)
+
+    def put(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        try:
+            text = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"LLM response not cacheable: {e}")
+            return
+        now = time.time()
+        expires_at = self._expires_at(now)
+        with self._lock:
+            self._remember(key, text, expires_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                        (key, text, expires_at, now),
+                    )
+                    self._writes += 1
+                    if self._writes % _PRUNE_EVERY == 0:
+                        self._prune_disk(now)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM response disk cache write failed: {e}")
+
+    def _prune_disk(self, now: float) -> None:
+        self._db.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+        if self.disk_max_entries > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.disk_max_entries,),
+            )
+
+    def _drop(self, key: str) -> None:
+        text, _ = self._mem.pop(key)
+        self._bytes -= len(text)
+
+    def _remember(self, key: str, text: str, expires_at: float) -> None:
+        if self.max_entries <= 0 or len(text) > self.max_bytes:
+            return
+        if key in self._mem:
+            self._drop(key)
+        self._mem[key] = (text, expires_at)
+        self._bytes += len(text)
+        while self._mem and (len(self._mem) > self.max_entries or self._bytes > self.max_bytes):
+            self._drop(next(iter(self._mem)))
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._bytes = 0
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"LLM response disk cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._mem),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "disk": self._db is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": ((self.hits + self.disk_hits) / lookups) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache()
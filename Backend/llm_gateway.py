@@ -0,0 +1,234 @@
+"""
+Shared gateway for OpenRouter chat completions.
+
+Every module that talks to the LLM (client.py, content.py, general.py, pdf.py)
+goes through here, so all completions share one keep-alive connection pool
+instead of paying a fresh TCP/TLS handshake per request.
+
+Public API:
+    chat_completion_async(messages, model, temperature, max_tokens) -> str   # await from async routes
+    chat_completion(messages, model, temperature, max_tokens) -> str         # blocking wrapper for sync call sites
+    chat_completion_stream_async(messages, model, ...) -> AsyncIterator[str] # token deltas as they arrive (SSE upstream)
+    close()                                                                  # drain the pool on shutdown
+
+The pooled httpx.AsyncClient lives on a dedicated background event loop. Both
+entry points hand their request to that loop, which makes the gateway safe to
+use from FastAPI's event loop, from threadpool workers and from plain scripts.
+"""
+
+import os
+import json
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Pool tuning (override through the environment if needed)
+DEFAULT_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16"))
+KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+
+
+class LLMGatewayError(Exception):
+    """Raised when a completion request fails or the API answers with something unusable."""
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_client: Optional[httpx.AsyncClient] = None
+
+
+# ------------------ Event loop / pool management ------------------
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    """Start (once) the background event loop that owns the connection pool."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the pooled client. Only called from coroutines running on the gateway loop."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+
+def _headers() -> Dict[str, str]:
+    # read the key at call-time so a missing key surfaces as a request error, not an import crash
+    api_key = os.getenv("OPENROUTER_API_KEY")
+    if not api_key:
+        raise LLMGatewayError("OPENROUTER_API_KEY not set in environment")
+    return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+
+def extract_assistant_text(data: Any) -> str:
+    """Pull the assistant message out of a chat completion response (falls back to legacy 'text')."""
+    try:
+        return data["choices"][0]["message"]["content"] or ""
+    except Exception:
+        try:
+            return data["choices"][0]["text"] or ""
+        except Exception:
+            return ""
+
+
+async def _post(payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    client = _get_client()
+    try:
+        resp = await client.post(OPENROUTER_API_URL, headers=_headers(), json=payload, timeout=timeout)
+        resp.raise_for_status()
+    except httpx.HTTPError as e:
+        raise LLMGatewayError(f"Request failed: {e}") from e
+
+    try:
+        return resp.json()
+    except ValueError as e:
+        raise LLMGatewayError(f"Invalid JSON response from API: {resp.text[:500]}") from e
+
+
+async def _post_stream(payload: Dict[str, Any], timeout: float, emit: Callable[[Any], None]) -> None:
+    """POST with stream=true and emit() every content delta of the server-sent event stream."""
+    client = _get_client()
+    try:
+        async with client.stream("POST", OPENROUTER_API_URL, headers=_headers(), json=payload, timeout=timeout) as resp:
+            if resp.status_code >= 400:
+                await resp.aread()
+                resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                # skip blank lines and SSE comments (OpenRouter sends ": OPENROUTER PROCESSING" keep-alives)
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    event = json.loads(data)
+                except ValueError:
+                    continue
+                if event.get("error"):
+                    raise LLMGatewayError(f"Stream error from API: {event['error']}")
+                try:
+                    delta = event["choices"][0].get("delta", {}).get("content")
+                except (KeyError, IndexError, AttributeError):
+                    delta = None
+                if delta:
+                    emit(delta)
+    except httpx.HTTPError as e:
+        raise LLMGatewayError(f"Request failed: {e}") from e
+
+
+def _build_payload(messages: List[dict], model: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+    return {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+
+
+# ------------------ Public API ------------------
+
+async def chat_completion_async(
+    messages: List[dict],
+    model: str = "openai/gpt-4o-mini",
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None,
+) -> str:
+    """
+    Send a chat completion through the shared pool and return the stripped assistant text.
+    Raises LLMGatewayError on network/HTTP errors or a non-JSON API response.
+    """
+    payload = _build_payload(messages, model, temperature, max_tokens)
+    fut = asyncio.run_coroutine_threadsafe(_post(payload, timeout or DEFAULT_TIMEOUT), _ensure_loop())
+    data = await asyncio.wrap_future(fut)
+    return extract_assistant_text(data).strip()
+
+
+def chat_completion(
+    messages: List[dict],
+    model: str = "openai/gpt-4o-mini",
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None,
+) -> str:
+    """Blocking wrapper around chat_completion_async for sync call sites."""
+    payload = _build_payload(messages, model, temperature, max_tokens)
+    fut = asyncio.run_coroutine_threadsafe(_post(payload, timeout or DEFAULT_TIMEOUT), _ensure_loop())
+    data = fut.result()
+    return extract_assistant_text(data).strip()
+
+
+_STREAM_END = object()
+
+
+async def chat_completion_stream_async(
+    messages: List[dict],
+    model: str = "openai/gpt-4o-mini",
+    temperature: float = 0.3,
+    max_tokens: int = 2000,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a chat completion through the shared pool, yielding content deltas as they arrive.
+    The request runs on the gateway loop and hands deltas to the caller's loop through a queue;
+    closing the iterator early (client went away) cancels the upstream request.
+    Raises LLMGatewayError on network/HTTP errors or an error event in the stream.
+    """
+    payload = _build_payload(messages, model, temperature, max_tokens)
+    payload["stream"] = True
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # caller's loop is gone
+
+    async def run() -> None:
+        try:
+            await _post_stream(payload, timeout or DEFAULT_TIMEOUT, emit)
+        except Exception as e:
+            emit(e)
+        finally:
+            emit(_STREAM_END)
+
+    fut = asyncio.run_coroutine_threadsafe(run(), _ensure_loop())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if not fut.done():
+            fut.cancel()
+
+
+def close() -> None:
+    """Close pooled connections (call from the app's shutdown hook)."""
+    global _client
+    if _loop is None or _client is None:
+        return
+    client, _client = _client, None
+    asyncio.run_coroutine_threadsafe(client.aclose(), _loop).result()
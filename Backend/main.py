@@ -245,8 +245,10 @@
 # main.py
 from fastapi import FastAPI, UploadFile, File, Form, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 import logging
 import json
 import hashlib
@@ -259,23 +261,68 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+# Search backend for new stores: "flat" (exact), "ivf" (pure numpy ANN) or "hnsw" (faiss)
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "flat")
+# Resident vector storage: "float32", "float16" (2x smaller) or "int8" (4x smaller); flat index only
+VECTOR_STORAGE = os.getenv("VECTOR_STORAGE", "float32")
+
 # Import your modules with error handling
 try:
-    from client import generate_api_response
-    from content import generate_subtopic_items
-    from general import generate_general_response
-    from pdf import extract_pdf_text, chunk_text
-    from embeddings import get_embedding
+    from client import generate_api_response, generate_api_response_async, generate_api_response_stream
+    from content import generate_subtopic_items, generate_subtopic_items_async
+    from general import generate_general_response_async, generate_general_response_stream, GENERAL_MODEL, GENERAL_MAX_TOKENS
+    import llm_gateway
+    from pdf import (parse_pdf_bytes, get_pdf_chunks, parsed_pdf_cache_stats,
+                     cache_parsed_pdf, save_parsed_pdf, load_parsed_pdf)
+    from ingest import build_store, ingest_pdf_bytes
+    from chunking import EMBED_CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_ENCODING, count_tokens
+    from context_packer import pack_context, context_budget
+    from embeddings import MODEL_NAME, get_embedding, embed_chunks, embedding_cache
+    from llm_cache import response_cache
+    from semantic_cache import roadmap_semantic_cache
+    from singleflight import flight_stats
     from vectorstore import VectorStore
+    from store_cache import VectorStoreCache, DiskStoreTier
+    from conversation_store import ConversationStores, conversation_key
     logger.info("Successfully imported all modules")
+
+    # Global cache for vector stores (LRU + TTL, bounded by entry count and bytes)
+    metadata_cache = VectorStoreCache()
+    # Persistent tier under the memory cache: survives restarts/deploys. Stores built with
+    # other chunking / index / storage / embedding settings are never loaded.
+    disk_store_cache = DiskStoreTier(VectorStore, fingerprint={
+        "embedding_model": MODEL_NAME,
+        "chunk_tokens": EMBED_CHUNK_TOKENS,
+        "chunk_overlap_tokens": CHUNK_OVERLAP_TOKENS,
+        "chunk_encoding": CHUNK_ENCODING,
+        "index": VECTOR_INDEX,
+        "storage": VECTOR_STORAGE,
+    })
+    # Per-conversation stores for /general: only new chunks are embedded each turn, stale ones dropped
+    conversation_cache = VectorStoreCache()
+    conversation_stores = ConversationStores(conversation_cache, embed=embed_chunks)
 except ImportError as e:
     logger.error(f"Import error: {e}")
+    # degraded mode: the app still starts, vector-store features are unavailable
+    metadata_cache = None
+    disk_store_cache = None
+    conversation_cache = None
+    conversation_stores = None
+    # `e` is unbound once the except block ends: keep the message for the fallbacks
+    _import_error = str(e)
+
     # Create fallback functions if imports fail
     def generate_api_response(context, query):
-        return [{"type": "TOPIC", "name": "Error", "subtopics": [{"type": "SUBTOPIC", "name": "Import Error", "content": str(e)}]}]
+        return [{"type": "TOPIC", "name": "Error", "subtopics": [{"type": "SUBTOPIC", "name": "Import Error", "content": _import_error}]}]
     
     def generate_subtopic_items(subtopic, context=""):
-        return [{"type": "STUDY", "content": f"Import error: {e}"}]
+        return [{"type": "STUDY", "content": f"Import error: {_import_error}"}]
+
+    async def generate_api_response_async(context, query):
+        return generate_api_response(context, query)
+
+    async def generate_subtopic_items_async(subtopic, context=""):
+        return generate_subtopic_items(subtopic, context)
 
 app = FastAPI(title="Learning App with PDF Support")
 
@@ -295,8 +342,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global cache for vector stores
-metadata_cache: Dict[str, Any] = {}
+@app.on_event("shutdown")
+def close_llm_pool():
+    # drain the shared keep-alive pool used by all LLM calls
+    try:
+        llm_gateway.close()
+    except Exception as e:
+        logger.warning(f"Failed to close LLM connection pool: {e}")
+
+
+# Retrieval depth before token-budgeted packing (context_packer.py decides how many hits fit)
+PDF_QUERY_TOP_K = int(os.getenv("PDF_QUERY_TOP_K", "12"))
+GENERAL_TOP_K = int(os.getenv("GENERAL_TOP_K", "12"))
+
+# Documents being indexed right now: doc_id -> latest snapshot published by ingest.build_store.
+# Requests for such a document search what is indexed so far instead of indexing it again.
+_indexing_stores: Dict[str, Any] = {}
 
 # Pydantic Models
 class SubtopicItemModel(BaseModel):
@@ -321,6 +382,9 @@ class MetadataModel(BaseModel):
 class GeneralRequest(BaseModel):
     metadata: MetadataModel
     query: str
+    # stable id of the chat so its vector store is updated incrementally across turns;
+    # if omitted the store is keyed by the full metadata of this request
+    conversation_id: Optional[str] = None
 
 class PDFQueryResponse(BaseModel):
     query: str
@@ -329,50 +393,152 @@ class PDFQueryResponse(BaseModel):
     source: str = "PDF"
 
 # Helper Functions
-def get_or_create_store(text_content: str) -> Any:
-    """Create or retrieve cached vector store for text content"""
+def get_document_store(doc_id: str) -> Any:
+    """
+    Vector store of an ingested PDF: memory cache, then the disk tier, then the partial store of
+    an indexing still in progress. None if it was never indexed.
+    """
+    if metadata_cache is None:
+        return None
+    store = metadata_cache.get(doc_id)
+    if store is None:
+        store = disk_store_cache.load(doc_id)
+        if store is not None:
+            metadata_cache.put(doc_id, store)
+    if store is None:
+        store = _indexing_stores.get(doc_id)
+    return store
+
+def _publisher(doc_id: str):
+    def publish(snapshot: Any) -> None:
+        _indexing_stores[doc_id] = snapshot
+    return publish
+
+def ingest_pdf(data: bytes, filename: str = "") -> Tuple[Any, Any]:
+    """
+    Return (parsed_pdf, store) for an uploaded PDF, both cached under the sha256 of its bytes
+    (the doc_id) and persisted, so later calls can refer to the document by id alone.
+    A first upload streams extract -> chunk -> embed -> VectorStore (ingest.py): embedding starts
+    with the first pages, and concurrent requests for the same document get the partial store.
+    store is None if indexing failed; callers fall back to the parsed text.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    streamed = False
     try:
-        key = hashlib.md5(text_content.encode()).hexdigest()
-        if key in metadata_cache:
-            logger.info("Using cached vector store")
-            return metadata_cache[key]
-        
-        # Create new vector store
-        chunks = chunk_text(text_content, chunk_size=500)  # Smaller chunks for better context
-        if not chunks:
-            raise ValueError("No chunks generated from text")
-            
-        embeddings = []
-        for chunk in chunks:
-            try:
-                emb = get_embedding(chunk)
-                embeddings.append(emb)
-            except Exception as e:
-                logger.warning(f"Failed to embed chunk: {e}")
-        
-        if not embeddings:
-            raise ValueError("No embeddings generated")
-            
-        store = VectorStore(dim=len(embeddings[0]))
-        store.add(chunks, embeddings)
-        metadata_cache[key] = store
-        logger.info(f"Created new vector store with {len(chunks)} chunks")
-        return store
-        
+        store = get_document_store(digest)
+        # pages persisted by an earlier upload (or another worker) are reused, not re-parsed
+        parsed = load_parsed_pdf(digest)
+        if store is not None:
+            parsed = parsed if parsed is not None else parse_pdf_bytes(data)
+        elif parsed is not None:
+            parsed, store = ingest_pdf_pages(parsed)
+        else:
+            streamed = True
+            pages, store = ingest_pdf_bytes(data, publish=_publisher(digest), normalize=True,
+                                            index=VECTOR_INDEX, storage=VECTOR_STORAGE)
+            parsed = cache_parsed_pdf(digest, pages)
     except Exception as e:
-        logger.error(f"Error creating vector store: {e}")
-        return None
+        logger.error(f"Streaming PDF ingestion failed: {e}")
+        parsed, store = parse_pdf_bytes(data), None
+
+    if filename and not parsed.filename:
+        parsed.filename = filename
+    save_parsed_pdf(parsed)
+    if streamed:
+        if store is not None:
+            if not metadata_cache.put(digest, store):
+                logger.warning(f"Vector store ({store.nbytes()} bytes) exceeds cache budget, not cached")
+            disk_store_cache.save(digest, store)
+        # the finished store is cached now (or indexing failed): stop serving the partial one
+        _indexing_stores.pop(digest, None)
+    return parsed, store
+
+def ingest_pdf_pages(parsed: Any) -> Tuple[Any, Any]:
+    """Rebuild and cache the vector store of an already parsed document."""
+    if metadata_cache is None:
+        return parsed, None
+    try:
+        store = build_store(parsed.pages, publish=_publisher(parsed.digest), normalize=True,
+                            index=VECTOR_INDEX, storage=VECTOR_STORAGE)
+        if store is not None:
+            metadata_cache.put(parsed.digest, store)
+            disk_store_cache.save(parsed.digest, store)
+    finally:
+        _indexing_stores.pop(parsed.digest, None)
+    return parsed, store
+
+async def resolve_pdf(file: Optional[UploadFile], doc_id: Optional[str], index: bool = False) -> Tuple[Any, Any, str]:
+    """
+    Return (parsed_pdf, store, filename) for a /pdf/* request given either an upload or a doc_id
+    from POST /documents. With a doc_id nothing is uploaded or parsed; store is only
+    looked up / built when index=True.
+    """
+    if doc_id:
+        try:
+            parsed = await run_in_threadpool(load_parsed_pdf, doc_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if parsed is None:
+            raise HTTPException(status_code=404, detail=f"Unknown document id: {doc_id}")
+        store = None
+        if index:
+            store = await run_in_threadpool(get_document_store, doc_id)
+            if store is None:
+                # persisted text but no index (evicted or failed earlier): rebuild it from the pages
+                parsed, store = await run_in_threadpool(ingest_pdf_pages, parsed)
+        return parsed, store, parsed.filename or doc_id
+
+    if file is None:
+        raise HTTPException(status_code=400, detail="Provide either a PDF file or a doc_id")
+    if not file.filename or not file.filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Please upload a PDF file")
+    data = await file.read()
+    if index:
+        parsed, store = await run_in_threadpool(ingest_pdf, data, file.filename)
+    else:
+        # parsing is cached by upload bytes; PyPDF2 only runs for PDFs we have not seen
+        parsed, store = await run_in_threadpool(parse_pdf_bytes, data), None
+        if not parsed.filename:
+            parsed.filename = file.filename
+    return parsed, store, file.filename
+
+def index_parsed_pdf(parsed: Any) -> Any:
+    """
+    Vector store of a parsed document, built on first use (None if indexing is unavailable).
+    The pages are persisted too, so the document's doc_id works in later requests.
+    """
+    save_parsed_pdf(parsed)
+    store = get_document_store(parsed.digest)
+    if store is None:
+        parsed, store = ingest_pdf_pages(parsed)
+    return store
 
 # Routes
 
 @app.get("/")
 def home():
-    return {"message": "Learning App API Running", "endpoints": ["/ask", "/content", "/pdf/query", "/pdf/topics", "/general"]}
+    return {"message": "Learning App API Running", "endpoints": ["/ask", "/ask/stream", "/content", "/documents", "/pdf/query", "/pdf/query/stream", "/pdf/topics", "/general", "/general/stream"]}
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "message": "API is running"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss/eviction counters and current footprint of the vector store, embedding, PDF, LLM response and semantic roadmap caches, plus LLM call coalescing."""
+    if metadata_cache is None:
+        raise HTTPException(status_code=503, detail="Caches unavailable: module imports failed at startup")
+    return {
+        "vector_stores": metadata_cache.stats(),
+        "vector_stores_disk": disk_store_cache.stats(),
+        "conversation_stores": conversation_cache.stats(),
+        "embeddings": embedding_cache.stats(),
+        "parsed_pdfs": parsed_pdf_cache_stats(),
+        "llm_responses": response_cache.stats(),
+        "roadmap_semantic": roadmap_semantic_cache.stats(),
+        "in_flight_llm_calls": flight_stats(),
+    }
+
 # @app.get("/ask", response_model=List[TopicModel])
 # def ask(q: str = Query(..., description="Subject to generate roadmap for")):
 #     """Generate learning roadmap for a subject (without PDF)"""
@@ -400,27 +566,46 @@ def health_check():
 #         raise HTTPException(status_code=500, detail=f"Error generating content: {str(e)}")
 
 @app.get("/ask", response_model=List[TopicModel])
-def ask(q: str = Query(..., description="Subject to generate roadmap for")):
+async def ask(q: str = Query(..., description="Subject to generate roadmap for")):
     """
     Returns an array of Topic objects for the requested subject.
     """
     # You can include ctx from files/repo if available, currently empty string used
     context = ""
-    result = generate_api_response(context, q)
+    result = await generate_api_response_async(context, q)
     # result=generate_subtopic_items(context, q)
     # result is already a list of dicts validated & repaired by client
     return result
 
+@app.get("/ask/stream")
+async def ask_stream(q: str = Query(..., description="Subject to generate roadmap for")):
+    """
+    Streaming /ask: each validated topic is sent as a server-sent "topic" event as soon as
+    the model closes it, then a "done" event carries the topic count.
+    """
+    async def events():
+        count = 0
+        try:
+            async for topic in generate_api_response_stream("", q):
+                count += 1
+                yield _sse("topic", topic)
+        except Exception as e:
+            logger.error(f"Streaming roadmap failed: {e}")
+            yield _sse("error", {"detail": str(e)})
+        yield _sse("done", {"topics": count})
+
+    return _sse_response(events())
+
 # ------------------ content.py ------------------
 @app.get("/content")
-def ask(q: str = Query(..., description="Subject to generate roadmap for")):
+async def ask(q: str = Query(..., description="Subject to generate roadmap for")):
     """
     Returns an array of Topic objects for the requested subject.
     """
     # You can include ctx from files/repo if available, currently empty string used
     context = ""
     # result = generate_api_response(context, q)
-    result=generate_subtopic_items(context, q)
+    result = await generate_subtopic_items_async(context, q)
     # result is already a list of dicts validated & repaired by client
     return result
 # main.py  (only the changed / added bits)
@@ -433,61 +618,120 @@ logger = logging.getLogger(__name__)  # was _name_
 def _sha1(s: str) -> str:
     return hashlib.sha1(s.encode("utf-8")).hexdigest()
 
+@app.post("/documents")
+async def create_document(file: UploadFile = File(..., description="PDF file to ingest")):
+    """
+    Ingest a PDF once: extract, index and persist it, and return its doc_id.
+    Pass the doc_id to /pdf/query, /pdf/topics or /pdf/content instead of re-uploading the file.
+    Uploading the same bytes again returns the same doc_id without re-parsing.
+    """
+    parsed, store, filename = await resolve_pdf(file, None, index=True)
+    if not parsed.text or len(parsed.text.strip()) < 50:
+        raise HTTPException(status_code=400, detail="PDF appears to be empty or has insufficient text")
+    return {
+        "doc_id": parsed.digest,
+        "filename": filename,
+        "pages": len(parsed.pages),
+        "chars": len(parsed.text),
+        "chunks": len(store) if store is not None else 0,
+    }
+
+async def _pdf_query_context(parsed: Any, query: str) -> Tuple[str, str]:
+    """
+    Return (context, strategy) for a question about a PDF. strategy is "whole" (the document
+    fits the token budget and is sent as is), "vector" (best-ranked chunks packed into the
+    budget) or "fallback" (retrieval failed; leading chunks packed into the budget).
+    Only documents too large to send whole are indexed.
+    """
+    budget = context_budget(GENERAL_MODEL, reserve_tokens=GENERAL_MAX_TOKENS)
+    pdf_text = parsed.text
+    # tokenizing, searching, chunking and packing are CPU-bound: keep them all off the event loop
+    if len(pdf_text) <= budget * 8 and await run_in_threadpool(count_tokens, pdf_text) <= budget:
+        return pdf_text, "whole"
+    try:
+        pdf_store = await run_in_threadpool(index_parsed_pdf, parsed)
+        if pdf_store is None:
+            # no index: document order
+            ranked = await run_in_threadpool(get_pdf_chunks, parsed, chunk_size=1000)
+        else:
+            query_embedding = await run_in_threadpool(get_embedding, query)
+            relevant_chunks = await run_in_threadpool(pdf_store.search, query_embedding, top_k=PDF_QUERY_TOP_K)
+            ranked = [text for text, _ in relevant_chunks]
+        return (await run_in_threadpool(pack_context, ranked, (), budget)).text, "vector"
+    except Exception as e:
+        logger.warning(f"Vector search failed, using fallback: {e}")
+        return (await run_in_threadpool(_pack_leading_chunks, parsed, budget)).text, "fallback"
+
+def _pack_leading_chunks(parsed: Any, budget: int) -> Any:
+    return pack_context(get_pdf_chunks(parsed, chunk_size=1000), budget_tokens=budget)
+
+_PDF_SOURCE_SUFFIX = {"whole": "", "vector": " (vector search)", "fallback": " (fallback)"}
+
+def _pdf_metadata_patch(parsed: Any, filename: str, context: str, source_label: str) -> Dict[str, Any]:
+    context_excerpt = context[:1200]  # keep it light for metadata
+    return {
+        "type": "pdf",
+        "filename": filename,
+        "doc_id": parsed.digest,
+        "context_excerpt": context_excerpt,
+        "context_hash": _sha1(context_excerpt),
+        "bytes_used": len(context),
+        "source": source_label,
+    }
+
+def _sse(event: str, data: Any) -> str:
+    # one server-sent event; data is JSON so newlines in tokens cannot break the framing
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _sse_answer(deltas: AsyncIterator[str], final: Dict[str, Any]) -> AsyncIterator[str]:
+    """Forward answer deltas as "token" events, then one "done" event with the full answer and `final`."""
+    parts: List[str] = []
+    try:
+        async for delta in deltas:
+            parts.append(delta)
+            yield _sse("token", {"text": delta})
+    except Exception as e:
+        logger.error(f"Streaming answer failed: {e}")
+        yield _sse("error", {"detail": str(e)})
+    yield _sse("done", {"answer": "".join(parts), **final})
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    # no-transform / X-Accel-Buffering keep proxies from holding tokens back
+    return StreamingResponse(events, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"})
+
 @app.post("/pdf/query")
 async def pdf_query(
-    file: UploadFile = File(..., description="PDF file to analyze"),
-    query: str = Form(..., description="Question about the PDF content")
+    file: Optional[UploadFile] = File(None, description="PDF file to analyze"),
+    query: str = Form(..., description="Question about the PDF content"),
+    doc_id: Optional[str] = Form(None, description="Id returned by POST /documents (instead of file)"),
 ):
-    if not file.filename or not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Please upload a PDF file")
     try:
-        logger.info(f"Processing PDF query: {query} for file: {file.filename}")
-        pdf_text = extract_pdf_text(file.file)
+        parsed, _, filename = await resolve_pdf(file, doc_id)
+        logger.info(f"Processing PDF query: {query} for file: {filename}")
+        pdf_text = parsed.text
         if not pdf_text or len(pdf_text.strip()) < 50:
             raise HTTPException(status_code=400, detail="PDF appears to be empty or has insufficient text")
 
-        # choose context strategy (same as your code)
-        if len(pdf_text) < 10000:
-            context = pdf_text
-            answer = generate_api_response(context, query)
-            source_label = f"PDF: {file.filename}"
-        else:
+        # choose context strategy: a document that fits the token budget is sent whole,
+        # otherwise the best-ranked chunks are packed into the budget
+        context, strategy = await _pdf_query_context(parsed, query)
+        if strategy == "whole":
+            answer = await generate_api_response_async(context, query)
+        elif strategy == "vector":
             try:
-                store = get_or_create_store(pdf_text)
-                if store is None:
-                    chunks = chunk_text(pdf_text, chunk_size=1000)
-                    context = "\n\n".join(chunks[:5])
-                else:
-                    query_embedding = get_embedding(query)
-                    relevant_chunks = store.search(query_embedding, top_k=3)
-                    context = "\n\n".join(relevant_chunks)
-
-                try:
-                    answer = generate_general_response(context, query)
-                except Exception:
-                    answer = f"Query: {query}\n\nRelevant PDF content:\n{context}"
-                source_label = f"PDF: {file.filename} (vector search)"
-            except Exception as e:
-                logger.warning(f"Vector search failed, using fallback: {e}")
-                chunks = chunk_text(pdf_text, chunk_size=1000)
-                context = "\n\n".join(chunks[:3])
-                answer = f"Based on the PDF content:\n\n{context}"
-                source_label = f"PDF: {file.filename} (fallback)"
-
-        context_excerpt = context[:1200]  # keep it light for metadata
-        metadata_patch = {
-            "type": "pdf",
-            "filename": file.filename,
-            "context_excerpt": context_excerpt,
-            "context_hash": _sha1(context_excerpt),
-            "bytes_used": len(context),
-            "source": source_label,
-        }
+                answer = await generate_general_response_async(context, query)
+            except Exception:
+                answer = f"Query: {query}\n\nRelevant PDF content:\n{context}"
+        else:
+            answer = f"Based on the PDF content:\n\n{context}"
+        source_label = f"PDF: {filename}{_PDF_SOURCE_SUFFIX[strategy]}"
 
+        metadata_patch = _pdf_metadata_patch(parsed, filename, context, source_label)
         return {
             "query": query,
             "answer": answer,
-            "context_used": context_excerpt,
+            "context_used": metadata_patch["context_excerpt"],
             "source": source_label,
             "metadata_patch": metadata_patch,   # <—— NEW
         }
@@ -498,27 +742,58 @@ async def pdf_query(
         logger.error(f"Error processing PDF query: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
+@app.post("/pdf/query/stream")
+async def pdf_query_stream(
+    file: Optional[UploadFile] = File(None, description="PDF file to analyze"),
+    query: str = Form(..., description="Question about the PDF content"),
+    doc_id: Optional[str] = Form(None, description="Id returned by POST /documents (instead of file)"),
+):
+    """
+    Streaming /pdf/query: the answer arrives as server-sent "token" events while the model
+    generates it, then a "done" event carries answer, context_used, source and metadata_patch.
+    The answer is always prose over the selected context (no roadmap JSON for short documents).
+    """
+    try:
+        parsed, _, filename = await resolve_pdf(file, doc_id)
+        if not parsed.text or len(parsed.text.strip()) < 50:
+            raise HTTPException(status_code=400, detail="PDF appears to be empty or has insufficient text")
+        context, strategy = await _pdf_query_context(parsed, query)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing PDF query: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
+
+    source_label = f"PDF: {filename}{_PDF_SOURCE_SUFFIX[strategy]}"
+    metadata_patch = _pdf_metadata_patch(parsed, filename, context, source_label)
+    final = {
+        "query": query,
+        "context_used": metadata_patch["context_excerpt"],
+        "source": source_label,
+        "metadata_patch": metadata_patch,
+    }
+    return _sse_response(_sse_answer(generate_general_response_stream(context, query), final))
+
 @app.post("/pdf/topics", response_model=List[TopicModel])
 async def pdf_topics(
-    file: UploadFile = File(..., description="PDF file to analyze"),
-    query: str = Form(..., description="Subject to generate roadmap for")
+    file: Optional[UploadFile] = File(None, description="PDF file to analyze"),
+    query: str = Form(..., description="Subject to generate roadmap for"),
+    doc_id: Optional[str] = Form(None, description="Id returned by POST /documents (instead of file)"),
 ):
     """Generate learning roadmap from PDF content"""
-    if not file.filename or not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Please upload a PDF file")
-    
     try:
-        logger.info(f"Generating topics from PDF: {file.filename}")
-        pdf_text = extract_pdf_text(file.file)
+        parsed, _, filename = await resolve_pdf(file, doc_id)
+        logger.info(f"Generating topics from PDF: {filename}")
+        pdf_text = parsed.text
         
         if not pdf_text or len(pdf_text.strip()) < 50:
             raise HTTPException(status_code=400, detail="PDF appears to be empty or has insufficient text")
         
         # Chunk the text for context
-        chunks = chunk_text(pdf_text, chunk_size=2000)
+        chunks = get_pdf_chunks(parsed, chunk_size=2000)
         context = "\n\n".join(chunks[:5])  # Use first 5 chunks as context
         
-        result = generate_api_response(context, query)
+        result = await generate_api_response_async(context, query)
         logger.info(f"Generated {len(result)} topics from PDF")
         return result
         
@@ -530,24 +805,23 @@ async def pdf_topics(
 
 @app.post("/pdf/content", response_model=List[SubtopicItemModel])
 async def pdf_content(
-    file: UploadFile = File(..., description="PDF file to analyze"),
-    subtopic: str = Form(..., description="Subtopic to generate content for")
+    file: Optional[UploadFile] = File(None, description="PDF file to analyze"),
+    subtopic: str = Form(..., description="Subtopic to generate content for"),
+    doc_id: Optional[str] = Form(None, description="Id returned by POST /documents (instead of file)"),
 ):
     """Generate learning content for a subtopic from PDF"""
-    if not file.filename or not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Please upload a PDF file")
-    
     try:
+        parsed, _, _ = await resolve_pdf(file, doc_id)
         logger.info(f"Generating content for subtopic: {subtopic}")
-        pdf_text = extract_pdf_text(file.file)
+        pdf_text = parsed.text
         
         if not pdf_text or len(pdf_text.strip()) < 50:
             raise HTTPException(status_code=400, detail="PDF appears to be empty or has insufficient text")
         
-        chunks = chunk_text(pdf_text, chunk_size=1500)
+        chunks = get_pdf_chunks(parsed, chunk_size=1500)
         context = "\n\n".join(chunks[:3])  # Use first 3 chunks as context
         
-        result = generate_subtopic_items(subtopic=subtopic, context=context)
+        result = await generate_subtopic_items_async(subtopic=subtopic, context=context)
         logger.info(f"Generated {len(result)} content items")
         return result
         
@@ -582,113 +856,132 @@ async def pdf_content(
 
 
 # replace your existing /general route with this function
+async def _general_context(request: GeneralRequest) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Steps 1-5 of /general: index the conversation metadata, retrieve the blocks relevant
+    to the query and pack them with the recent messages into the token budget.
+    Returns (query, context, metadata_patch).
+    """
+    md = request.metadata.dict()
+    query = request.query.strip()
+
+    # 1) Build textual corpus items from metadata (keep items short & meaningful)
+    items = []
+    if md.get("events"):
+        # keep events compact
+        try:
+            ev_text = "\n".join(
+                (f"{e.get('type','event')}: {e.get('text', json.dumps(e))}" 
+                 if isinstance(e, dict) else str(e))
+                for e in md["events"]
+            )
+            items.append("Events:\n" + ev_text)
+        except Exception:
+            items.append("Events: " + json.dumps(md["events"])[:1000])
+
+    if md.get("roadmap"):
+        try:
+            items.append("Roadmap:\n" + json.dumps(md["roadmap"]))
+        except Exception:
+            items.append("Roadmap (truncated)")
+
+    # messages: preserve role + content as separate items (better retrieval granularity)
+    if md.get("messages"):
+        for m in md["messages"]:
+            role = m.get("role", "user") if isinstance(m, dict) else "user"
+            content = m.get("content", str(m)) if isinstance(m, dict) else str(m)
+            # keep messages reasonably short
+            items.append(f"{role}: {content}")
+
+    # if items is empty, build a fallback from full metadata json
+    if not items:
+        items = [json.dumps(md)[:4000]]
+
+    # 2) Create / update the vector store for the metadata corpus
+    corpus_blob = "\n\n".join(items)
+    store = None
+    if conversation_stores is not None:
+        # per-conversation store holding exactly this request's items: only chunks not indexed
+        # yet are embedded (CPU-bound: keep it off the event loop)
+        try:
+            store = await run_in_threadpool(
+                conversation_stores.update, conversation_key(request.conversation_id, items), items
+            )
+        except Exception as e:
+            logger.error(f"Error updating conversation store: {e}")
+
+    # 3) Build context using vector search (if store exists), otherwise fallback to raw blob
+    context_blocks = []
+    if store is not None:
+        try:
+            q_emb = await run_in_threadpool(get_embedding, query)
+            # the store only holds live chunks: no over-fetch / filtering needed
+            hits = await run_in_threadpool(store.search, q_emb, top_k=GENERAL_TOP_K)  # list of (text, score)
+            # take only the texts (most relevant first); pack_context drops duplicates
+            context_blocks = [h[0] if isinstance(h, (list, tuple)) else h for h in hits]
+        except Exception as e:
+            logger.warning(f"Vector search failed: {e}")
+            context_blocks = [corpus_blob]
+    else:
+        context_blocks = [corpus_blob]
+
+    # 4) Always keep the last 1-2 messages and the latest query (strong recency signal)
+    recent_blocks = []
+    for lm in (md.get("messages") or [])[-2:]:
+        if isinstance(lm, dict):
+            recent_blocks.append(f"{lm.get('role','user')}: {lm.get('content','')}")
+        else:
+            recent_blocks.append(f"user: {lm}")
+    recent_blocks.append(f"Latest user query: {query}")
+
+    # 5) Fill the model's context token budget: ranked hits first, recency blocks last
+    packed = await run_in_threadpool(
+        pack_context,
+        context_blocks,
+        recent_blocks,
+        context_budget(GENERAL_MODEL, reserve_tokens=GENERAL_MAX_TOKENS),
+    )
+    context = packed.text
+
+    # metadata patch for caching/logging
+    context_excerpt = context[:1200]
+    metadata_patch = {
+        "context_hash": hashlib.sha1(context_excerpt.encode("utf-8")).hexdigest(),
+        "context_excerpt": context_excerpt,
+        "source": "metadata_vector_search" if store is not None else "metadata_raw",
+        "items_indexed": len(items),
+        "context_tokens": packed.n_tokens,
+    }
+    return query, context, metadata_patch
+
 @app.post("/general")
-def general(request: GeneralRequest):
+async def general(request: GeneralRequest):
     """
     Accepts metadata and a query, uses metadata as context via local embeddings,
     and returns a focused answer (prioritizing recent messages).
     """
     try:
-        md = request.metadata.dict()
-        query = request.query.strip()
-
-        # 1) Build textual corpus items from metadata (keep items short & meaningful)
-        items = []
-        if md.get("events"):
-            # keep events compact
-            try:
-                ev_text = "\n".join(
-                    (f"{e.get('type','event')}: {e.get('text', json.dumps(e))}" 
-                     if isinstance(e, dict) else str(e))
-                    for e in md["events"]
-                )
-                items.append("Events:\n" + ev_text)
-            except Exception:
-                items.append("Events: " + json.dumps(md["events"])[:1000])
-
-        if md.get("roadmap"):
-            try:
-                items.append("Roadmap:\n" + json.dumps(md["roadmap"]))
-            except Exception:
-                items.append("Roadmap (truncated)")
-
-        # messages: preserve role + content as separate items (better retrieval granularity)
-        if md.get("messages"):
-            for m in md["messages"]:
-                role = m.get("role", "user") if isinstance(m, dict) else "user"
-                content = m.get("content", str(m)) if isinstance(m, dict) else str(m)
-                # keep messages reasonably short
-                items.append(f"{role}: {content}")
-
-        # if items is empty, build a fallback from full metadata json
-        if not items:
-            items = [json.dumps(md)[:4000]]
-
-        # 2) Create / load vector store for the metadata corpus
-        # join into a single text blob for hashing in get_or_create_store
-        corpus_blob = "\n\n".join(items)
-        store = get_or_create_store(corpus_blob)
-
-        # 3) Build context using vector search (if store exists), otherwise fallback to raw blob
-        context_blocks = []
-        TOP_K = 6
-        if store is not None:
-            try:
-                q_emb = get_embedding(query)
-                hits = store.search(q_emb, top_k=TOP_K)  # returns list of (text, score)
-                # take only the texts (most relevant first)
-                context_blocks = [h[0] if isinstance(h, (list, tuple)) else h for h in hits]
-                # dedupe while preserving order
-                seen = set()
-                deduped = []
-                for c in context_blocks:
-                    if c not in seen:
-                        deduped.append(c)
-                        seen.add(c)
-                context_blocks = deduped
-            except Exception as e:
-                logger.warning(f"Vector search failed: {e}")
-                context_blocks = [corpus_blob]
-        else:
-            context_blocks = [corpus_blob]
+        query, context, metadata_patch = await _general_context(request)
 
-        # 4) Always append the last 1-2 messages explicitly to prioritize recency
-        last_msgs = (md.get("messages") or [])[-2:]
-        for lm in last_msgs:
-            if isinstance(lm, dict):
-                context_blocks.append(f"{lm.get('role','user')}: {lm.get('content','')}")
-            else:
-                context_blocks.append(f"user: {lm}")
-
-        # 5) Append the latest user query (strong recency signal)
-        context_blocks.append(f"Latest user query: {query}")
-
-        # 6) Assemble final context string, trimming to safe length
-        # adjust trim_chars to suit your LLM token budget (e.g., 3000-6000 characters)
-        trim_chars = 4000
-        context = "\n\n".join(context_blocks)
-        if len(context) > trim_chars:
-            # keep most relevant: take top hits and always keep the tail (recent messages + query)
-            # find split point where we keep last ~1000 chars for recency then fill from start
-            tail = "\n\n".join(context_blocks[-3:])  # last few blocks
-            head = "\n\n".join(context_blocks[: max(0, TOP_K - 3)])
-            composed = head + "\n\n" + tail
-            context = composed[:trim_chars]
-
-        # 7) Call your LLM wrapper with the context and query
-        answer = generate_general_response(context, query)
-
-        # 8) Return structured response plus a small metadata patch for caching/logging
-        context_excerpt = context[:1200]
-        metadata_patch = {
-            "context_hash": hashlib.sha1(context_excerpt.encode("utf-8")).hexdigest(),
-            "context_excerpt": context_excerpt,
-            "source": "metadata_vector_search" if store is not None else "metadata_raw",
-            "items_indexed": len(items)
-        }
+        # 6) Call your LLM wrapper with the context and query
+        answer = await generate_general_response_async(context, query)
 
         return answer
 
     except Exception as e:
         logger.exception("Error in /general route")
         raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
+
+@app.post("/general/stream")
+async def general_stream(request: GeneralRequest):
+    """
+    Streaming /general: the answer arrives as server-sent "token" events while the model
+    generates it, then a "done" event carries the full answer and the metadata_patch.
+    """
+    try:
+        query, context, metadata_patch = await _general_context(request)
+    except Exception as e:
+        logger.exception("Error in /general/stream route")
+        raise HTTPException(status_code=500, detail=f"Error generating response: {str(e)}")
+
+    return _sse_response(_sse_answer(generate_general_response_stream(context, query), {"metadata_patch": metadata_patch}))
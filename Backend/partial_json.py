@@ -0,0 +1,277 @@
+"""
+Incremental and best-effort parsing of JSON produced by an LLM.
+
+The roadmap prompt asks for one top-level JSON array. When the completion is
+streamed, each element of that array can be used as soon as its closing
+bracket arrives instead of after the whole (2000+ token) array. The scanner
+below walks every character once, tracking strings/escapes and bracket
+depth, and hands out each complete top-level element.
+
+Public API:
+    ArrayElementStream().feed(text) -> List[Any]   # elements completed by this piece of text
+    ArrayElementStream.done                        # True once the top-level array has closed
+    recover_json(text) -> Any | None               # outermost valid array/object in a whole completion
+
+The stream locks onto the first "[" followed by "{" (whitespace aside):
+text before it (code fences, a preface such as "Roadmap [v1]:") is skipped.
+An element that does not parse is dropped; callers can still parse the full
+text at the end if the stream yielded nothing (e.g. the model returned a
+single object, or an array of strings, instead of an array of objects).
+
+recover_json() is the linear-time replacement for the old candidate search
+(every balanced span, sorted by length, json.loads on each): it strips code
+fences, scans for top-level spans, parses each disjoint span at most
+once, closes a truncated trailing array/object after its last complete
+value (nested container or scalar), and as a last resort keeps the valid
+elements of a broken array. An opener that turns out to be prose (an
+unclosed "[" inside a quote, a mismatched bracket) is skipped and the scan
+resumes right after it, as long as a closing bracket or comma past it could
+still complete a value and the rescans stay within a budget of characters.
+"""
+
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_OPEN = "[{"
+_CLOSE = "]}"
+_CLOSER = {"[": "]", "{": "}"}
+_FENCE_RE = re.compile(r"```[A-Za-z0-9_-]*[ \t]*\n?(.*?)(?:```|$)", re.S)
+# how many earlier cut points to try when closing a truncated value
+_MAX_REPAIR_ATTEMPTS = 3
+# how many times a failed opener ("hi [ there", a mismatched span) is skipped to rescan right after it
+_MAX_RESCANS = 16
+# rescans stop once they have scanned this many times the length of the text in total
+_MAX_SCAN_FACTOR = 4
+
+
+class ArrayElementStream:
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0               # next index of _buf to scan
+        self._depth = 0             # bracket depth; 1 = inside the top-level array
+        self._in_str = False
+        self._esc = False
+        self._elem_start: Optional[int] = None
+        self.started = False        # top-level "[" (followed by "{") seen
+        self.done = False           # top-level array closed
+        self.skipped = 0            # elements that failed to parse
+
+    def feed(self, text: str) -> List[Any]:
+        if self.done or not text:
+            return []
+        self._buf += text
+        out: List[Any] = []
+        buf = self._buf
+        i = self._pos
+        n = len(buf)
+        while i < n:
+            c = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                    if self._depth == 1 and self._elem_start is not None:
+                        self._emit(buf[self._elem_start:i + 1], out)
+            elif not self.started:
+                if c == "[":
+                    # the roadmap is an array of objects: "[v1]" or "[1]" in a preface is not it
+                    j = i + 1
+                    while j < n and buf[j].isspace():
+                        j += 1
+                    if j == n:
+                        break   # undecided: rescan this "[" once more text arrives
+                    if buf[j] == "{":
+                        self.started = True
+                        self._depth = 1
+            elif c == '"':
+                self._in_str = True
+                if self._depth == 1:
+                    self._elem_start = i
+            elif c in _OPEN:
+                if self._depth == 1:
+                    self._elem_start = i
+                self._depth += 1
+            elif c in _CLOSE:
+                self._depth -= 1
+                if self._depth == 1 and self._elem_start is not None:
+                    self._emit(buf[self._elem_start:i + 1], out)
+                elif self._depth == 0:
+                    self.done = True
+                    i += 1
+                    break
+            i += 1
+
+        # keep only the unfinished element (or nothing) buffered
+        keep = self._elem_start if self._elem_start is not None else i
+        self._buf = buf[keep:]
+        self._pos = i - keep
+        if self._elem_start is not None:
+            self._elem_start = 0
+        return out
+
+    def _emit(self, element: str, out: List[Any]) -> None:
+        self._elem_start = None
+        try:
+            out.append(json.loads(element))
+        except (ValueError, RecursionError):
+            self.skipped += 1
+
+
+def _strip_fences(text: str) -> str:
+    """Content of the first ```fenced``` block (an unclosed fence runs to the end), else the text itself."""
+    if "```" not in text:
+        return text
+    m = _FENCE_RE.search(text)
+    body = m.group(1).strip() if m else ""
+    return body or text.replace("```", "")
+
+
+def _loads(text: str) -> Tuple[bool, Any]:
+    try:
+        return True, json.loads(text)
+    except (ValueError, RecursionError):  # RecursionError: absurdly deep nesting
+        return False, None
+
+
+def _scan(text: str, pos: int = 0):
+    """
+    One pass over text[pos:]. Returns (spans, open_start, cuts, stack, mismatch):
+      spans      - (start, end, children) of every complete top-level [...] / {...};
+                   children are the (start, end) of its nested containers one level down
+      open_start - start of a top-level value still open at the end (truncated), else None
+      cuts       - (index after a closing bracket or before a comma, depth there) inside that open value
+      stack      - its brackets still open at the end
+      mismatch   - (span start, index) of a mismatched closing bracket; the pass stops there
+    Strings are only tracked inside brackets, so quotes in surrounding prose are ignored.
+    """
+    spans: List[Tuple[int, int, List[Tuple[int, int]]]] = []
+    cuts: List[Tuple[int, int]] = []
+    children: List[Tuple[int, int]] = []
+    stack: List[str] = []
+    start = child = None
+    in_str = esc = False
+    for i in range(pos, len(text)):
+        c = text[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif c == "\\":
+                esc = True
+            elif c == '"':
+                in_str = False
+        elif c in _OPEN:
+            if not stack:
+                start, cuts, children = i, [], []
+            elif len(stack) == 1:
+                child = i
+            stack.append(c)
+        elif not stack:
+            continue
+        elif c == '"':
+            in_str = True
+        elif c == ",":
+            # a comma follows a complete value: "[1,2,3" can be cut to "[1,2" and closed
+            cuts.append((i, len(stack)))
+        elif c in _CLOSE:
+            if _CLOSER[stack[-1]] != c:
+                return spans, None, [], [], (start, i)
+            stack.pop()
+            if len(stack) == 1:
+                children.append((child, i + 1))
+            if stack:
+                cuts.append((i + 1, len(stack)))
+            else:
+                spans.append((start, i + 1, children))
+                start = None
+    return spans, (start if stack else None), cuts, stack, None
+
+
+def _close_truncated(text: str, start: int, cuts: List[Tuple[int, int]], stack: List[str]) -> Tuple[bool, Any]:
+    """
+    Repair a value cut off mid-stream: keep everything up to a point right after a complete
+    nested value or before a comma, and close the brackets still open there. For the last cut the stack below
+    its depth is unchanged (any later pop would have recorded a later cut), so its prefix
+    gives the exact closers; earlier cuts are a cheap best effort.
+    """
+    for end, depth in reversed(cuts[-_MAX_REPAIR_ATTEMPTS:]):
+        closing = "".join(_CLOSER[b] for b in reversed(stack[:depth]))
+        ok, value = _loads(text[start:end] + closing)
+        if ok:
+            return True, value
+    return False, None
+
+
+def _salvage(text: str, start: int, children: List[Tuple[int, int]]) -> Optional[Any]:
+    """A span that does not parse as a whole: its valid nested containers (all of them for an array, the largest for an object)."""
+    values = []
+    for s, e in children:
+        ok, value = _loads(text[s:e])
+        if ok:
+            values.append((e - s, value))
+    if not values:
+        return None
+    if text[start] == "[":
+        return [v for _, v in values]
+    return max(values, key=lambda t: t[0])[1]
+
+
+def recover_json(text: str) -> Optional[Any]:
+    """
+    Best-effort parse of an LLM completion that should contain one JSON array/object.
+    Tries, in order: the whole (fence-stripped) text, the longest complete top-level span
+    that parses, a truncated trailing value closed after its last complete element, and
+    finally the valid nested containers of the longest span that did not parse.
+    An opener that never closes or hits a mismatched bracket may be prose ('He said "hi [ there"'),
+    so scanning resumes right after it (up to _MAX_RESCANS times, then past the bad bracket).
+    Rescanning stops early when no "]", "}" or "," follows the resume point (nothing there can
+    complete a value) or once _MAX_SCAN_FACTOR * len(text) characters have been scanned.
+    Returns None when nothing usable is found. Linear in len(text).
+    """
+    text = _strip_fences((text or "").strip())
+    ok, value = _loads(text)
+    if ok and isinstance(value, (list, dict)):
+        return value
+
+    best = None
+    best_len = -1
+    broken = None
+    pos = 0
+    rescans = 0
+    # past this index no pass can close a value or record a cut
+    last_closable = max(text.rfind("]"), text.rfind("}"), text.rfind(","))
+    scan_budget = _MAX_SCAN_FACTOR * len(text)
+    while True:
+        spans, open_start, cuts, stack, mismatch = _scan(text, pos)
+        scan_budget -= (mismatch[1] if mismatch is not None else len(text)) - pos
+        # spans of one pass are disjoint and later passes start after them: parsing all is O(n)
+        for start, end, children in spans:
+            if end - start <= best_len:
+                continue
+            ok, value = _loads(text[start:end])
+            if ok:
+                best, best_len = value, end - start
+            elif broken is None or end - start > broken[1] - broken[0]:
+                broken = (start, end, children)
+        if open_start is not None:
+            if len(text) - open_start <= best_len:
+                break
+            ok, value = _close_truncated(text, open_start, cuts, stack)
+            if ok:
+                return value
+            if rescans >= _MAX_RESCANS:
+                break
+            pos = open_start + 1
+        elif mismatch is not None:
+            pos = mismatch[0] + 1 if rescans < _MAX_RESCANS and scan_budget > 0 else mismatch[1] + 1
+        else:
+            break
+        if pos > last_closable or (scan_budget <= 0 and mismatch is None):
+            break
+        rescans += 1
+    if best is None and broken is not None:
+        return _salvage(text, broken[0], broken[2])
+    return best
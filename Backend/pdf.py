@@ -4,82 +4,306 @@ learning content using OpenRouter.
 
 Functions:
 1. generate_pdf_topics(pdf_file: UploadFile, query: str, chunk_size=1000) -> List[Dict]
+   generate_pdf_topics_async(...)  # same arguments, awaitable
 2. generate_pdf_subtopic_items(pdf_file: UploadFile, subtopic: str, chunk_size=1000) -> List[Dict]
 
+Uploaded PDFs are parsed once: ParsedPDF objects are cached in memory by the
+sha256 of their bytes (the document id) and, once registered through
+save_parsed_pdf(), persisted under PDF_DOCUMENT_DIR so load_parsed_pdf(doc_id)
+works across restarts and workers. The directory is bounded
+(PDF_DOCUMENT_MAX_BYTES / PDF_DOCUMENT_MAX_ENTRIES) like the vector store disk
+tier: loading a document refreshes its mtime, and a save removes the least
+recently used documents until both bounds hold.
+
 Each function extracts text from the PDF, chunks it for context,
 and then calls either the roadmap generator or QA/STUDY generator.
+Per-chunk topic generation fans out concurrently (bounded by
+PDF_MAX_CONCURRENCY) and results are merged back in chunk order.
 """
 
 import os
+import re
 import json
-from typing import List
-from PyPDF2 import PdfReader
-import requests
+import logging
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 from dotenv import load_dotenv
 
+from chunking import chunk_text_tokens
+from llm_gateway import chat_completion, chat_completion_async
+from partial_json import recover_json
+from pdf_extract import extract_pages
+from store_cache import BoundedCache
+
 # Load env vars
 load_dotenv()
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 if not OPENROUTER_API_KEY:
     raise RuntimeError("OPENROUTER_API_KEY not found in environment")
 
+# Max number of chunk completions in flight at once for a single PDF
+PDF_MAX_CONCURRENCY = int(os.getenv("PDF_MAX_CONCURRENCY", "8"))
+
+# Parsed-PDF cache (keyed by sha256 of the uploaded bytes): bounded by text bytes and entry count
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "128"))
+PDF_CACHE_TTL_SECONDS = float(os.getenv("PDF_CACHE_TTL_SECONDS", "3600"))
+# Where ingested documents (page texts) are persisted, one <doc_id>.json per PDF
+PDF_DOCUMENT_DIR = os.getenv("PDF_DOCUMENT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "documents"))
+# Budget of PDF_DOCUMENT_DIR (<= 0 disables a bound); least recently used documents are removed first
+PDF_DOCUMENT_MAX_BYTES = int(os.getenv("PDF_DOCUMENT_MAX_BYTES", str(1024 * 1024 * 1024)))
+PDF_DOCUMENT_MAX_ENTRIES = int(os.getenv("PDF_DOCUMENT_MAX_ENTRIES", "4096"))
+
+logger = logging.getLogger(__name__)
+
+_DOC_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+_DOC_FILE_RE = re.compile(r"^[0-9a-f]{64}\.json$")
+_document_dir_lock = threading.Lock()
+
 
 # ------------------- PDF Helpers -------------------
 
+def extract_pdf_pages(file) -> List[str]:
+    """Extract the text of every page (in order) from a PDF file object or raw bytes.
+    Large documents are split across a process pool (see pdf_extract.py)."""
+    data = file if isinstance(file, (bytes, bytearray)) else file.read()
+    return extract_pages(bytes(data))
+
+
+def _join_pages(pages: List[str]) -> str:
+    return "\n".join(p for p in pages if p).strip()
+
+
 def extract_pdf_text(file) -> str:
     """Extract all text from a PDF file."""
-    reader = PdfReader(file)
-    text = ""
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:
-            text += page_text + "\n"
-    return text.strip()
+    return _join_pages(extract_pdf_pages(file))
 
 
-def chunk_text(text: str, chunk_size: int = 1000) -> List[str]:
-    """Split text into chunks of approximately chunk_size words."""
-    words = text.split()
-    return [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
+def chunk_text(text: str, chunk_size: int = 1000, overlap_tokens: int = 0) -> List[str]:
+    """Split text into sentence-aligned chunks of at most chunk_size tokens (see chunking.py)."""
+    return [c.text for c in chunk_text_tokens(text, max_tokens=chunk_size, overlap_tokens=overlap_tokens)]
 
 
-# ------------------- API Call Helpers -------------------
+# ------------------- Parsed-PDF Cache -------------------
 
-def call_openrouter(messages: List[dict], model="openai/gpt-4o-mini", max_tokens=2000, temperature=0.3) -> str:
-    """Call OpenRouter API and return assistant text."""
-    headers = {"Authorization": f"Bearer {OPENROUTER_API_KEY}", "Content-Type": "application/json"}
-    payload = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+class ParsedPDF:
+    """Extracted text of one uploaded PDF (whole and per page) plus the chunkings derived from it (memoized per chunk_size)."""
+
+    def __init__(self, digest: str, pages: List[str], filename: str = ""):
+        self.digest = digest
+        self.pages = pages
+        self.filename = filename
+        self.text = _join_pages(pages)
+        self._chunks: Dict[int, List[str]] = {}
+
+    def nbytes(self) -> int:
+        chunk_bytes = sum(len(c) + 50 for chunks in self._chunks.values() for c in chunks)
+        return len(self.text) + sum(len(p) + 50 for p in self.pages) + chunk_bytes
+
+
+_parsed_pdf_cache = BoundedCache(
+    max_bytes=PDF_CACHE_MAX_BYTES,
+    max_entries=PDF_CACHE_MAX_ENTRIES,
+    ttl_seconds=PDF_CACHE_TTL_SECONDS,
+)
+
+
+def parse_pdf_bytes(data: bytes) -> ParsedPDF:
+    """Return the parsed PDF for these bytes; a repeated upload skips PyPDF2 entirely."""
+    digest = hashlib.sha256(data).hexdigest()
+    parsed = _parsed_pdf_cache.get(digest)
+    if parsed is None:
+        parsed = ParsedPDF(digest, extract_pdf_pages(data))
+        _parsed_pdf_cache.put(digest, parsed)
+    return parsed
+
+
+def cache_parsed_pdf(digest: str, pages: List[str]) -> ParsedPDF:
+    """Register pages extracted elsewhere (e.g. by the streaming ingest in ingest.py) under their upload digest."""
+    parsed = ParsedPDF(digest, pages)
+    _parsed_pdf_cache.put(digest, parsed)
+    return parsed
 
-    resp = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+
+def get_cached_parsed_pdf(digest: str) -> Optional[ParsedPDF]:
+    return _parsed_pdf_cache.get(digest)
+
+
+def _document_path(doc_id: str) -> str:
+    # ids are sha256 digests; refuse anything else so an id can never escape the directory
+    if not _DOC_ID_RE.match(doc_id or ""):
+        raise ValueError(f"Invalid document id: {doc_id!r}")
+    return os.path.join(PDF_DOCUMENT_DIR, f"{doc_id}.json")
+
+
+def save_parsed_pdf(parsed: ParsedPDF) -> bool:
+    """Persist the page texts of a parsed PDF under its digest (atomic; an existing file counts as success)."""
+    path = _document_path(parsed.digest)
+    if os.path.exists(path):
+        _touch(path)
+        return True
+    tmp_path = f"{path}.{os.getpid()}.tmp"
     try:
-        return data["choices"][0]["message"]["content"] or ""
-    except Exception:
-        return data.get("choices", [{}])[0].get("text", "") or ""
+        os.makedirs(PDF_DOCUMENT_DIR, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"doc_id": parsed.digest, "filename": parsed.filename, "pages": parsed.pages}, f)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"Failed to persist document {parsed.digest}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    _evict_documents(keep=os.path.basename(path))
+    return True
 
 
-def extract_json(text: str):
-    """Attempt to extract JSON from a model output."""
-    text = text.strip()
+def _touch(path: str) -> None:
+    # mtime = last use, for LRU eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _evict_documents(keep: str) -> None:
+    """Remove least recently used documents (oldest mtime) until both bounds hold; never `keep`."""
+    with _document_dir_lock:
+        try:
+            entries = []
+            for e in os.scandir(PDF_DOCUMENT_DIR):
+                if e.is_file() and _DOC_FILE_RE.match(e.name):
+                    st = e.stat()
+                    entries.append((st.st_mtime, e.name, st.st_size))
+        except OSError as e:
+            logger.warning(f"Document directory scan failed: {e}")
+            return
+        entries.sort()
+        count = len(entries)
+        total = sum(size for _, _, size in entries)
+        for _, name, size in entries:
+            if (PDF_DOCUMENT_MAX_ENTRIES <= 0 or count <= PDF_DOCUMENT_MAX_ENTRIES) and \
+                    (PDF_DOCUMENT_MAX_BYTES <= 0 or total <= PDF_DOCUMENT_MAX_BYTES):
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(os.path.join(PDF_DOCUMENT_DIR, name))
+            except OSError:
+                continue
+            count -= 1
+            total -= size
+
+
+def load_parsed_pdf(doc_id: str) -> Optional[ParsedPDF]:
+    """Return a registered document by id: memory cache first, then PDF_DOCUMENT_DIR. None if unknown."""
+    parsed = _parsed_pdf_cache.get(doc_id)
+    if parsed is not None:
+        return parsed
+    path = _document_path(doc_id)
+    if not os.path.exists(path):
+        return None
     try:
-        return json.loads(text)
-    except Exception:
-        # fallback: return empty
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        parsed = ParsedPDF(doc_id, data["pages"], data.get("filename", ""))
+    except Exception as e:
+        logger.warning(f"Failed to load document {doc_id}: {e}")
         return None
+    _touch(path)
+    _parsed_pdf_cache.put(doc_id, parsed)
+    return parsed
+
+
+def get_pdf_chunks(parsed: ParsedPDF, chunk_size: int = 1000) -> List[str]:
+    """chunk_text() for a parsed PDF, cached alongside its text."""
+    chunks = parsed._chunks.get(chunk_size)
+    if chunks is None:
+        chunks = parsed._chunks[chunk_size] = chunk_text(parsed.text, chunk_size)
+        # re-put so the cache re-measures the entry with its new chunking
+        _parsed_pdf_cache.put(parsed.digest, parsed)
+    return chunks
+
+
+def parsed_pdf_cache_stats() -> Dict[str, Any]:
+    return _parsed_pdf_cache.stats()
+
+
+# ------------------- API Call Helpers -------------------
+
+def call_openrouter(messages: List[dict], model="openai/gpt-4o-mini", max_tokens=2000, temperature=0.3) -> str:
+    """Call OpenRouter API (through the pooled llm_gateway) and return assistant text."""
+    return chat_completion(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+
+
+async def call_openrouter_async(messages: List[dict], model="openai/gpt-4o-mini", max_tokens=2000, temperature=0.3) -> str:
+    """Awaitable variant of call_openrouter."""
+    return await chat_completion_async(messages, model=model, temperature=temperature, max_tokens=max_tokens)
+
+
+def extract_json(text: str):
+    """Attempt to extract JSON from a model output (fences, surrounding prose, truncated tail)."""
+    return recover_json(text)
 
 
 # ------------------- Main PDF Functions -------------------
 
-def generate_pdf_topics(pdf_file, query: str, chunk_size: int = 1000, model="openai/gpt-4o-mini") -> List[dict]:
+TOPICS_SYSTEM_PROMPT = (
+    "You are an assistant that MUST output only valid JSON. "
+    "The top-level value MUST be an array. Each element is an object with keys: "
+    "'type' (TOPIC), 'name' (topic title), 'subtopics' (array of SUBTOPIC objects). "
+    "Each SUBTOPIC object has keys: 'type' (SUBTOPIC), 'name', 'content'. "
+    "Generate at least 5 topics, each with at least 5 subtopics, using the PDF context."
+)
+
+
+def _topics_messages(chunk: str, query: str) -> List[dict]:
+    user_prompt = f"Subject/Query: {query}\n\nContext from PDF:\n{chunk}\n\nReturn JSON array of topics only."
+    return [{"role": "system", "content": TOPICS_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}]
+
+
+def _chunk_error_topic(e: Exception, assistant_text: str = "") -> dict:
+    return {
+        "type": "TOPIC",
+        "name": f"RESOURCE (error in chunk: {str(e)})",
+        "subtopics": [{"type": "SUBTOPIC", "name": "RESOURCE", "content": assistant_text or ""}]
+    }
+
+
+def _topics_from_text(assistant_text: str) -> List[dict]:
+    parsed = extract_json(assistant_text)
+    if not parsed:
+        return []
+    return parsed if isinstance(parsed, list) else [parsed]
+
+
+def _merge_chunk_results(per_chunk: List[List[dict]]) -> List[dict]:
+    """Flatten per-chunk topic lists (already in chunk order) and apply the empty fallback."""
+    all_results = [topic for chunk_topics in per_chunk for topic in chunk_topics]
+
+    # If no valid results from any chunk, fallback
+    if not all_results:
+        return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": "RESOURCE", "content": "No content generated"}]}]
+
+    return all_results
+
+
+def generate_pdf_topics(pdf_file, query: str, chunk_size: int = 1000, model="openai/gpt-4o-mini",
+                        max_concurrency: int = PDF_MAX_CONCURRENCY) -> List[dict]:
     """
     Generate topics and subtopics from a PDF.
     Returns list of topic dicts:
     [
         {"type":"TOPIC", "name":"...", "subtopics":[{"type":"SUBTOPIC","name":"...","content":"..."}]}
     ]
+    Chunks are sent concurrently (at most max_concurrency at a time); a failing chunk
+    only contributes an error RESOURCE topic and never stops the others.
     """
     text = extract_pdf_text(pdf_file)
     if not text:
@@ -87,40 +311,44 @@ def generate_pdf_topics(pdf_file, query: str, chunk_size: int = 1000, model="ope
 
     chunks = chunk_text(text, chunk_size)
 
-    system_prompt = (
-        "You are an assistant that MUST output only valid JSON. "
-        "The top-level value MUST be an array. Each element is an object with keys: "
-        "'type' (TOPIC), 'name' (topic title), 'subtopics' (array of SUBTOPIC objects). "
-        "Each SUBTOPIC object has keys: 'type' (SUBTOPIC), 'name', 'content'. "
-        "Generate at least 5 topics, each with at least 5 subtopics, using the PDF context."
-    )
+    def topics_for_chunk(chunk: str) -> List[dict]:
+        assistant_text = ""
+        try:
+            assistant_text = call_openrouter(_topics_messages(chunk, query), model=model)
+            return _topics_from_text(assistant_text)
+        except Exception as e:
+            # log chunk errors without stopping all processing
+            return [_chunk_error_topic(e, assistant_text)]
+
+    # the pooled gateway does the I/O; threads here only wait on it. map() keeps chunk order.
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(chunks)))) as pool:
+        per_chunk = list(pool.map(topics_for_chunk, chunks))
 
-    all_results = []
+    return _merge_chunk_results(per_chunk)
 
-    for chunk in chunks:
-        user_prompt = f"Subject/Query: {query}\n\nContext from PDF:\n{chunk}\n\nReturn JSON array of topics only."
+
+async def generate_pdf_topics_async(pdf_file, query: str, chunk_size: int = 1000, model="openai/gpt-4o-mini",
+                                    max_concurrency: int = PDF_MAX_CONCURRENCY) -> List[dict]:
+    """Async variant of generate_pdf_topics (same output, chunks fanned out with a semaphore)."""
+    text = await asyncio.to_thread(extract_pdf_text, pdf_file)
+    if not text:
+        return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": "RESOURCE", "content": "PDF has no text"}]}]
+
+    chunks = chunk_text(text, chunk_size)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def topics_for_chunk(chunk: str) -> List[dict]:
+        assistant_text = ""
         try:
-            assistant_text = call_openrouter(
-                [{"role": "system", "content": system_prompt},
-                 {"role": "user", "content": user_prompt}],
-                model=model
-            )
-            parsed = extract_json(assistant_text)
-            if parsed:
-                all_results.extend(parsed)
+            async with semaphore:
+                assistant_text = await call_openrouter_async(_topics_messages(chunk, query), model=model)
+            return _topics_from_text(assistant_text)
         except Exception as e:
-            # Optional: log chunk errors without stopping all processing
-            all_results.append({
-                "type": "TOPIC",
-                "name": f"RESOURCE (error in chunk: {str(e)})",
-                "subtopics": [{"type": "SUBTOPIC", "name": "RESOURCE", "content": assistant_text or ""}]
-            })
+            return [_chunk_error_topic(e, assistant_text)]
 
-    # If no valid results from any chunk, fallback
-    if not all_results:
-        return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": "RESOURCE", "content": "No content generated"}]}]
-
-    return all_results
+    # gather preserves input order, so topics stay in chunk order
+    per_chunk = await asyncio.gather(*(topics_for_chunk(c) for c in chunks))
+    return _merge_chunk_results(per_chunk)
     # text = extract_pdf_text(pdf_file)
     # if not text:
     #     return [{"type": "TOPIC", "name": "RESOURCE", "subtopics": [{"type": "SUBTOPIC", "name": "RESOURCE", "content": "PDF has no text"}]}]
@@ -0,0 +1,134 @@
+"""
+Parallel per-page PDF text extraction.
+
+PyPDF2 extraction is pure Python and holds the GIL, so large documents are
+split into contiguous page ranges and extracted in a process pool. Pages come
+back in page order and are kept separately so later stages can cite them.
+
+extract_pages() gives each worker one range (the PDF bytes are shipped once
+per worker). iter_pages() feeds a streaming consumer instead: it starts with
+small leading ranges (PDF_FIRST_RANGE_PAGES, doubling up to one worker's
+share) so the first pages are ready almost at once and chunking/embedding
+can run while the rest of the document is still being extracted; the task
+count, and with it the copies of the bytes, stays at about
+workers + log2(share / PDF_FIRST_RANGE_PAGES).
+
+This module only depends on PyPDF2 so pool workers (spawned, not forked:
+the API process runs background threads) start fast.
+
+Public API:
+    extract_pages(data: bytes, max_workers: int | None = None) -> List[str]   # one string per page ("" if no text)
+    iter_pages(data: bytes, max_workers: int | None = None) -> Iterator[str]  # same pages, yielded range by range
+"""
+
+import io
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from PyPDF2 import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Below this many pages the pool overhead is not worth it: extract in-process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# iter_pages: size of the first range; later ranges double up to one worker's share of the document
+PDF_FIRST_RANGE_PAGES = int(os.getenv("PDF_FIRST_RANGE_PAGES", "8"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def _page_text(page) -> str:
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        # one broken page should not lose the whole document
+        return ""
+
+
+def extract_page_range(data: bytes, start: int, end: int) -> List[str]:
+    """Extract pages [start, end) of the PDF in `data` (runs inside pool workers)."""
+    reader = PdfReader(io.BytesIO(data))
+    return [_page_text(reader.pages[i]) for i in range(start, end)]
+
+
+def _page_ranges(n_pages: int, max_workers: Optional[int], first_range: int = 0) -> List[Tuple[int, int]]:
+    """
+    Contiguous [start, end) ranges covering the document: one per worker, or with first_range > 0
+    leading ranges of first_range, 2 * first_range, ... pages up to one worker's share, then shares.
+    """
+    workers = min(max_workers or PDF_EXTRACT_WORKERS, n_pages // max(1, PDF_PARALLEL_MIN_PAGES // 2) or 1)
+    if n_pages < PDF_PARALLEL_MIN_PAGES or workers <= 1:
+        return [(0, n_pages)]
+    if first_range <= 0:
+        bounds = [n_pages * i // workers for i in range(workers + 1)]
+        return [(bounds[i], bounds[i + 1]) for i in range(workers)]
+    share = -(-n_pages // workers)
+    ranges = []
+    start, size = 0, min(first_range, share)
+    while start < n_pages:
+        end = min(start + size, n_pages)
+        ranges.append((start, end))
+        start, size = end, min(2 * size, share)
+    return ranges
+
+
+def extract_pages(data: bytes, max_workers: Optional[int] = None) -> List[str]:
+    """Return the text of every page, in page order."""
+    reader = PdfReader(io.BytesIO(data))
+    return list(_iter_ranges(data, reader, _page_ranges(len(reader.pages), max_workers)))
+
+
+def iter_pages(data: bytes, max_workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield page texts in page order, starting with small leading ranges so the first pages
+    arrive long before the whole document is extracted. A range is yielded as soon as it
+    and every range before it are done.
+    """
+    reader = PdfReader(io.BytesIO(data))
+    yield from _iter_ranges(data, reader, _page_ranges(len(reader.pages), max_workers, PDF_FIRST_RANGE_PAGES))
+
+
+def _iter_ranges(data: bytes, reader: PdfReader, ranges: List[Tuple[int, int]]) -> Iterator[str]:
+    n_pages = len(reader.pages)
+    if len(ranges) == 1:
+        for page in reader.pages:
+            yield _page_text(page)
+        return
+
+    futures = []
+    done = 0  # pages already yielded
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(extract_page_range, data, start, end) for start, end in ranges]
+        for fut in futures:
+            for text in fut.result():
+                done += 1
+                yield text
+    except GeneratorExit:
+        for fut in futures:
+            fut.cancel()
+        raise
+    except Exception as e:
+        logger.warning(f"Parallel PDF extraction failed, continuing serially at page {done}: {e}")
+        for fut in futures:
+            fut.cancel()
+        for i in range(done, n_pages):
+            yield _page_text(reader.pages[i])
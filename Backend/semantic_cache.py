@@ -0,0 +1,208 @@
+"""
+Semantic near-duplicate cache for LLM results keyed by a short query.
+
+The exact-match cache (llm_cache.py) misses "learn python", "Python
+programming" and "python basics", which all produce near-identical
+roadmaps. This layer embeds the (lower-cased, whitespace-collapsed) query
+with the embeddings.py model, searches the queries answered before in a
+VectorStore, and returns the stored result when the best cosine similarity
+is at or above `threshold`. Entries are namespaced (e.g. by model) and
+expire after a TTL.
+
+Every lookup records whether it hit and the best similarity seen, as a
+histogram split into hits and misses plus recent quantiles, so the threshold
+can be tuned from /cache/stats.
+
+Public API:
+    SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=..., ttl_seconds=..., embed=None)
+    .lookup(query, namespace="") -> Any | None    # a fresh copy of the cached value
+    .add(query, value, namespace="")
+    .stats() -> dict
+    normalize_query(query) -> str
+    roadmap_semantic_cache                        # shared instance used by client.generate_api_response*
+
+Embedding failures are logged and treated as a miss, never raised.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from vectorstore import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity (all-MiniLM-L6-v2) at which a previous answer is reused
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+# 0 disables the semantic cache
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# nearest neighbours checked per lookup (skips other namespaces / expired rows)
+_CANDIDATES = 8
+_HIST_BUCKETS = 20
+_RECENT_SIMILARITIES = 1000
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return _SPACE_RE.sub(" ", (query or "").strip().lower())
+
+
+def _default_embed(text: str) -> List[float]:
+    # imported lazily: sentence-transformers is only loaded once the cache is used
+    from embeddings import get_embedding
+    return get_embedding(text)
+
+
+class _Entry(NamedTuple):
+    query: str
+    namespace: str
+    value: str          # JSON text; decoded per hit so callers get their own copy
+    created_at: float
+
+
+class SemanticCache:
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+        embed: Optional[Callable[[str], List[float]]] = None,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._embed = embed or _default_embed
+        self._store: Optional[VectorStore] = None
+        # store payload (entry id) -> entry, in insertion order
+        self._entries: Dict[str, _Entry] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._hist_hits = [0] * _HIST_BUCKETS
+        self._hist_misses = [0] * _HIST_BUCKETS
+        self._recent: "deque[float]" = deque(maxlen=_RECENT_SIMILARITIES)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _vector(self, text: str) -> Optional[List[float]]:
+        try:
+            return self._embed(text)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            with self._lock:
+                self.errors += 1
+            return None
+
+    def lookup(self, query: str, namespace: str = "") -> Optional[Any]:
+        """Value stored for the most similar earlier query in `namespace` if it clears the threshold, else None."""
+        text = normalize_query(query)
+        if not self.enabled or not text:
+            return None
+        vec = self._vector(text) if self._entries else None
+        now = time.time()
+        with self._lock:
+            best: Optional[_Entry] = None
+            best_sim = None
+            if vec is not None and self._store is not None:
+                for payload, sim in self._store.search(vec, top_k=_CANDIDATES):
+                    entry = self._entries.get(payload)
+                    if entry is not None and entry.namespace == namespace and not self._expired(entry, now):
+                        best, best_sim = entry, sim
+                        break
+            hit = best is not None and best_sim >= self.threshold
+            self._record(best_sim, hit)
+            if not hit:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(best.value)
+
+    def add(self, query: str, value: Any, namespace: str = "") -> None:
+        text = normalize_query(query)
+        if not self.enabled or not text:
+            return
+        try:
+            blob = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Semantic cache value not serializable: {e}")
+            return
+        vec = self._vector(text)
+        if vec is None:
+            return
+        with self._lock:
+            if self._store is None:
+                self._store = VectorStore(dim=len(vec), normalize=True)
+            entry_id = str(self._next_id)
+            self._next_id += 1
+            self._store.add([entry_id], [vec], ids=[entry_id])
+            self._entries[entry_id] = _Entry(text, namespace, blob, time.time())
+            if len(self._entries) > self.max_entries:
+                self._compact()
+
+    def _compact(self) -> None:
+        """VectorStore rows can't be deleted: rebuild from the newest live entries (down to 3/4 of the cap)."""
+        now = time.time()
+        live = [eid for eid, e in self._entries.items() if not self._expired(e, now)]
+        keep = live[-max(1, (self.max_entries * 3) // 4):]
+        row_of = {eid: i for i, eid in enumerate(self._store.payloads)}
+        rows = np.fromiter((row_of[eid] for eid in keep), dtype=np.int64, count=len(keep))
+        store = VectorStore(dim=self._store.dim, normalize=True)
+        store.add(keep, self._store.vectors[rows], ids=keep)
+        self._store = store
+        self._entries = {eid: self._entries[eid] for eid in keep}
+
+    def _record(self, similarity: Optional[float], hit: bool) -> None:
+        if similarity is None:
+            return
+        bucket = min(_HIST_BUCKETS - 1, max(0, int(similarity * _HIST_BUCKETS)))
+        (self._hist_hits if hit else self._hist_misses)[bucket] += 1
+        self._recent.append(similarity)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            recent = np.asarray(self._recent, dtype=np.float32)
+            if recent.size:
+                p10, p50, p90 = (float(x) for x in np.percentile(recent, [10, 50, 90]))
+                quantiles = {"p10": p10, "p50": p50, "p90": p90, "mean": float(recent.mean()), "n": int(recent.size)}
+            else:
+                quantiles = {"n": 0}
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                # best similarity per lookup; bucket i covers [i, i+1) / _HIST_BUCKETS
+                "similarity": {
+                    "bucket_width": 1.0 / _HIST_BUCKETS,
+                    "hits": list(self._hist_hits),
+                    "misses": list(self._hist_misses),
+                    "recent": quantiles,
+                },
+            }
+
+
+roadmap_semantic_cache = SemanticCache()
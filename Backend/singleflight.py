@@ -0,0 +1,125 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When a class opens the same roadmap, dozens of identical /ask and /content
+requests arrive within a second; the response caches only help once the
+first one has finished. A SingleFlight group lets concurrent callers with
+the same key await one execution and share its result:
+
+  - do(key, fn, *args)             thread callers: the first runs fn, the rest block on an Event
+  - do_async(key, coro_fn, *args)  event-loop callers: the first starts a task, the rest await it
+
+Followers get a deep copy of the result so nobody mutates another caller's
+value, and an exception from the shared call is raised in every caller. An
+async caller that is cancelled (client went away) does not cancel the
+shared task; the others still get the result. Calls are only shared within
+one event loop; sync and async callers are separate.
+
+Public API:
+    SingleFlight(name)
+    .do(key, fn, *args, **kwargs)
+    await .do_async(key, coro_fn, *args, **kwargs)
+    .stats() -> dict
+    flight_key(*parts) -> tuple        # the call's exact inputs; use for request keys
+    flight_stats() -> dict             # stats of every named group
+"""
+
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_groups: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, "asyncio.Task"] = {}
+        self.leaders = 0    # calls that actually ran
+        self.shared = 0     # calls served by someone else's run
+        if name:
+            _groups[name] = self
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key: Hashable, coro_fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = loop.create_task(coro_fn(*args, **kwargs))
+                self._tasks[task_key] = task
+                task.add_done_callback(lambda t: self._forget(task_key, t))
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        # shield: a cancelled caller must not cancel the call the others are waiting on
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, task_key: Hashable, task: "asyncio.Task") -> None:
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+        # mark the exception retrieved if every caller was cancelled before it finished
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+
+def flight_key(*parts: Any) -> tuple:
+    # no case/whitespace folding: the prompt and the response cache see the raw inputs,
+    # so only calls that would send the same request may share one
+    return tuple(parts)
+
+
+def flight_stats() -> Dict[str, Dict[str, int]]:
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,281 @@
+"""
+Bounded in-memory cache for built VectorStore objects (and other sized values).
+
+Replaces the old unbounded global dict in main.py. Entries are evicted by:
+  - TTL: entries older than ttl_seconds (since last write) are dropped on access/insert
+  - LRU: least recently used entries go first when max_entries or max_bytes is exceeded
+
+Entry size is taken from VectorStore.nbytes() (vector matrix + payloads + ids),
+so the byte budget tracks what the stores really hold on the heap. Any value
+with an nbytes() method can be cached the same way: BoundedCache is the generic
+name (pdf.py keeps parsed PDFs in one), VectorStoreCache the historical alias.
+
+Usage:
+    cache = VectorStoreCache(max_bytes=512 * 1024 * 1024, max_entries=256, ttl_seconds=3600)
+    store = cache.get(key)       # None on miss / expired
+    cache.put(key, store)
+    cache.stats()                # hits, misses, evictions, expirations, bytes, entries
+
+DiskStoreTier sits underneath: it persists each built store under its content
+hash (VECTOR_STORE_DIR) so a restarted worker loads it instead of re-embedding.
+Stores are opened memory-mapped, so workers share the pages of the same index.
+The directory is bounded too (STORE_DISK_MAX_BYTES / STORE_DISK_MAX_ENTRIES):
+each load refreshes the store directory's mtime, and a save evicts the least
+recently used stores until both bounds hold.
+
+A store is only valid for the settings it was built with, so the tier takes
+a fingerprint of them (chunker, index type, storage dtype, embedding model):
+directories are then named sha256(fingerprint, key), and changing any setting
+makes old stores unreachable (they age out through the LRU bound).
+
+    disk = DiskStoreTier(VectorStore, fingerprint={"model": MODEL_NAME, "index": "flat", ...})
+    store = disk.load(key)       # None if not on disk / unreadable / built with other settings
+    disk.save(key, store)
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+STORE_CACHE_MAX_BYTES = int(os.getenv("STORE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+STORE_CACHE_MAX_ENTRIES = int(os.getenv("STORE_CACHE_MAX_ENTRIES", "256"))
+STORE_CACHE_TTL_SECONDS = float(os.getenv("STORE_CACHE_TTL_SECONDS", "3600"))
+# Disk tier budget (<= 0 disables a bound); least recently loaded/saved stores are removed first
+STORE_DISK_MAX_BYTES = int(os.getenv("STORE_DISK_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+STORE_DISK_MAX_ENTRIES = int(os.getenv("STORE_DISK_MAX_ENTRIES", "1024"))
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "vector_stores"))
+
+logger = logging.getLogger(__name__)
+
+_KEY_RE = re.compile(r"^[0-9a-f]{16,128}$")
+
+
+def _sizeof(store: Any) -> int:
+    nbytes = getattr(store, "nbytes", None)
+    if callable(nbytes):
+        return int(nbytes())
+    return 0
+
+
+class BoundedCache:
+    def __init__(
+        self,
+        max_bytes: int = STORE_CACHE_MAX_BYTES,
+        max_entries: int = STORE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = STORE_CACHE_TTL_SECONDS,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (store, size_bytes, inserted_at); order = recency (oldest first)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, count=False) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, inserted_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - inserted_at > self.ttl_seconds
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key: str, count: bool = True) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[2], now):
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, store: Any) -> bool:
+        """Insert/replace an entry. Returns False if the store alone is larger than the byte budget."""
+        size = _sizeof(store)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if self.max_bytes > 0 and size > self.max_bytes:
+                return False
+            self._entries[key] = (store, size, now)
+            self._bytes += size
+            self._evict(now)
+            return True
+
+    def _evict(self, now: float) -> None:
+        # expired entries first, then LRU until both bounds hold
+        for key in [k for k, (_, _, ts) in self._entries.items() if self._expired(ts, now)]:
+            self._drop(key)
+            self.expirations += 1
+        while self._entries and (
+            (self.max_entries > 0 and len(self._entries) > self.max_entries)
+            or (self.max_bytes > 0 and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+VectorStoreCache = BoundedCache
+
+
+class DiskStoreTier:
+    """Content-addressed on-disk store: <directory>/<hex key>/ (VectorStore.save layout), written atomically."""
+
+    def __init__(self, store_cls: Any, directory: str = VECTOR_STORE_DIR, max_bytes: int = STORE_DISK_MAX_BYTES,
+                 max_entries: int = STORE_DISK_MAX_ENTRIES, fingerprint: Optional[Dict[str, Any]] = None):
+        self.store_cls = store_cls
+        # build settings the stored vectors depend on; part of every directory name when given
+        self.fingerprint = json.dumps(fingerprint, sort_keys=True, default=str) if fingerprint else ""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.evictions = 0
+        # footprint as of the last eviction scan
+        self._entries = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # keys are hex digests; refuse anything else so a key can never escape the directory
+        if not _KEY_RE.match(key):
+            raise ValueError(f"Invalid store key: {key!r}")
+        if self.fingerprint:
+            key = hashlib.sha256(f"{self.fingerprint}\0{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key)
+
+    def load(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        if not os.path.isdir(path):
+            self.misses += 1
+            return None
+        try:
+            store = self.store_cls.load(path)
+        except Exception as e:
+            logger.warning(f"Failed to load vector store {key} from disk: {e}")
+            self.errors += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)  # mtime = last use, for LRU eviction
+        except OSError:
+            pass
+        return store
+
+    def save(self, key: str, store: Any) -> bool:
+        path = self._path(key)
+        if os.path.isdir(path):
+            # content-addressed: same key, same content (another worker got there first)
+            return True
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            store.save(tmp_path)
+            os.replace(tmp_path, path)  # atomic: readers never see a half-written directory
+        except Exception as e:
+            if os.path.isdir(path):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                return True
+            logger.warning(f"Failed to persist vector store {key}: {e}")
+            self.errors += 1
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            return False
+        self.writes += 1
+        self._evict(keep=os.path.basename(path))
+        return True
+
+    @staticmethod
+    def _dir_bytes(path: str) -> int:
+        return sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used stores (oldest mtime) until both bounds hold; never `keep`."""
+        with self._lock:
+            try:
+                entries = []
+                for e in os.scandir(self.directory):
+                    if e.is_dir() and _KEY_RE.match(e.name):
+                        entries.append((e.stat().st_mtime, e.name, self._dir_bytes(e.path)))
+            except OSError as e:
+                logger.warning(f"Disk store scan failed: {e}")
+                return
+            entries.sort()
+            count = len(entries)
+            total = sum(size for _, _, size in entries)
+            for _, name, size in entries:
+                if (self.max_entries <= 0 or count <= self.max_entries) and (self.max_bytes <= 0 or total <= self.max_bytes):
+                    break
+                if name == keep:
+                    continue
+                # readers that already memory-mapped the files keep them until they close
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+                count -= 1
+                total -= size
+                self.evictions += 1
+            self._entries, self._bytes = count, total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "fingerprint": json.loads(self.fingerprint) if self.fingerprint else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
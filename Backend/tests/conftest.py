@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+# modules live flat in Backend/ and read their configuration at import time
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_tmp = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
+os.environ.setdefault("VECTOR_STORE_DIR", os.path.join(_tmp, "vector_stores"))
+os.environ.setdefault("PDF_DOCUMENT_DIR", os.path.join(_tmp, "documents"))
+os.environ.setdefault("LLM_CACHE_PATH", "")
+
+
+def run_backend_python(code: str) -> subprocess.CompletedProcess:
+    """Run `code` in a fresh interpreter in Backend/, so blocked imports and patched globals can't leak."""
+    return subprocess.run([sys.executable, "-c", textwrap.dedent(code)], cwd=BACKEND_DIR, env=dict(os.environ),
+                          capture_output=True, text=True, timeout=120)
@@ -0,0 +1,52 @@
+from chunking import chunk_text_tokens, count_tokens, iter_token_chunks
+
+
+def _text(n_sentences: int) -> str:
+    return " ".join(f"Sentence number {i} talks about topic {i % 7} in some detail." for i in range(n_sentences))
+
+
+def test_chunks_respect_the_token_budget_and_sentence_boundaries():
+    text = _text(60)
+    chunks = chunk_text_tokens(text, max_tokens=50, overlap_tokens=0)
+    assert len(chunks) > 1
+    for c in chunks:
+        assert c.n_tokens <= 50
+        assert text[c.start:c.end] == c.text
+        assert c.text.endswith(".")
+    # without overlap the chunks tile the text
+    assert " ".join(c.text for c in chunks) == text
+
+
+def test_overlap_repeats_the_tail_of_the_previous_chunk():
+    chunks = chunk_text_tokens(_text(60), max_tokens=50, overlap_tokens=16)
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert cur.start < prev.end
+        assert cur.n_tokens <= 50
+
+
+def test_long_sentence_is_split_to_fit():
+    text = "word " * 500
+    chunks = chunk_text_tokens(text.strip(), max_tokens=40, overlap_tokens=0)
+    assert all(c.n_tokens <= 40 for c in chunks)
+    assert sum(count_tokens(c.text) for c in chunks) == count_tokens(text)
+
+
+def test_word_longer_than_the_budget_is_split_by_character():
+    word = "x" * 40 + "-" * 20 + "y" * 40
+    text = f"Short start. {word} short end."
+    chunks = chunk_text_tokens(text, max_tokens=5, overlap_tokens=0)
+    for c in chunks:
+        assert c.n_tokens <= 5
+        assert count_tokens(c.text) <= 5
+        assert text[c.start:c.end] == c.text
+    # no character of the word is lost
+    start = text.index(word)
+    covered = {i for c in chunks for i in range(c.start, c.end)}
+    assert covered >= set(range(start, start + len(word)))
+
+
+def test_streamed_pieces_chunk_like_the_joined_text():
+    pages = [_text(20), "", _text(15), _text(30)]
+    joined = "\n".join(p for p in pages if p)
+    streamed = list(iter_token_chunks(iter(pages), max_tokens=60, overlap_tokens=8))
+    assert streamed == chunk_text_tokens(joined, max_tokens=60, overlap_tokens=8)
@@ -0,0 +1,34 @@
+from chunking import count_tokens
+from context_packer import MODEL_CONTEXT_WINDOWS, context_budget, pack_context
+
+
+def _block(i: int, n_sentences: int = 6) -> str:
+    return " ".join(f"Block {i} sentence {j} explains one more detail." for j in range(n_sentences))
+
+
+def test_context_budget_is_capped_by_the_model_window():
+    assert context_budget("openai/gpt-4o-mini", reserve_tokens=1000, budget=1500) == 1500
+    window = MODEL_CONTEXT_WINDOWS["openai/gpt-3.5-turbo"]
+    assert context_budget("openai/gpt-3.5-turbo", reserve_tokens=window, budget=1500) == 0
+
+
+def test_hits_fill_the_budget_in_rank_order_before_mandatory_blocks():
+    ranked = [_block(i) for i in range(20)]
+    mandatory = ["user: previous message", "Latest user query: what is a heap?"]
+    packed = pack_context(ranked, mandatory, budget_tokens=300)
+    assert packed.n_tokens <= 300
+    assert count_tokens(packed.text) == packed.n_tokens
+    assert packed.text.startswith(ranked[0])
+    assert packed.text.endswith(mandatory[-1])
+    assert packed.hits_used + packed.hits_dropped == len(ranked)
+    assert 0 < packed.hits_used < len(ranked)
+
+
+def test_duplicates_are_dropped_and_oversized_mandatory_blocks_are_cut():
+    packed = pack_context([_block(1), _block(1)], budget_tokens=1000)
+    assert packed.text == _block(1)
+
+    query = "Latest user query: short?"
+    packed = pack_context([], [_block(2, 200), query], budget_tokens=120)
+    assert packed.n_tokens <= 120
+    assert packed.text.endswith(query)
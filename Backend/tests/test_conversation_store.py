@@ -0,0 +1,74 @@
+import hashlib
+
+import numpy as np
+
+from conversation_store import ConversationStores, conversation_key
+from store_cache import VectorStoreCache
+
+
+class _Embedder:
+    """Deterministic unit vectors per text; records every text it embeds."""
+
+    def __init__(self, dim: int = 16):
+        self.dim = dim
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.extend(texts)
+        out = []
+        for t in texts:
+            seed = int(hashlib.md5(t.encode()).hexdigest()[:8], 16)
+            out.append(np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32).tolist())
+        return out
+
+
+def _stores(embed=None):
+    # one chunk per item keeps the row bookkeeping easy to check
+    return ConversationStores(VectorStoreCache(), embed=embed or _Embedder(), chunk=lambda text: [text])
+
+
+def test_chats_with_the_same_opening_do_not_share_a_store():
+    stores = _stores()
+    keys = set()
+    for i in range(40):
+        items = ["user: hi", f"assistant: hello {i}", f"user: question {i}"]
+        key = conversation_key(None, items)
+        keys.add(key)
+        store = stores.update(key, items)
+        assert sorted(store.payloads) == sorted(items)
+    assert len(keys) == 40
+
+
+def test_new_chat_gets_all_its_live_chunks_back():
+    stores = _stores()
+    stores.update(conversation_key(None, ["user: hi", "old a", "old b", "old c"]), ["user: hi", "old a", "old b", "old c"])
+    items = ["user: hi", "new x", "new y"]
+    store = stores.update(conversation_key(None, items), items)
+    hits = [text for text, _ in store.search(_Embedder()(["new x"])[0], top_k=3)]
+    assert sorted(hits) == sorted(items)
+
+
+def test_update_embeds_only_new_chunks_and_drops_stale_rows():
+    embed = _Embedder()
+    stores = _stores(embed)
+    key = conversation_key("chat-1", [])
+    assert key == conversation_key("chat-1", ["anything"])
+
+    first = stores.update(key, ["roadmap v1", "user: hi"])
+    assert sorted(embed.calls) == ["roadmap v1", "user: hi"]
+
+    embed.calls.clear()
+    second = stores.update(key, ["roadmap v2", "user: hi", "user: next"])
+    assert sorted(embed.calls) == ["roadmap v2", "user: next"]
+    assert sorted(second.payloads) == ["roadmap v2", "user: hi", "user: next"]
+    # copy-on-write: the previous store is left as it was for searches still using it
+    assert sorted(first.payloads) == ["roadmap v1", "user: hi"]
+
+    embed.calls.clear()
+    assert stores.update(key, ["user: next", "roadmap v2", "user: hi"]) is second
+    assert embed.calls == []
+
+
+def test_nothing_embeddable_returns_none():
+    stores = _stores(lambda texts: [None] * len(texts))
+    assert stores.update(conversation_key(None, ["x"]), ["x"]) is None
@@ -0,0 +1,39 @@
+from conftest import run_backend_python
+
+# sentence-transformers is not a test dependency: embeddings.py is imported in a fresh
+# interpreter against a stand-in model class whose encode() rejects one poisoned text
+_PRELUDE = """
+    import sys, types
+    import numpy as np
+
+    class Model:
+        calls = []
+
+        def __init__(self, name):
+            self.name = name
+
+        def encode(self, texts, batch_size, show_progress_bar, convert_to_numpy):
+            Model.calls.append(list(texts))
+            if any("BAD" in t for t in texts):
+                raise RuntimeError("tokenizer blew up")
+            return np.array([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+    sys.modules["sentence_transformers"] = types.SimpleNamespace(SentenceTransformer=Model)
+    import embeddings
+"""
+
+
+def test_one_failing_chunk_does_not_lose_its_batch():
+    result = run_backend_python(_PRELUDE + """
+    out = embeddings.embed_chunks(["aa", "BAD", "cccc", "d"], batch_size=2)
+    assert out[1] is None, out
+    assert all(v is not None and abs(np.linalg.norm(v) - 1) < 1e-5 for v in (out[0], out[2], out[3])), out
+    # the failing batch is retried text by text; the other batch goes through whole
+    assert Model.calls == [["aa", "BAD"], ["aa"], ["BAD"], ["cccc", "d"]], Model.calls
+
+    # texts embedded before are served from the cache and not sent to the model again
+    Model.calls.clear()
+    assert embeddings.embed_chunks(["aa", "d"], batch_size=2) == [out[0], out[3]]
+    assert Model.calls == []
+    """)
+    assert result.returncode == 0, result.stderr
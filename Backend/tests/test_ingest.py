@@ -0,0 +1,46 @@
+import numpy as np
+
+from ingest import build_store, iter_chunks
+
+
+def _embed(texts, batch_size):
+    assert len(texts) <= batch_size
+    return [np.full(4, len(t), dtype=np.float32).tolist() for t in texts]
+
+
+def _pages(n: int):
+    return [" ".join(f"p{p}w{i}" for i in range(40)) if p != 2 else "" for p in range(n)]
+
+
+def test_chunks_carry_their_page_span():
+    chunks = list(iter_chunks(_pages(5), max_tokens=30, overlap_tokens=0))
+    assert chunks
+    assert chunks[0][1] == 0
+    assert chunks[-1][2] == 4
+    # the empty page is never cited
+    assert all(2 not in (first, last) for _, first, last in chunks)
+    assert all(first <= last for _, first, last in chunks)
+
+
+def test_build_store_embeds_in_micro_batches():
+    expected = [c for c, _, _ in iter_chunks(_pages(5), max_tokens=30, overlap_tokens=0)]
+    store = build_store(_pages(5), max_tokens=30, overlap_tokens=0, batch_size=3, embed=_embed, normalize=True)
+    assert store.payloads == expected
+    assert store.ids[0].startswith("0:p1-")
+    assert [i.split(":")[0] for i in store.ids] == [str(n) for n in range(len(expected))]
+
+
+def test_build_store_drops_failed_chunks_and_returns_none_when_empty():
+    assert build_store(_pages(3), max_tokens=30, batch_size=4, embed=lambda t, b: [None] * len(t)) is None
+    assert build_store([], embed=_embed, batch_size=4) is None
+
+
+def test_build_store_publishes_a_searchable_snapshot_per_batch():
+    published = []
+    store = build_store(_pages(5), max_tokens=30, overlap_tokens=0, batch_size=3, embed=_embed,
+                        publish=published.append, normalize=True)
+    sizes = [len(s) for s in published]
+    assert sizes == sorted(sizes) and sizes[0] == 3 and sizes[-1] == len(store)
+    # earlier snapshots keep their rows while the store grows
+    assert published[0].payloads == store.payloads[:3]
+    assert [t for t, _ in published[0].search([1.0, 1.0, 1.0, 1.0], top_k=10)] != []
@@ -0,0 +1,42 @@
+import time
+
+from llm_cache import ResponseCache
+
+
+def test_key_depends_on_every_prompt_input():
+    base = ResponseCache.key("m", "sys", "user", 0.2, 100)
+    assert base == ResponseCache.key("m", "sys", "user", 0.2, 100)
+    for other in (("m2", "sys", "user", 0.2, 100), ("m", "sys", "User", 0.2, 100),
+                  ("m", "sys", "user", 0.3, 100), ("m", "sys", "user", 0.2, 200)):
+        assert ResponseCache.key(*other) != base
+
+
+def test_memory_tier_returns_copies_and_evicts_lru():
+    cache = ResponseCache(max_entries=2, path="")
+    cache.put("a", [{"name": "A"}])
+    hit = cache.get("a")
+    hit.append("mutated")
+    assert cache.get("a") == [{"name": "A"}]
+
+    cache.put("b", 1)
+    cache.get("a")
+    cache.put("c", 2)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expires_entries():
+    cache = ResponseCache(ttl_seconds=0.01, path="")
+    cache.put("k", "v")
+    time.sleep(0.02)
+    assert cache.get("k") is None
+
+
+def test_disk_tier_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "llm.sqlite")
+    ResponseCache(path=path).put("k", {"topics": [1, 2]})
+    other = ResponseCache(path=path)
+    assert other.get("k") == {"topics": [1, 2]}
+    assert other.stats()["disk_hits"] == 1
+    other.clear()
+    assert ResponseCache(path=path).get("k") is None
@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import llm_gateway
+from llm_gateway import LLMGatewayError, chat_completion, chat_completion_async, chat_completion_stream_async
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Route the gateway's pooled client to a handler the test sets; records every request."""
+    state = {"handler": None, "requests": []}
+
+    def handle(request):
+        state["requests"].append(request)
+        return state["handler"](request)
+
+    async def install():
+        return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+    loop = llm_gateway._ensure_loop()
+    client = asyncio.run_coroutine_threadsafe(install(), loop).result()
+    monkeypatch.setattr(llm_gateway, "_client", client)
+    yield state
+    llm_gateway.close()
+
+
+def _completion(text):
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+def test_sync_and_async_calls_share_one_pooled_client(upstream):
+    upstream["handler"] = lambda request: _completion("  hello ")
+    client = llm_gateway._client
+
+    assert chat_completion([{"role": "user", "content": "hi"}]) == "hello"
+    assert asyncio.run(chat_completion_async([{"role": "user", "content": "hi"}], model="m")) == "hello"
+    assert llm_gateway._client is client
+    assert len(upstream["requests"]) == 2
+    body = json.loads(upstream["requests"][1].content)
+    assert body["model"] == "m" and body["messages"][0]["content"] == "hi"
+    assert upstream["requests"][0].headers["Authorization"].startswith("Bearer ")
+
+
+@pytest.mark.parametrize("response", [
+    httpx.Response(500, text="boom"),
+    httpx.Response(200, text="<html>not json</html>"),
+])
+def test_http_and_payload_errors_become_gateway_errors(upstream, response):
+    upstream["handler"] = lambda request: response
+    with pytest.raises(LLMGatewayError):
+        chat_completion([{"role": "user", "content": "hi"}])
+
+
+def test_transport_errors_and_missing_key_become_gateway_errors(upstream, monkeypatch):
+    def fail(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    upstream["handler"] = fail
+    with pytest.raises(LLMGatewayError):
+        chat_completion([{"role": "user", "content": "hi"}])
+
+    monkeypatch.delenv("OPENROUTER_API_KEY")
+    with pytest.raises(LLMGatewayError, match="OPENROUTER_API_KEY"):
+        chat_completion([{"role": "user", "content": "hi"}])
+
+
+def _sse(*events):
+    return "".join(f"data: {e}\n\n" for e in events).encode()
+
+
+def test_stream_yields_deltas_and_maps_error_events(upstream):
+    upstream["handler"] = lambda request: httpx.Response(200, content=b": OPENROUTER PROCESSING\n\n" + _sse(
+        json.dumps({"choices": [{"delta": {"content": "Hel"}}]}),
+        json.dumps({"choices": [{"delta": {"content": "lo"}}]}),
+        "[DONE]",
+    ))
+
+    async def collect():
+        return [d async for d in chat_completion_stream_async([{"role": "user", "content": "hi"}])]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
+    assert json.loads(upstream["requests"][0].content)["stream"] is True
+
+    upstream["handler"] = lambda request: httpx.Response(200, content=_sse(
+        json.dumps({"choices": [{"delta": {"content": "x"}}]}),
+        json.dumps({"error": {"message": "rate limited"}}),
+    ))
+    with pytest.raises(LLMGatewayError, match="rate limited"):
+        asyncio.run(collect())
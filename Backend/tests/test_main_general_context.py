@@ -0,0 +1,49 @@
+from conftest import run_backend_python
+
+
+def test_general_context_uses_the_conversation_id_and_searches_off_the_event_loop():
+    result = run_backend_python("""
+    import asyncio, sys, threading
+    from types import SimpleNamespace
+    sys.modules["sentence_transformers"] = None
+    import main
+
+    loop_threads, calls, keys = set(), [], []
+
+    def record(name, result):
+        def fn(*args, **kwargs):
+            calls.append((name, threading.current_thread() in loop_threads))
+            return result
+        return fn
+
+    class Store:
+        def search(self, q, top_k):
+            calls.append(("search", threading.current_thread() in loop_threads))
+            return [("user: hi", 1.0)]
+
+    class Stores:
+        def update(self, key, items):
+            calls.append(("update", threading.current_thread() in loop_threads))
+            keys.append(key)
+            return Store()
+
+    main.conversation_stores = Stores()
+    main.conversation_key = lambda conversation_id, items: conversation_id or "hash"
+    main.GENERAL_MODEL, main.GENERAL_MAX_TOKENS = "m", 10
+    main.context_budget = lambda model, reserve_tokens: 100
+    main.get_embedding = record("get_embedding", [0.0])
+    main.pack_context = record("pack_context", SimpleNamespace(text="packed", n_tokens=1))
+
+    async def run(request):
+        loop_threads.add(threading.current_thread())
+        return await main._general_context(request)
+
+    request = main.GeneralRequest(metadata={"messages": [{"role": "user", "content": "hi"}]},
+                                  query="what next?", conversation_id="chat-42")
+    query, context, patch = asyncio.run(run(request))
+    assert (query, context, patch["source"]) == ("what next?", "packed", "metadata_vector_search")
+    assert keys == ["chat-42"]
+    assert [name for name, _ in calls] == ["update", "get_embedding", "search", "pack_context"], calls
+    assert not any(on_loop for _, on_loop in calls), calls
+    """)
+    assert result.returncode == 0, result.stderr
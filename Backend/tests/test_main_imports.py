@@ -0,0 +1,21 @@
+from conftest import run_backend_python
+
+
+def test_main_starts_degraded_when_guarded_import_fails():
+    result = run_backend_python("""
+        import sys
+        sys.modules["sentence_transformers"] = None  # makes `import sentence_transformers` raise ImportError
+        import main
+        from fastapi.testclient import TestClient
+
+        assert main.metadata_cache is None
+        assert main.disk_store_cache is None
+        assert main.conversation_cache is None
+        assert main.get_document_store("0" * 64) is None
+
+        client = TestClient(main.app)
+        assert client.get("/health").status_code == 200
+        assert client.get("/cache/stats").status_code == 503
+        assert client.get("/ask", params={"q": "x"}).json()[0]["name"] == "Error"
+    """)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,101 @@
+from conftest import run_backend_python
+
+# main is imported in degraded mode (no sentence-transformers here) and then given real
+# caches and PDF helpers; only the extract/embed pass itself is replaced
+_PRELUDE = """
+    import sys, tempfile
+    sys.modules["sentence_transformers"] = None
+    import main
+    import pdf
+    from store_cache import DiskStoreTier, VectorStoreCache
+    from vectorstore import VectorStore
+
+    main.metadata_cache = VectorStoreCache()
+    main.disk_store_cache = DiskStoreTier(VectorStore, directory=tempfile.mkdtemp())
+    for name in ("cache_parsed_pdf", "load_parsed_pdf", "parse_pdf_bytes", "save_parsed_pdf"):
+        setattr(main, name, getattr(pdf, name))
+    main.VECTOR_INDEX, main.VECTOR_STORAGE = "flat", "float32"
+"""
+
+
+def test_partial_store_is_served_while_indexing_and_replaced_when_done():
+    result = run_backend_python(_PRELUDE + """
+    import hashlib
+    data = b"%PDF fake bytes"
+    doc_id = hashlib.sha256(data).hexdigest()
+    seen_during = []
+
+    def fake_ingest(data, publish, **store_kwargs):
+        store = VectorStore(dim=3, normalize=True)
+        for i in range(3):
+            store.add([f"chunk {i}"], [[1.0, float(i), 0.0]])
+            publish(store.snapshot())
+            # another request for the same document meanwhile
+            seen_during.append(len(main.get_document_store(doc_id)))
+        return ["page one with enough text"], store
+
+    main.ingest_pdf_bytes = fake_ingest
+    parsed, store = main.ingest_pdf(data, "a.pdf")
+    assert seen_during == [1, 2, 3], seen_during
+    assert main._indexing_stores == {}
+    assert main.get_document_store(doc_id) is store
+    assert parsed.digest == doc_id and parsed.filename == "a.pdf"
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_failed_indexing_stops_serving_the_partial_store():
+    result = run_backend_python(_PRELUDE + """
+    data = b"%PDF other bytes"
+
+    def failing_ingest(data, publish, **store_kwargs):
+        store = VectorStore(dim=3, normalize=True)
+        store.add(["chunk"], [[1.0, 0.0, 0.0]])
+        publish(store.snapshot())
+        raise RuntimeError("embedding model crashed")
+
+    main.ingest_pdf_bytes = failing_ingest
+    main.parse_pdf_bytes = lambda data: pdf.ParsedPDF("0" * 64, ["text"])
+    parsed, store = main.ingest_pdf(data)
+    assert store is None
+    assert main._indexing_stores == {}
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_document_persisted_by_an_earlier_run_is_not_reparsed():
+    result = run_backend_python(_PRELUDE + """
+    import hashlib
+    data = b"%PDF persisted bytes"
+    doc_id = hashlib.sha256(data).hexdigest()
+    # an earlier worker saved the pages; this one starts with an empty memory cache
+    pdf.save_parsed_pdf(pdf.ParsedPDF(doc_id, ["page one.", "page two."], "old.pdf"))
+    pdf._parsed_pdf_cache.clear()
+
+    def must_not_run(*args, **kwargs):
+        raise AssertionError("the document was parsed again")
+
+    main.ingest_pdf_bytes = main.parse_pdf_bytes = must_not_run
+    rebuilt = []
+    main.build_store = lambda pages, **kwargs: rebuilt.append(pages) or VectorStore(dim=3, normalize=True)
+    parsed, store = main.ingest_pdf(data, "new.pdf")
+    assert rebuilt == [["page one.", "page two."]], rebuilt
+    assert parsed.pages == ["page one.", "page two."] and parsed.filename == "old.pdf"
+    assert main.get_document_store(doc_id) is store
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_index_parsed_pdf_builds_once_and_persists_the_pages():
+    result = run_backend_python(_PRELUDE + """
+    import os
+    doc_id = "c" * 64
+    parsed = pdf.ParsedPDF(doc_id, ["long page."], "long.pdf")
+    built = []
+    main.build_store = lambda pages, **kwargs: built.append(pages) or VectorStore(dim=3, normalize=True)
+    store = main.index_parsed_pdf(parsed)
+    assert main.index_parsed_pdf(parsed) is store
+    assert built == [["long page."]], built
+    assert os.path.exists(os.path.join(pdf.PDF_DOCUMENT_DIR, doc_id + ".json"))
+    """)
+    assert result.returncode == 0, result.stderr
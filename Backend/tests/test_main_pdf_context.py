@@ -0,0 +1,60 @@
+from conftest import run_backend_python
+
+# main is imported in degraded mode (no sentence-transformers here); the helpers
+# _pdf_query_context calls are replaced by ones that record the thread they run on
+_PRELUDE = """
+    import asyncio, sys, threading
+    from types import SimpleNamespace
+    sys.modules["sentence_transformers"] = None
+    import main
+
+    loop_threads, calls = set(), []
+
+    def record(name, result):
+        def fn(*args, **kwargs):
+            calls.append((name, threading.current_thread() in loop_threads))
+            return result
+        return fn
+
+    main.GENERAL_MODEL, main.GENERAL_MAX_TOKENS = "m", 10
+    main.context_budget = lambda model, reserve_tokens: 100
+    main.count_tokens = record("count_tokens", 10_000)
+    main.get_embedding = record("get_embedding", [0.0])
+    main.get_pdf_chunks = record("get_pdf_chunks", ["a", "b"])
+    main.pack_context = record("pack_context", SimpleNamespace(text="packed"))
+
+    async def run(store):
+        loop_threads.add(threading.current_thread())
+        main.index_parsed_pdf = record("index_parsed_pdf", store)
+        return await main._pdf_query_context(SimpleNamespace(text="x" * 500), "q")
+"""
+
+
+def test_pdf_vector_search_and_fallback_run_off_the_event_loop():
+    result = run_backend_python(_PRELUDE + """
+    class Store:
+        def search(self, q, top_k):
+            calls.append(("search", threading.current_thread() in loop_threads))
+            return [("chunk", 1.0)]
+
+    class BrokenStore:
+        def search(self, q, top_k):
+            raise RuntimeError("index gone")
+
+    assert asyncio.run(run(Store())) == ("packed", "vector")
+    assert asyncio.run(run(BrokenStore())) == ("packed", "fallback")
+    assert asyncio.run(run(None)) == ("packed", "vector")
+    names = [name for name, _ in calls]
+    assert "search" in names and names.count("get_pdf_chunks") == 2 and names.count("index_parsed_pdf") == 3, calls
+    assert not any(on_loop for _, on_loop in calls), calls
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_pdf_that_fits_the_budget_is_sent_whole_without_indexing():
+    result = run_backend_python(_PRELUDE + """
+    main.count_tokens = record("count_tokens", 50)
+    assert asyncio.run(run(object())) == ("x" * 500, "whole")
+    assert [name for name, _ in calls] == ["count_tokens"], calls
+    """)
+    assert result.returncode == 0, result.stderr
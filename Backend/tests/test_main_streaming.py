@@ -0,0 +1,103 @@
+from conftest import run_backend_python
+
+# main is imported in degraded mode (no sentence-transformers here); the model streams are
+# replaced by async generators that fail part-way, and the routes are driven with TestClient
+_PRELUDE = """
+    import json, sys
+    from types import SimpleNamespace
+    sys.modules["sentence_transformers"] = None
+    import main
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+
+    def events(response):
+        # parse a text/event-stream body into (event, data) pairs, checking the framing as we go
+        assert response.headers["content-type"].startswith("text/event-stream"), response.headers
+        assert response.headers["cache-control"] == "no-cache, no-transform"
+        assert response.text.endswith("\\n\\n")
+        out = []
+        for block in response.text.split("\\n\\n")[:-1]:
+            lines = block.split("\\n")
+            assert len(lines) == 2 and lines[0].startswith("event: ") and lines[1].startswith("data: "), block
+            out.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+        return out
+
+    async def deltas(*parts):
+        for part in parts:
+            yield part
+        raise RuntimeError("upstream closed")
+"""
+
+
+def test_sse_frame_keeps_newlines_inside_the_data_line():
+    result = run_backend_python(_PRELUDE + """
+    frame = main._sse("token", {"text": "two\\nlines"})
+    assert frame == 'event: token\\ndata: {"text": "two\\\\nlines"}\\n\\n', frame
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_ask_stream_sends_topics_then_error_then_done():
+    result = run_backend_python(_PRELUDE + """
+    async def topics(context, q):
+        yield {"type": "TOPIC", "name": "one"}
+        yield {"type": "TOPIC", "name": "two"}
+        raise RuntimeError("upstream closed")
+
+    main.generate_api_response_stream = topics
+    got = events(client.get("/ask/stream", params={"q": "python"}))
+    assert got == [
+        ("topic", {"type": "TOPIC", "name": "one"}),
+        ("topic", {"type": "TOPIC", "name": "two"}),
+        ("error", {"detail": "upstream closed"}),
+        ("done", {"topics": 2}),
+    ], got
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_general_stream_sends_tokens_then_error_then_done_with_the_partial_answer():
+    result = run_backend_python(_PRELUDE + """
+    async def general_context(request):
+        return request.query, "ctx", {"source": "metadata_raw"}
+
+    main._general_context = general_context
+    main.generate_general_response_stream = lambda context, query: deltas("Hel", "lo\\nthere")
+    got = events(client.post("/general/stream", json={"metadata": {}, "query": "hi"}))
+    assert got == [
+        ("token", {"text": "Hel"}),
+        ("token", {"text": "lo\\nthere"}),
+        ("error", {"detail": "upstream closed"}),
+        ("done", {"answer": "Hello\\nthere", "metadata_patch": {"source": "metadata_raw"}}),
+    ], got
+    """)
+    assert result.returncode == 0, result.stderr
+
+
+def test_pdf_query_stream_events_and_errors_before_streaming():
+    result = run_backend_python(_PRELUDE + """
+    parsed = SimpleNamespace(text="enough text " * 10, digest="d" * 64, filename="a.pdf")
+
+    async def resolve_pdf(file, doc_id, index=False):
+        return parsed, None, "a.pdf"
+
+    async def query_context(parsed, query):
+        return "ctx", "whole"
+
+    main.resolve_pdf = resolve_pdf
+    main._pdf_query_context = query_context
+    main.generate_general_response_stream = lambda context, query: deltas("answer")
+    got = events(client.post("/pdf/query/stream", data={"query": "q", "doc_id": "d" * 64}))
+    assert [event for event, _ in got] == ["token", "error", "done"], got
+    done = got[-1][1]
+    assert done["answer"] == "answer" and done["source"] == "PDF: a.pdf" and done["query"] == "q"
+    assert done["metadata_patch"]["doc_id"] == "d" * 64
+
+    # failures before the first event are plain HTTP errors, not an event stream
+    parsed.text = "short"
+    response = client.post("/pdf/query/stream", data={"query": "q", "doc_id": "d" * 64})
+    assert response.status_code == 400, response.text
+    assert "insufficient text" in response.json()["detail"]
+    """)
+    assert result.returncode == 0, result.stderr
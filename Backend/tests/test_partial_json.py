@@ -0,0 +1,93 @@
+import time
+
+import partial_json
+from partial_json import ArrayElementStream, recover_json
+
+
+def _feed_all(pieces):
+    stream = ArrayElementStream()
+    out = []
+    for piece in pieces:
+        out.extend(stream.feed(piece))
+    return stream, out
+
+
+def test_stream_yields_each_object_as_it_closes():
+    stream = ArrayElementStream()
+    assert stream.feed('```json\n[{"name": "A", "x": "a]}"}, {"na') == [{"name": "A", "x": "a]}"}]
+    assert stream.feed('me": "B"}]\n```') == [{"name": "B"}]
+    assert stream.done
+
+
+def test_stream_skips_bracketed_preface():
+    text = 'Roadmap [v1] (see [1]):\n[\n  {"name": "A"},\n  {"name": "B"}\n]'
+    stream, out = _feed_all([text])
+    assert out == [{"name": "A"}, {"name": "B"}]
+    assert stream.done
+
+
+def test_stream_preface_split_at_every_position():
+    text = 'Plan [v1]: [ {"name": "A"}, {"name": "B"} ]'
+    for cut in range(1, len(text)):
+        stream, out = _feed_all([text[:cut], text[cut:]])
+        assert out == [{"name": "A"}, {"name": "B"}], cut
+        assert stream.done
+
+
+def test_stream_does_not_start_on_non_object_arrays():
+    stream, out = _feed_all(['["a", "b"]'])
+    assert out == []
+    assert not stream.started
+
+
+def test_recover_json_skips_brackets_and_quotes_in_prose():
+    assert recover_json('He said "hi [ there" then [1,2]') == [1, 2]
+    assert recover_json('Use {braces} or [brackets "like [this]"] then {"a": 1}') == {"a": 1}
+    assert recover_json('note: [see "x] and then [{"name": "A"}]') == [{"name": "A"}]
+    assert recover_json('{ oops [1,2] ]') == [1, 2]
+    assert recover_json('x [a} then {"a": 1}') == {"a": 1}
+
+
+def test_recover_json_fences_truncation_and_salvage():
+    assert recover_json('```json\n[{"a": 1}, {"b": 2}]\n```') == [{"a": 1}, {"b": 2}]
+    assert recover_json('Here you go:\n[{"a": 1}, {"b": [1, 2]}, {"c": 3') == [{"a": 1}, {"b": [1, 2]}]
+    assert recover_json('[{"a": 1}, oops, {"b": 2}]') == [{"a": 1}, {"b": 2}]
+    assert recover_json('[{"n": "a\\"]"}] trailing') == [{"n": 'a"]'}]
+    assert recover_json('no json here') is None
+    assert recover_json('') is None
+
+
+def test_recover_json_closes_truncated_scalar_arrays():
+    assert recover_json('[1,2,3') == [1, 2]
+    assert recover_json('{"a": [1,2,') == {"a": [1, 2]}
+    assert recover_json('[[1, 2], [3, ') == [[1, 2], [3]]
+    assert recover_json('{"a": 1, "b": "two", "c') == {"a": 1, "b": "two"}
+
+
+def _count_scanned(monkeypatch):
+    scanned = []
+    real = partial_json._scan
+
+    def scan(text, pos=0):
+        scanned.append(len(text) - pos)
+        return real(text, pos)
+
+    monkeypatch.setattr(partial_json, "_scan", scan)
+    return scanned
+
+
+def test_recover_json_deep_unclosed_input_is_scanned_once(monkeypatch):
+    scanned = _count_scanned(monkeypatch)
+    # nothing after the first opener can close a value: rescanning cannot help
+    assert recover_json("Sure, here is the roadmap:\n" + "[" * 32000) is None
+    assert len(scanned) == 1
+
+
+def test_recover_json_many_failed_openers_stays_bounded(monkeypatch):
+    scanned = _count_scanned(monkeypatch)
+    text = '"[ ' * 20000 + "[1]"
+    started = time.perf_counter()
+    # every opener swallows the rest of the text into strings; the real "[1]" is ~20000 rescans away
+    assert recover_json(text) is None
+    assert time.perf_counter() - started < 2
+    assert sum(scanned) <= (partial_json._MAX_SCAN_FACTOR + 1) * len(text)
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import time
+
+import pytest
+
+import pdf
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """Replace PyPDF2 extraction with a counter; every upload has three pages, one of them empty"""
+    calls = []
+
+    def extract(data):
+        calls.append(data)
+        return [f"page one of {data.decode()}.", "", "page three."]
+
+    monkeypatch.setattr(pdf, "extract_pages", extract)
+    monkeypatch.setattr(pdf, "_parsed_pdf_cache", pdf.BoundedCache(max_bytes=1 << 20, max_entries=4))
+    return calls
+
+
+def test_repeated_upload_is_parsed_once(extractions):
+    first = pdf.parse_pdf_bytes(b"doc-a")
+    again = pdf.parse_pdf_bytes(b"doc-a")
+    assert again is first
+    assert extractions == [b"doc-a"]
+    assert first.digest == hashlib.sha256(b"doc-a").hexdigest()
+    assert first.text == "page one of doc-a.\npage three."
+
+    pdf.parse_pdf_bytes(b"doc-b")
+    assert extractions == [b"doc-a", b"doc-b"]
+    assert pdf.parsed_pdf_cache_stats()["hits"] >= 1
+
+
+def test_chunkings_are_memoized_per_chunk_size(extractions, monkeypatch):
+    parsed = pdf.parse_pdf_bytes(b"doc-a")
+    chunked = []
+    real = pdf.chunk_text
+    monkeypatch.setattr(pdf, "chunk_text", lambda text, size: chunked.append(size) or real(text, size))
+
+    assert pdf.get_pdf_chunks(parsed, 50) == pdf.get_pdf_chunks(parsed, 50)
+    pdf.get_pdf_chunks(parsed, 5)
+    assert chunked == [50, 5]
+    # the entry is re-measured with its chunkings
+    assert pdf.parsed_pdf_cache_stats()["bytes"] == parsed.nbytes()
+
+
+def test_pages_extracted_elsewhere_can_be_registered(extractions):
+    digest = hashlib.sha256(b"streamed").hexdigest()
+    registered = pdf.cache_parsed_pdf(digest, ["a.", "b."])
+    assert pdf.get_cached_parsed_pdf(digest) is registered
+    assert pdf.parse_pdf_bytes(b"streamed") is registered
+    assert extractions == []
+
+
+def test_document_directory_evicts_least_recently_used(extractions, monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf, "PDF_DOCUMENT_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf, "PDF_DOCUMENT_MAX_ENTRIES", 2)
+    monkeypatch.setattr(pdf, "PDF_DOCUMENT_MAX_BYTES", 0)
+    ids = [c * 64 for c in "abc"]
+    pdf.save_parsed_pdf(pdf.ParsedPDF(ids[0], ["first."]))
+    pdf.save_parsed_pdf(pdf.ParsedPDF(ids[1], ["second."]))
+    past = time.time() - 100
+    os.utime(tmp_path / f"{ids[0]}.json", (past, past))
+    os.utime(tmp_path / f"{ids[1]}.json", (past - 50, past - 50))
+    pdf._parsed_pdf_cache.clear()
+    assert pdf.load_parsed_pdf(ids[1]).pages == ["second."]   # refreshes ids[1]: ids[0] is now the LRU entry
+
+    assert pdf.save_parsed_pdf(pdf.ParsedPDF(ids[2], ["third."]))
+    assert sorted(os.listdir(tmp_path)) == [f"{i}.json" for i in ids[1:]]
+
+
+def test_document_directory_byte_budget_keeps_newest(extractions, monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf, "PDF_DOCUMENT_DIR", str(tmp_path))
+    monkeypatch.setattr(pdf, "PDF_DOCUMENT_MAX_ENTRIES", 0)
+    pdf.save_parsed_pdf(pdf.ParsedPDF("1" * 64, ["x" * 1000]))
+    one_document = os.path.getsize(tmp_path / f"{'1' * 64}.json")
+    monkeypatch.setattr(pdf, "PDF_DOCUMENT_MAX_BYTES", int(one_document * 1.5))
+
+    # two documents exceed the budget: the older one makes room for the new one
+    assert pdf.save_parsed_pdf(pdf.ParsedPDF("2" * 64, ["y" * 1000]))
+    assert os.listdir(tmp_path) == [f"{'2' * 64}.json"]
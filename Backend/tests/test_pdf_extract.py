@@ -0,0 +1,55 @@
+import io
+from concurrent.futures import Future
+
+from PyPDF2 import PdfWriter
+
+import pdf_extract
+
+
+def _pdf(n_pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(n_pages):
+        writer.add_blank_page(width=72, height=72)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+class _InlinePool:
+    """Runs submitted calls in-process and records the page ranges."""
+
+    def __init__(self):
+        self.ranges = []
+
+    def submit(self, fn, data, start, end):
+        self.ranges.append((start, end))
+        fut = Future()
+        fut.set_result([f"page {i}" for i in range(start, end)])
+        return fut
+
+
+def test_extract_pages_ships_one_contiguous_range_per_worker(monkeypatch):
+    pool = _InlinePool()
+    monkeypatch.setattr(pdf_extract, "_get_pool", lambda: pool)
+    monkeypatch.setattr(pdf_extract, "PDF_PARALLEL_MIN_PAGES", 32)
+
+    pages = pdf_extract.extract_pages(_pdf(400), max_workers=4)
+    assert pages == [f"page {i}" for i in range(400)]
+    assert pool.ranges == [(0, 100), (100, 200), (200, 300), (300, 400)]
+
+
+def test_iter_pages_starts_with_small_leading_ranges(monkeypatch):
+    pool = _InlinePool()
+    monkeypatch.setattr(pdf_extract, "_get_pool", lambda: pool)
+    monkeypatch.setattr(pdf_extract, "PDF_PARALLEL_MIN_PAGES", 32)
+    monkeypatch.setattr(pdf_extract, "PDF_FIRST_RANGE_PAGES", 8)
+
+    pages = list(pdf_extract.iter_pages(_pdf(400), max_workers=4))
+    assert pages == [f"page {i}" for i in range(400)]
+    # doubling up to one worker's share (100 pages), then shares: few copies of the bytes
+    assert pool.ranges == [(0, 8), (8, 24), (24, 56), (56, 120), (120, 220), (220, 320), (320, 400)]
+
+
+def test_small_documents_are_extracted_in_process(monkeypatch):
+    monkeypatch.setattr(pdf_extract, "_get_pool", lambda: (_ for _ in ()).throw(AssertionError("pool used")))
+    assert pdf_extract.extract_pages(_pdf(3)) == ["", "", ""]
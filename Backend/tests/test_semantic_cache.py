@@ -0,0 +1,59 @@
+import numpy as np
+
+from semantic_cache import SemanticCache, normalize_query
+
+# hand-made "embeddings": the two python phrasings are near-identical, cooking is not
+_VECTORS = {
+    "learn python": [1.0, 0.0, 0.0],
+    "python basics": [0.95, 0.05, 0.0],
+    "cooking": [0.0, 0.0, 1.0],
+}
+
+
+def _embed(text):
+    return _VECTORS[text]
+
+
+def test_near_duplicate_query_hits_and_unrelated_misses():
+    cache = SemanticCache(threshold=0.9, embed=_embed)
+    cache.add("Learn  Python", [{"name": "Basics"}], namespace="m")
+    hit = cache.lookup("python basics", namespace="m")
+    assert hit == [{"name": "Basics"}]
+    hit.append("mutated")
+    assert cache.lookup("learn python", namespace="m") == [{"name": "Basics"}]
+    assert cache.lookup("cooking", namespace="m") is None
+    # other namespaces (models) never see each other's entries
+    assert cache.lookup("learn python", namespace="other") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert sum(stats["similarity"]["hits"]) == 2
+
+
+def test_embedding_failure_is_a_miss():
+    def broken(text):
+        raise RuntimeError("model not loaded")
+
+    cache = SemanticCache(embed=broken)
+    cache.add("learn python", 1)
+    assert cache.lookup("learn python") is None
+    assert cache.stats()["errors"] == 1
+
+
+def test_compaction_keeps_the_newest_entries():
+    rng = np.random.default_rng(0)
+    vectors = {}
+
+    def embed(text):
+        return vectors.setdefault(text, rng.standard_normal(8).tolist())
+
+    cache = SemanticCache(threshold=0.99, max_entries=8, embed=embed)
+    for i in range(20):
+        cache.add(f"q{i}", i)
+    assert len(cache) <= 8
+    assert cache.lookup("q19") == 19
+    assert cache.lookup("q0") is None
+
+
+def test_normalize_query():
+    assert normalize_query("  Learn\tPYTHON \n") == "learn python"
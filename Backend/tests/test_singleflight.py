@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, flight_key
+
+
+def test_concurrent_thread_callers_share_one_call():
+    group = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow(x):
+        calls.append(x)
+        release.wait(5)
+        return {"value": x}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("k", slow, 1))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while group.stats()["leaders"] + group.stats()["shared"] < 8:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert results == [{"value": 1}] * 8
+    # followers get copies, not the leader's object
+    assert len({id(r) for r in results}) == 8
+    assert group.stats() == {"leaders": 1, "shared": 7, "in_flight": 0}
+
+
+def test_async_callers_share_one_call_and_its_error():
+    group = SingleFlight()
+    calls = []
+
+    async def work(fail):
+        calls.append(fail)
+        await asyncio.sleep(0.01)
+        if fail:
+            raise ValueError("upstream down")
+        return ["ok"]
+
+    async def main():
+        ok = await asyncio.gather(*(group.do_async("a", work, False) for _ in range(5)))
+        errors = await asyncio.gather(*(group.do_async("b", work, True) for _ in range(3)), return_exceptions=True)
+        return ok, errors
+
+    ok, errors = asyncio.run(main())
+    assert ok == [["ok"]] * 5
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert calls == [False, True]
+
+
+def test_flight_key_matches_the_exact_request():
+    assert flight_key("m", "ctx", "Python") == flight_key("m", "ctx", "Python")
+    # the prompt and the response cache are case/whitespace sensitive, so the key is too
+    assert flight_key("m", "ctx", "Python") != flight_key("m", "ctx", "python")
+    assert flight_key("m", "ctx", "learn  python") != flight_key("m", "ctx", "learn python")
+
+
+def test_sequential_calls_are_not_shared():
+    group = SingleFlight()
+    assert group.do("k", lambda: 1) == 1
+    with pytest.raises(RuntimeError):
+        group.do("k", lambda: (_ for _ in ()).throw(RuntimeError("x")))
+    assert group.do("k", lambda: 2) == 2
+    assert group.stats()["shared"] == 0
@@ -0,0 +1,85 @@
+import os
+import time
+
+import numpy as np
+
+from store_cache import DiskStoreTier, VectorStoreCache
+from vectorstore import VectorStore
+
+
+class _Sized:
+    def __init__(self, n):
+        self.n = n
+
+    def nbytes(self):
+        return self.n
+
+
+def _store(n_rows: int, dim: int = 8, seed: int = 0) -> VectorStore:
+    rng = np.random.default_rng(seed)
+    store = VectorStore(dim=dim, normalize=True)
+    store.add([f"t{i}" for i in range(n_rows)], rng.standard_normal((n_rows, dim)).astype(np.float32))
+    return store
+
+
+def test_memory_cache_lru_bytes_and_ttl():
+    cache = VectorStoreCache(max_bytes=250, max_entries=10, ttl_seconds=0)
+    for key in "abc":
+        assert cache.put(key, _Sized(100))
+    assert cache.get("a") is None          # evicted by the byte budget
+    assert cache.get("b") is not None
+    assert not cache.put("huge", _Sized(1000))
+
+    ttl = VectorStoreCache(ttl_seconds=0.01)
+    ttl.put("k", _Sized(1))
+    time.sleep(0.02)
+    assert ttl.get("k") is None
+    assert ttl.stats()["expirations"] == 1
+
+
+def test_disk_tier_round_trip(tmp_path):
+    disk = DiskStoreTier(VectorStore, directory=str(tmp_path))
+    store = _store(5)
+    assert disk.load("ab" * 16) is None
+    assert disk.save("ab" * 16, store)
+    loaded = disk.load("ab" * 16)
+    assert loaded.payloads == store.payloads
+    np.testing.assert_allclose(loaded.vectors, store.vectors)
+
+
+def test_disk_tier_evicts_least_recently_used_by_entries(tmp_path):
+    disk = DiskStoreTier(VectorStore, directory=str(tmp_path), max_entries=2, max_bytes=0)
+    keys = [c * 32 for c in "abc"]
+    disk.save(keys[0], _store(3))
+    disk.save(keys[1], _store(3))
+    past = time.time() - 100
+    os.utime(tmp_path / keys[0], (past, past))
+    os.utime(tmp_path / keys[1], (past - 50, past - 50))
+    assert disk.load(keys[1]) is not None   # refreshes keys[1]: keys[0] is now the LRU entry
+    disk.save(keys[2], _store(3))
+    assert sorted(os.listdir(tmp_path)) == sorted(keys[1:])
+    assert disk.stats()["evictions"] == 1
+
+
+def test_disk_tier_byte_budget_keeps_newest(tmp_path):
+    probe = DiskStoreTier(VectorStore, directory=str(tmp_path / "probe"))
+    probe.save("0" * 32, _store(50))
+    one_store = probe.stats()["bytes"]
+
+    disk = DiskStoreTier(VectorStore, directory=str(tmp_path / "d"), max_bytes=int(one_store * 1.5), max_entries=0)
+    disk.save("1" * 32, _store(50))
+    disk.save("2" * 32, _store(50))
+    assert os.listdir(tmp_path / "d") == ["2" * 32]
+    assert disk.stats()["bytes"] <= disk.max_bytes
+
+
+def test_disk_tier_key_includes_build_fingerprint(tmp_path):
+    settings = {"embedding_model": "m", "chunk_tokens": 200, "index": "flat", "storage": "float32"}
+    key = "ab" * 16
+    DiskStoreTier(VectorStore, directory=str(tmp_path), fingerprint=settings).save(key, _store(5))
+
+    assert DiskStoreTier(VectorStore, directory=str(tmp_path), fingerprint=dict(settings)).load(key) is not None
+    for change in ({"storage": "int8"}, {"index": "ivf"}, {"chunk_tokens": 128}, {"embedding_model": "other"}):
+        other = DiskStoreTier(VectorStore, directory=str(tmp_path), fingerprint={**settings, **change})
+        assert other.load(key) is None, change
+    assert DiskStoreTier(VectorStore, directory=str(tmp_path)).load(key) is None
@@ -0,0 +1,105 @@
+import threading
+
+import numpy as np
+import pytest
+
+from vectorstore import IVFIndex, VectorStore
+
+
+def _data(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    v = rng.standard_normal((n, dim)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def test_flat_search_matches_brute_force():
+    vecs = _data(200)
+    store = VectorStore(dim=16)
+    store.add([str(i) for i in range(200)], vecs)
+    q = vecs[17] + 0.01
+    hits = store.search(q, top_k=5)
+    expected = np.argsort(-(vecs @ (q / np.linalg.norm(q))))[:5]
+    assert [p for p, _ in hits] == [str(i) for i in expected]
+    batch = store.search_batch([q, vecs[3]], top_k=5)[0]
+    assert [p for p, _ in batch] == [p for p, _ in hits]
+    np.testing.assert_allclose([s for _, s in batch], [s for _, s in hits], rtol=1e-5)
+
+
+@pytest.mark.parametrize("storage", ["float32", "float16", "int8"])
+def test_save_load_round_trip(tmp_path, storage):
+    vecs = _data(64)
+    store = VectorStore(dim=16, normalize=True, storage=storage, keep_full_precision=True)
+    store.add([f"t{i}" for i in range(64)], vecs, ids=[f"id{i}" for i in range(64)])
+    store.save(str(tmp_path / "s"))
+    loaded = VectorStore.load(str(tmp_path / "s"))
+    assert loaded.ids == store.ids and loaded.payloads == store.payloads
+    assert loaded.search(vecs[5], top_k=3) == store.search(vecs[5], top_k=3)
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_compact_store_saves_no_float32_copy_unless_kept(tmp_path, storage):
+    vecs = _data(64)
+    for keep in (False, True):
+        store = VectorStore(dim=16, normalize=True, storage=storage, keep_full_precision=keep)
+        store.add([f"t{i}" for i in range(64)], vecs)
+        path = tmp_path / f"{storage}-{keep}"
+        store.save(str(path))
+        assert (path / "vectors.f32").exists() == keep
+        loaded = VectorStore.load(str(path))
+        assert loaded.keep_full_precision == keep
+        assert [t for t, _ in loaded.search(vecs[7], top_k=3)] == [t for t, _ in store.search(vecs[7], top_k=3)]
+
+
+def test_ivf_trains_while_building_and_searches():
+    vecs = _data(600)
+    store = VectorStore(dim=16, index="ivf", index_params={"min_train_size": 256, "nprobe": 64})
+    store.add([str(i) for i in range(300)], vecs[:300])
+    assert store.index.centroids is not None          # trained in add(), not on first search
+    store.add([str(i) for i in range(300, 600)], vecs[300:])
+    assert store.search(vecs[450], top_k=1)[0][0] == "450"
+
+
+def test_ivf_concurrent_first_searches_train_once(monkeypatch):
+    vecs = _data(500)
+    index = IVFIndex(16, min_train_size=10 ** 9)
+    index.add(vecs, 0)                                 # too small to train yet
+    index.min_train_size = 100                         # e.g. a store loaded without index state
+
+    calls = []
+    train = IVFIndex._train
+
+    def counting_train(self, vectors):
+        calls.append(1)
+        train(self, vectors)
+
+    monkeypatch.setattr(IVFIndex, "_train", counting_train)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker(i):
+        barrier.wait()
+        idx, _ = index.search(vecs, vecs[i], 1)
+        results.append((i, int(idx[0])))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len(results) == 8
+
+
+@pytest.mark.parametrize("storage", ["float32", "int8"])
+def test_snapshot_is_unaffected_by_later_adds(storage):
+    vecs = _data(300)
+    store = VectorStore(dim=16, normalize=True, storage=storage)
+    store.add([f"t{i}" for i in range(20)], vecs[:20])
+    view = store.snapshot()
+    before = view.search(vecs[3], top_k=5)
+
+    # enough rows to reallocate the buffers several times
+    store.add([f"t{i}" for i in range(20, 300)], vecs[20:])
+    assert len(view) == 20 and len(store) == 300
+    assert view.search(vecs[3], top_k=5) == before
+    assert all(int(t[1:]) < 20 for t, _ in view.search(vecs[250], top_k=10))
@@ -19,25 +19,342 @@
 
 
 # vectorstore.py
+import json
+import math
+import os
+import threading
 import numpy as np
-import pickle
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+# On-disk layout written by VectorStore.save(path) -- `path` is a directory:
+#   meta.json       format/version, dim, count, storage, index settings (written last)
+#   vectors.f32     raw little-endian float32 (count, dim) matrix, np.memmap-able; only written for
+#                   float32 storage or a compact store with keep_full_precision
+#   norms.f32       raw float32 (count,) row norms
+#   codes.bin       compact storage only: raw float16/int8 (count, dim) codes
+#   scales.f32      int8 storage only: per-row dequantization scales
+#   payloads.json   {"payloads": [...], "ids": [...]}
+#   index.npz       ANN index state (no pickled objects)
+STORE_FORMAT = "learning-copilot-vectorstore"
+STORE_FORMAT_VERSION = 1
+
+def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first. O(n) partition + O(k log k) sort."""
+    n = scores.shape[0]
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k >= n:
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, top_k - 1)[:top_k]
+    return part[np.argsort(-scores[part])]
+
+
+def _top_k_indices_batch(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Row-wise _top_k_indices for a (m, n) score matrix -> (m, min(top_k, n)) indices."""
+    m, n = scores.shape
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty((m, 0), dtype=np.int64)
+    if k == n:
+        return np.argsort(-scores, axis=1)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+# ------------------ ANN index backends ------------------
+# An index sees the store's (unit-normalized) vector matrix and implements:
+#   add(vectors, start)        rows vectors[start:] are new
+#   search(vectors, q, top_k)  -> (indices, scores), best first; q is unit-normalized
+#   get_state() / set_state()  for save/load
+#   nbytes()                   extra memory held by the index
+
+class IVFIndex:
+    """
+    Pure-numpy inverted file index. A spherical k-means coarse quantizer splits the
+    vectors into `nlist` cells; a query only scans the `nprobe` closest cells.
+    Training happens in add() once `min_train_size` rows exist (i.e. while the store is
+    built), and is redone when the store has grown 4x since the last training. Below that
+    size search is an exact scan. Training and list rebuilds hold a lock, so concurrent
+    searches from worker threads never train twice or see half-updated cells; the scan
+    itself runs on a snapshot outside the lock.
+    """
+
+    name = "ivf"
+
+    def __init__(self, dim: int, nlist: int = 0, nprobe: int = 8, min_train_size: int = 2048, n_iter: int = 10):
+        self.dim = dim
+        self.nlist = nlist  # 0 = pick ~2*sqrt(n) at training time
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.n_iter = n_iter
+        self.centroids: Optional[np.ndarray] = None  # (nlist, dim)
+        self._assign = np.zeros(0, dtype=np.int32)  # cell of each row
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None  # (row order by cell, cell bounds)
+        self._trained_on = 0
+        self._lock = threading.Lock()
+
+    def _nearest_centroid(self, vectors: np.ndarray, block: int = 65536) -> np.ndarray:
+        out = np.empty(vectors.shape[0], dtype=np.int32)
+        for i in range(0, vectors.shape[0], block):
+            out[i:i + block] = np.argmax(vectors[i:i + block] @ self.centroids.T, axis=1)
+        return out
+
+    def _train(self, vectors: np.ndarray):
+        n = vectors.shape[0]
+        nlist = self.nlist or int(min(4096, max(16, 2 * math.sqrt(n))))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(0)
+        sample = vectors[np.sort(rng.choice(n, size=min(n, nlist * 32), replace=False))]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            # per-cell sums via sort + reduceat (much faster than np.add.at)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[np.argsort(assign, kind="stable")], starts[~empty], axis=0)
+            if empty.any():
+                # reseed empty cells with random sample points
+                sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            centroids = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-12)
+        self.centroids = centroids.astype(np.float32)
+        self._assign = self._nearest_centroid(vectors)
+        self._lists = None
+        self._trained_on = n
+
+    def _maybe_train(self, vectors: np.ndarray):
+        """(Re)train if due. Caller holds self._lock."""
+        n = vectors.shape[0]
+        if n >= self.min_train_size and (self.centroids is None or n > 4 * self._trained_on):
+            self._train(vectors)
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._lists is None:
+            order = np.argsort(self._assign, kind="stable")
+            bounds = np.searchsorted(self._assign[order], np.arange(self.centroids.shape[0] + 1))
+            self._lists = (order, bounds)
+        return self._lists
+
+    def add(self, vectors: np.ndarray, start: int):
+        with self._lock:
+            if self.centroids is not None:
+                self._assign = np.concatenate([self._assign, self._nearest_centroid(vectors[start:])])
+                self._lists = None
+            self._maybe_train(vectors)
+
+    def search(self, vectors: np.ndarray, q: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            # stores loaded without index state train on first use
+            self._maybe_train(vectors)
+            centroids = self.centroids
+            lists = self._inverted_lists() if centroids is not None else None
+        if lists is None:
+            scores = vectors @ q
+            idx = _top_k_indices(scores, top_k)
+            return idx, scores[idx]
+        order, bounds = lists
+        probe = _top_k_indices(centroids @ q, self.nprobe)
+        cand = np.concatenate([order[bounds[c]:bounds[c + 1]] for c in probe])
+        scores = vectors[cand] @ q
+        sel = _top_k_indices(scores, top_k)
+        return cand[sel], scores[sel]
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"centroids": self.centroids, "assign": self._assign, "trained_on": self._trained_on}
+
+    def set_state(self, state: Dict[str, Any]):
+        with self._lock:
+            self.centroids = state.get("centroids")
+            self._assign = np.asarray(state.get("assign", np.zeros(0)), dtype=np.int32)
+            self._trained_on = int(state.get("trained_on", 0))
+            self._lists = None
+
+    def nbytes(self) -> int:
+        return int(self._assign.nbytes + (self.centroids.nbytes if self.centroids is not None else 0))
+
+
+class FaissHNSWIndex:
+    """HNSW graph index (faiss IndexHNSWFlat, inner product). Needs faiss-cpu installed."""
+
+    name = "hnsw"
+
+    def __init__(self, dim: int, M: int = 32, ef_construction: int = 80, ef_search: int = 64):
+        try:
+            import faiss
+        except ImportError as e:
+            raise ImportError("index='hnsw' requires faiss-cpu (pip install faiss-cpu)") from e
+        self._faiss = faiss
+        self.dim = dim
+        self.M = M
+        self.ef_search = ef_search
+        self.index = faiss.IndexHNSWFlat(dim, M, faiss.METRIC_INNER_PRODUCT)
+        self.index.hnsw.efConstruction = ef_construction
+        self.index.hnsw.efSearch = ef_search
+
+    def add(self, vectors: np.ndarray, start: int):
+        self.index.add(np.ascontiguousarray(vectors[start:], dtype=np.float32))
+
+    def search(self, vectors: np.ndarray, q: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        D, I = self.index.search(q.reshape(1, -1).astype(np.float32), top_k)
+        keep = I[0] >= 0
+        return I[0][keep], D[0][keep]
+
+    def get_state(self) -> Dict[str, Any]:
+        return {"faiss": self._faiss.serialize_index(self.index)}
+
+    def set_state(self, state: Dict[str, Any]):
+        if state.get("faiss") is not None:
+            self.index = self._faiss.deserialize_index(state["faiss"])
+            self.index.hnsw.efSearch = self.ef_search
+
+    def nbytes(self) -> int:
+        # full-precision copy of the vectors plus ~2*M neighbour ids per row
+        n = self.index.ntotal
+        return int(n * self.dim * 4 + n * self.M * 2 * 4)
+
+
+INDEX_TYPES = {"ivf": IVFIndex, "hnsw": FaissHNSWIndex}
+
+# Resident storage for the vector matrix: float16 halves memory, int8 (per-row scale) quarters it
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Rows dequantized per block when scoring compact storage (bounds the float32 scratch space)
+_SCORE_BLOCK_ROWS = 16384
+
+
+def _grow(buf: np.ndarray, capacity: int, size: int) -> np.ndarray:
+    new = np.empty((capacity,) + buf.shape[1:], dtype=buf.dtype)
+    new[:size] = buf[:size]
+    return new
+
 
 class VectorStore:
-    def __init__(self, dim: int):
+    def __init__(self, dim: int, normalize: bool = False, index: str = "flat", index_params: Optional[Dict[str, Any]] = None,
+                 storage: str = "float32", keep_full_precision: bool = False):
+        """
+        normalize=True stores unit vectors at insert time, so a query is scored with a
+        single matrix-vector product. Otherwise row norms are computed once in add().
+
+        index selects the search backend: "flat" (exact scan, default), "ivf" (pure-numpy
+        inverted file) or "hnsw" (faiss). ANN backends score inner products, so they
+        force normalize=True. index_params are passed to the backend constructor.
+
+        storage selects the resident representation: "float32" (default), "float16" or
+        "int8" (scalar-quantized with a per-row scale). Compact modes score directly on
+        the compact matrix; with keep_full_precision=True a float32 copy is also kept so
+        search(..., rescore=True) can re-rank the top candidates exactly.
+        Compact storage is only supported with the flat index.
+
+        Vectors live in preallocated buffers that double when full, so appending many
+        small batches is amortized O(1) per row. `vectors` / `norms` only cover the
+        filled rows.
+        """
+        if index != "flat" and index not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index!r}; expected 'flat' or one of {sorted(INDEX_TYPES)}")
+        if storage not in STORAGE_DTYPES:
+            raise ValueError(f"Unknown storage {storage!r}; expected one of {sorted(STORAGE_DTYPES)}")
+        if storage != "float32" and index != "flat":
+            raise ValueError("Compact storage (float16/int8) is only supported with index='flat'")
         self.dim = dim
-        self.vectors = np.zeros((0, dim), dtype=np.float32)  # shape: (n, dim)
+        self.index_type = index
+        self.index_params = dict(index_params or {})
+        self.index = INDEX_TYPES[index](dim, **self.index_params) if index != "flat" else None
+        self.normalize = normalize or self.index is not None
+        self.storage = storage
+        self.keep_full_precision = keep_full_precision and storage != "float32"
+        self._reset_buffers()
         self.payloads: List[str] = []  # original text chunks
         self.ids: List[str] = []
 
+    def _reset_buffers(self):
+        self._buf = np.zeros((0, self.dim), dtype=STORAGE_DTYPES[self.storage])  # shape: (capacity, dim)
+        self._norm_buf = np.zeros(0, dtype=np.float32)  # row norms, filled at add()
+        self._scale_buf = np.zeros(0, dtype=np.float32)  # int8 only: per-row dequantization scale
+        self._full_buf = np.zeros((0, self.dim), dtype=np.float32) if self.keep_full_precision else None
+        self._size = 0  # number of filled rows
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Float32 vectors of the filled rows (a dequantized copy for compact storage without a full copy)."""
+        if self.storage == "float32":
+            return self._buf[:self._size]
+        if self._full_buf is not None:
+            return self._full_buf[:self._size]
+        return self._decode(0, self._size)
+
+    @vectors.setter
+    def vectors(self, arr: np.ndarray):
+        arr = np.ascontiguousarray(arr, dtype=np.float32).reshape(-1, self.dim)
+        self._reset_buffers()
+        self._append_rows(arr)
+
+    @property
+    def norms(self) -> np.ndarray:
+        return self._norm_buf[:self._size]
+
+    @property
+    def capacity(self) -> int:
+        return self._buf.shape[0]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def reserve(self, capacity: int):
+        """Grow the buffers to hold at least `capacity` rows (no-op if already large enough)."""
+        if capacity <= self.capacity:
+            return
+        self._buf = _grow(self._buf, capacity, self._size)
+        self._norm_buf = _grow(self._norm_buf, capacity, self._size)
+        if self.storage == "int8":
+            self._scale_buf = _grow(self._scale_buf, capacity, self._size)
+        if self._full_buf is not None:
+            self._full_buf = _grow(self._full_buf, capacity, self._size)
+
+    def _encode(self, arr: np.ndarray, start: int, end: int):
+        """Write float32 rows into the resident buffer(s) at [start:end]."""
+        if self.storage == "int8":
+            scale = np.abs(arr).max(axis=1) / 127.0 + 1e-12
+            self._buf[start:end] = np.clip(np.rint(arr / scale[:, None]), -127, 127).astype(np.int8)
+            self._scale_buf[start:end] = scale
+        else:
+            self._buf[start:end] = arr
+        if self._full_buf is not None:
+            self._full_buf[start:end] = arr
+
+    def _decode(self, start: int, end: int) -> np.ndarray:
+        """Float32 copy of resident rows [start:end]."""
+        block = self._buf[start:end].astype(np.float32)
+        if self.storage == "int8":
+            block *= self._scale_buf[start:end, None]
+        return block
+
+    def _append_rows(self, arr: np.ndarray) -> int:
+        norms = np.linalg.norm(arr, axis=1).astype(np.float32)
+        if self.normalize:
+            arr = arr / (norms[:, None] + 1e-12)
+            norms = np.ones_like(norms)
+        # append into the buffer, doubling capacity when it runs out
+        needed = self._size + arr.shape[0]
+        if needed > self.capacity:
+            self.reserve(max(needed, 2 * self.capacity, 16))
+        self._encode(arr, self._size, needed)
+        self._norm_buf[self._size:needed] = norms
+        start, self._size = self._size, needed
+        return start
+
     def add(self, texts: List[str], embeddings: List[List[float]], ids: List[str] = None):
-        if not embeddings:
+        if embeddings is None or len(embeddings) == 0:
             return
-        arr = np.array(embeddings, dtype=np.float32)
+        arr = np.asarray(embeddings, dtype=np.float32)
         if arr.ndim == 1:
             arr = arr.reshape(1, -1)
-        # append
-        self.vectors = np.vstack([self.vectors, arr]) if self.vectors.size else arr
+        if arr.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dim {self.dim}, got {arr.shape[1]}")
+        start = self._append_rows(arr)
+        if self.index is not None:
+            self.index.add(self.vectors, start)
         self.payloads.extend(texts)
         if ids:
             self.ids.extend(ids)
@@ -45,32 +362,196 @@ class VectorStore:
             # generate ids if not supplied
             self.ids.extend([str(len(self.ids) + i) for i in range(len(texts))])
 
-    def _cosine_sim(self, q: np.ndarray, candidates: np.ndarray) -> np.ndarray:
-        # q: (dim,), candidates: (n, dim)
-        q_norm = np.linalg.norm(q) + 1e-12
-        c_norm = np.linalg.norm(candidates, axis=1) + 1e-12
-        sims = (candidates @ q) / (c_norm * q_norm)
+    def snapshot(self) -> "VectorStore":
+        """
+        Read-only view of the rows added so far, sharing this store's buffers (no copy).
+        add() only writes rows past the view's end, or into a freshly grown buffer, so the
+        view stays valid while the store keeps growing in another thread. The view always
+        searches exactly (flat): ANN index state is not shared.
+        """
+        view = VectorStore(self.dim, normalize=self.normalize, storage=self.storage)
+        n = self._size
+        view._buf = self._buf[:n]
+        view._norm_buf = self._norm_buf[:n]
+        view._scale_buf = self._scale_buf[:n] if self.storage == "int8" else view._scale_buf
+        view._full_buf = self._full_buf[:n] if self._full_buf is not None else None
+        view.keep_full_precision = view._full_buf is not None
+        view._size = n
+        view.payloads = self.payloads[:n]
+        view.ids = self.ids[:n]
+        return view
+
+    def _score_matrix(self, Q: np.ndarray) -> np.ndarray:
+        """Cosine scores (m, n) for unit-normalized queries Q (m, dim) against all stored rows."""
+        if self.storage == "float32":
+            sims = Q @ self.vectors.T
+        else:
+            # score straight off the compact matrix, dequantizing one block at a time
+            sims = np.empty((Q.shape[0], self._size), dtype=np.float32)
+            for i in range(0, self._size, _SCORE_BLOCK_ROWS):
+                j = min(i + _SCORE_BLOCK_ROWS, self._size)
+                sims[:, i:j] = Q @ self._decode(i, j).T
+        if not self.normalize:
+            sims /= self.norms + 1e-12
+        return sims
+
+    def _exact_scores(self, Q: np.ndarray, idx: np.ndarray) -> np.ndarray:
+        """Full-precision scores of rows idx (m, c) for queries Q (m, dim)."""
+        sims = np.einsum("mcd,md->mc", self._full_buf[idx], Q)
+        if not self.normalize:
+            sims /= self._norm_buf[idx] + 1e-12
         return sims
 
-    def search(self, query_embedding: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
-        if self.vectors.size == 0:
+    def _cosine_sim(self, q: np.ndarray) -> np.ndarray:
+        # q: (dim,), vectors: (n, dim); stored norms avoid touching every row twice per query
+        q = q / (np.linalg.norm(q) + 1e-12)
+        return self._score_matrix(q.reshape(1, -1))[0]
+
+    def search(self, query_embedding: List[float], top_k: int = 5, rescore: bool = False,
+               rescore_factor: int = 4) -> List[Tuple[str, float]]:
+        """
+        Return [(payload, score), ...] best first. With compact storage and
+        keep_full_precision, rescore=True re-ranks the top top_k * rescore_factor
+        candidates using the float32 copy.
+        """
+        if self._size == 0:
             return []
-        q = np.array(query_embedding, dtype=np.float32)
-        sims = self._cosine_sim(q, self.vectors)
-        idx = np.argsort(-sims)[:top_k]
-        results = [(self.payloads[i], float(sims[i])) for i in idx]
-        return results
+        q = np.asarray(query_embedding, dtype=np.float32)
+        if self.index is not None:
+            q = q / (np.linalg.norm(q) + 1e-12)
+            idx, scores = self.index.search(self.vectors, q, top_k)
+            return [(self.payloads[i], float(score)) for i, score in zip(idx.tolist(), scores.tolist())]
+        return self.search_batch(q.reshape(1, -1), top_k, rescore=rescore, rescore_factor=rescore_factor)[0]
+
+    def search_batch(self, query_embeddings: List[List[float]], top_k: int = 5, rescore: bool = False,
+                     rescore_factor: int = 4) -> List[List[Tuple[str, float]]]:
+        """
+        Score many queries at once: one (m, dim) x (dim, n) GEMM plus a row-wise partial top-k.
+        Returns one [(payload, score), ...] list per query, in query order.
+        """
+        Q = np.asarray(query_embeddings, dtype=np.float32)
+        if Q.ndim == 1:
+            Q = Q.reshape(1, -1)
+        if self._size == 0:
+            return [[] for _ in range(Q.shape[0])]
+        if self.index is not None:
+            # ANN backends probe per query; the candidate scan inside is still vectorized
+            return [self.search(q, top_k) for q in Q]
+        Q = Q / (np.linalg.norm(Q, axis=1, keepdims=True) + 1e-12)
+        sims = self._score_matrix(Q)  # (m, n)
+        if rescore and self._full_buf is not None:
+            cand = _top_k_indices_batch(sims, top_k * max(1, rescore_factor))
+            exact = self._exact_scores(Q, cand)
+            order = _top_k_indices_batch(exact, top_k)
+            idx = np.take_along_axis(cand, order, axis=1)
+            top_scores = np.take_along_axis(exact, order, axis=1)
+        else:
+            idx = _top_k_indices_batch(sims, top_k)
+            top_scores = np.take_along_axis(sims, idx, axis=1)
+        return [
+            [(self.payloads[i], float(score)) for i, score in zip(row_idx, row_scores)]
+            for row_idx, row_scores in zip(idx.tolist(), top_scores.tolist())
+        ]
+
+    def nbytes(self) -> int:
+        """Approximate heap footprint: allocated vector buffers plus payload/id strings.
+        Memory-mapped buffers are not counted: their pages belong to the OS page cache."""
+        def heap(a: Optional[np.ndarray]) -> int:
+            return 0 if a is None or isinstance(a, np.memmap) else a.nbytes
+
+        text_bytes = sum(len(p) for p in self.payloads) + sum(len(i) for i in self.ids)
+        index_bytes = self.index.nbytes() if self.index is not None else 0
+        vector_bytes = heap(self._buf) + heap(self._norm_buf) + heap(self._scale_buf) + heap(self._full_buf)
+        # ~50 bytes of CPython object overhead per str
+        return int(vector_bytes) + index_bytes + text_bytes + 50 * (len(self.payloads) + len(self.ids))
 
     def save(self, path: str):
-        with open(path, "wb") as f:
-            pickle.dump({"dim": self.dim, "vectors": self.vectors, "payloads": self.payloads, "ids": self.ids}, f)
+        """Write the store as a directory of raw arrays + JSON (see the layout at the top of this module)."""
+        os.makedirs(path, exist_ok=True)
+        n = self._size
+        full_precision = self.storage == "float32" or self._full_buf is not None
+        if full_precision:
+            # a dequantized copy would be ~4x the codes on disk and is never read back
+            self.vectors.astype("<f4", copy=False).tofile(os.path.join(path, "vectors.f32"))
+        self.norms.astype("<f4", copy=False).tofile(os.path.join(path, "norms.f32"))
+        if self.storage != "float32":
+            self._buf[:n].astype(np.dtype(STORAGE_DTYPES[self.storage]).newbyteorder("<"), copy=False).tofile(
+                os.path.join(path, "codes.bin"))
+        if self.storage == "int8":
+            self._scale_buf[:n].astype("<f4", copy=False).tofile(os.path.join(path, "scales.f32"))
+        with open(os.path.join(path, "payloads.json"), "w", encoding="utf-8") as f:
+            json.dump({"payloads": self.payloads, "ids": self.ids}, f, ensure_ascii=False)
+        if self.index is not None:
+            state = {k: np.asarray(v) for k, v in self.index.get_state().items() if v is not None}
+            np.savez(os.path.join(path, "index.npz"), **state)
+        meta = {
+            "format": STORE_FORMAT,
+            "version": STORE_FORMAT_VERSION,
+            "dim": self.dim,
+            "count": n,
+            "normalize": self.normalize,
+            "storage": self.storage,
+            "full_precision": full_precision,
+            "keep_full_precision": self.keep_full_precision,
+            "index": self.index_type,
+            "index_params": self.index_params,
+        }
+        # meta.json goes last: a directory without it is an incomplete write
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
 
     @classmethod
-    def load(cls, path: str):
-        with open(path, "rb") as f:
-            data = pickle.load(f)
-        vs = cls(dim=data["dim"])
-        vs.vectors = data["vectors"]
-        vs.payloads = data["payloads"]
-        vs.ids = data["ids"]
+    def load(cls, path: str, mmap: bool = True):
+        """
+        Open a store written by save(). With mmap=True (default) the vector matrices are
+        np.memmap views of the files: loading is near-instant and the pages are shared by
+        every process reading the same index. Appending to a loaded store copies the
+        matrices onto the heap first (the maps are read-only).
+        """
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.isfile(meta_path):
+            raise ValueError(f"{path} is not a saved VectorStore (missing meta.json)")
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != STORE_FORMAT or meta.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported VectorStore format in {path}: {meta.get('format')} v{meta.get('version')}")
+
+        dim, n, storage = meta["dim"], meta["count"], meta["storage"]
+        vs = cls(dim=dim, normalize=meta["normalize"], index=meta["index"], index_params=meta.get("index_params"),
+                 storage=storage, keep_full_precision=meta.get("keep_full_precision", False))
+
+        def read(name: str, dtype, shape):
+            file_path = os.path.join(path, name)
+            if n == 0:
+                return np.zeros(shape, dtype=dtype)
+            if mmap:
+                return np.memmap(file_path, dtype=dtype, mode="r", shape=shape)
+            return np.fromfile(file_path, dtype=dtype).reshape(shape)
+
+        full_precision = storage == "float32" or meta.get("full_precision")
+        vectors = read("vectors.f32", "<f4", (n, dim)) if full_precision else None
+        vs._norm_buf = read("norms.f32", "<f4", (n,))
+        if storage == "float32":
+            vs._buf = vectors
+        else:
+            vs._buf = read("codes.bin", np.dtype(STORAGE_DTYPES[storage]).newbyteorder("<"), (n, dim))
+            if storage == "int8":
+                vs._scale_buf = read("scales.f32", "<f4", (n,))
+            # exact float32 rows are on disk when the store kept them: use them for rescoring
+            vs._full_buf = vectors
+            vs.keep_full_precision = vs._full_buf is not None
+        vs._size = n
+
+        with open(os.path.join(path, "payloads.json"), encoding="utf-8") as f:
+            texts = json.load(f)
+        vs.payloads = texts["payloads"]
+        vs.ids = texts["ids"]
+
+        if vs.index is not None:
+            index_path = os.path.join(path, "index.npz")
+            if os.path.isfile(index_path):
+                with np.load(index_path, allow_pickle=False) as state:
+                    vs.index.set_state({k: state[k] for k in state.files})
+            else:
+                vs.index.add(vs.vectors, 0)
         return vs
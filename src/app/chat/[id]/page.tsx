@@ -2088,6 +2088,8 @@ export default function ChatByIdPage() {
             metadata,
             prompt: question,
             query: question,
+            // lets the backend update this chat's vector store instead of rebuilding it each turn
+            conversation_id: chatId ?? undefined,
           });
 
           const raw =